@@ -0,0 +1,116 @@
+"""
+Vectorized team analytics.
+
+load_matrix() reads a team's PlayerStat rows with one values_list() query
+into a dense player x game x stat NumPy array (NaN where a player has no row
+for a game). team_analytics() derives everything from that array without
+per-row Python work: totals, per-game averages, z-scores and percentile ranks
+against the team, and the correlation of each stat with winning.
+
+NumPy is in requirements.txt; callers still check `available()` so a slim
+install without it answers 503 instead of failing to import.
+"""
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - only on installs without requirements.txt
+    np = None
+
+from .models import Game, Player, PlayerStat, PLAYER_STAT_FIELDS
+
+
+def available():
+    return np is not None
+
+
+def load_matrix(team, season=None, stats=PLAYER_STAT_FIELDS):
+    """
+    (players, games, cube) where players is [(id, name)], games is
+    [(id, is_win)] in date order and cube[p, g, s] is the value of stats[s].
+    """
+    games = Game.objects.filter(team=team)
+    stat_rows = PlayerStat.objects.filter(game__team=team)
+    if season is not None:
+        games = games.filter(season=season)
+        stat_rows = stat_rows.filter(game__season=season, game_date__range=season.dates)
+    games = list(games.order_by('date', 'id').values_list('id', 'is_win'))
+
+    # None -> NaN on conversion; missing stats then count as 0 (as in coach.metrics)
+    rows = np.array(list(stat_rows.values_list('player_id', 'game_id', *stats)), dtype=float)
+    rows = rows.reshape(-1, 2 + len(stats))
+    player_ids = np.unique(rows[:, 0]).astype(int)
+    names = dict(Player.objects.filter(id__in=player_ids.tolist()).values_list('id', 'name'))
+    players = [(pid, names.get(pid, '')) for pid in player_ids.tolist()]
+
+    game_ids = np.array([gid for gid, _ in games], dtype=int)
+    order = np.argsort(game_ids)
+    game_index = order[np.searchsorted(game_ids, rows[:, 1].astype(int), sorter=order)]
+    player_index = np.searchsorted(player_ids, rows[:, 0].astype(int))
+
+    cube = np.full((len(players), len(games), len(stats)), np.nan)
+    cube[player_index, game_index] = np.nan_to_num(rows[:, 2:])
+    return players, games, cube
+
+
+def _percentile_ranks(values):
+    """Mid-rank percentile (0-100) of each player within the team, per stat column"""
+    below = (values[None, :, :] < values[:, None, :]).sum(axis=1)
+    equal = (values[None, :, :] == values[:, None, :]).sum(axis=1)
+    return (below + 0.5 * equal) / values.shape[0] * 100
+
+
+def _win_correlation(team_totals, wins):
+    """Pearson correlation of each stat column (per-game team total) with the win indicator"""
+    x = team_totals - team_totals.mean(axis=0)
+    y = wins - wins.mean()
+    denominator = np.sqrt((x ** 2).sum(axis=0) * (y ** 2).sum())
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(denominator > 0, (x * y[:, None]).sum(axis=0) / denominator, np.nan)
+
+
+def _clean(array, stats):
+    return {stat: (None if np.isnan(v) else round(float(v), 3)) for stat, v in zip(stats, array.tolist())}
+
+
+def team_analytics(team, season=None):
+    players, games, cube = load_matrix(team, season)
+    stats = PLAYER_STAT_FIELDS
+    if not players or not games:
+        return {'games': len(games), 'stats': [], 'players': [], 'win_correlation': {}}
+
+    played = ~np.isnan(cube[:, :, 0])
+    games_played = played.sum(axis=1)
+    totals = np.nansum(cube, axis=1)
+    per_game = totals / np.maximum(games_played, 1)[:, None]
+
+    # Only report stats this team actually records
+    active = totals.any(axis=0)
+    stats = [s for s, keep in zip(stats, active.tolist()) if keep]
+    totals, per_game = totals[:, active], per_game[:, active]
+
+    mean, std = per_game.mean(axis=0), per_game.std(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z_scores = np.where(std > 0, (per_game - mean) / std, 0.0)
+    percentiles = _percentile_ranks(per_game)
+
+    wins = np.array([bool(is_win) for _, is_win in games], dtype=float)
+    team_totals = np.nansum(cube[:, :, active], axis=0)
+    correlation = _win_correlation(team_totals, wins)
+
+    return {
+        'games': len(games),
+        'stats': stats,
+        'team_average': _clean(mean, stats),
+        'win_correlation': _clean(correlation, stats),
+        'players': [
+            {
+                'id': pid,
+                'name': name,
+                'games': int(games_played[i]),
+                'totals': _clean(totals[i], stats),
+                'per_game': _clean(per_game[i], stats),
+                'z_scores': _clean(z_scores[i], stats),
+                'percentiles': _clean(percentiles[i], stats),
+            }
+            for i, (pid, name) in enumerate(players)
+        ],
+    }
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CoachConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'coach'
+
+    def ready(self):
+        from . import archive, checkin, deletion, images, signals  # noqa: F401  (registers signal receivers and job handlers)
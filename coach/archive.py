@@ -0,0 +1,229 @@
+"""
+Cold storage for archived teams.
+
+archive_team() moves a team's events, games, attendance and stats out of the
+hot tables into a single compressed TeamArchive blob, so the indexes scanned by
+the dashboard and team pages only cover live seasons. The team, its roster and
+its denormalized counters stay in place. The stat edit history of the archived
+games travels with them, so restoring keeps it intact. rehydrate() turns the
+blob back into read-only model instances for viewing; restore_team() puts the
+rows back. Games of other teams filed against an archived event lose that
+link while the event is archived; the archive remembers it for the restore.
+"""
+import json
+import zlib
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from . import changelog, revisions
+from .counters import reconcile
+from .deletion import purge_team_history
+from .jobs import enqueue, job
+from .models import (
+    Attendance, ChangeLog, Event, Game, Opponent, Player, PlayerStat, PlayerStatRevision, Season, Team, TeamArchive,
+)
+from .responses import dumps
+
+# Restore order matters: events before games (Game.event), both before attendance/stats
+SECTIONS = (
+    ("events", Event, "team"),
+    ("games", Game, "team"),
+    ("attendance", Attendance, "event__team"),
+    ("player_stats", PlayerStat, "game__team"),
+    # Revisions keep plain game ids rather than a foreign key; see _team_rows()
+    ("stat_revisions", PlayerStatRevision, None),
+)
+# What team pages show of an archived team
+VIEW_SECTIONS = SECTIONS[:4]
+HISTORY_TIMEOUT = 60 * 60 * 24  # Keyed on team.cache_key, so this only bounds memory use
+
+
+def _columns(model):
+    return [f.attname for f in model._meta.concrete_fields]
+
+
+def _team_rows(model, team_path, team):
+    if team_path is None:
+        return model.objects.filter(game_id__in=Game.objects.filter(team=team).values("id"))
+    return model.objects.filter(**{team_path: team})
+
+
+def _decode(archive):
+    return json.loads(zlib.decompress(bytes(archive.payload)))
+
+
+def _log_games(game_ids):
+    """Change log entries and a cache bump for games whose event link was changed with update()"""
+    by_owner = defaultdict(list)
+    for game_id, coach_id, team_id in Game.objects.filter(id__in=game_ids).values_list("id", "coach_id", "team_id"):
+        by_owner[coach_id, team_id].append(game_id)
+    for (coach_id, team_id), ids in by_owner.items():
+        changelog.record_many(Game, ids, coach_id, team_id)
+    Team.objects.filter(id__in={team_id for _, team_id in by_owner}).update(cache_version=F("cache_version") + 1)
+
+
+def archive_team(team_id):
+    """Compact a team's history into its TeamArchive; returns the number of rows moved"""
+    with transaction.atomic():
+        team = Team.objects.select_for_update().get(id=team_id)
+        existing = TeamArchive.objects.filter(team=team).first()
+        data = _decode(existing) if existing else {name: [] for name, _, _ in SECTIONS}
+
+        moved = 0
+        for name, model, team_path in SECTIONS:
+            rows = list(_team_rows(model, team_path, team).order_by("pk").values(*_columns(model)))
+            data.setdefault(name, []).extend(rows)
+            moved += len(rows)
+        if not moved:
+            return 0
+        # Purging the events detaches other teams' games from them; remember those links
+        linked = list(Game.objects.filter(event__team=team).exclude(team=team).values_list("id", "event_id"))
+        data.setdefault("linked_games", []).extend(linked)
+
+        payload = zlib.compress(dumps(data), 9)
+        row_counts = {name: len(data[name]) for name, _, _ in SECTIONS}
+        TeamArchive.objects.update_or_create(
+            team=team,
+            defaults={"season": team.season or "", "payload": payload, "row_counts": row_counts},
+        )
+        purge_team_history(team.id)
+        _log_games([game_id for game_id, _ in linked])
+        Team.objects.filter(id=team.id).update(cache_version=F("cache_version") + 1)
+        changelog.record_team(team.id, ChangeLog.RESET)
+    return moved
+
+
+def _rehydrate(data, sections):
+    history = {}
+    for name, model, _ in sections:
+        fields = [model._meta.get_field(column) for column in _columns(model)]
+        instances = []
+        for row in data.get(name, []):
+            instance = model(**{f.attname: f.to_python(row.get(f.attname)) for f in fields})
+            instance._state.adding = False
+            instances.append(instance)
+        history[name] = instances
+    return history
+
+
+def rehydrate(archive, sections=SECTIONS):
+    """Archived rows as unsaved, read-only model instances keyed by section"""
+    return _rehydrate(_decode(archive), sections)
+
+
+def load_history(team):
+    """Rehydrated events, games, attendance and stats of `team`, or None when nothing is archived"""
+    key = f"archive:history:{team.cache_key}"
+    history = cache.get(key)
+    if history is None:
+        stored = TeamArchive.objects.filter(team=team).first()
+        # Cache "nothing archived" too, as an empty dict
+        history = rehydrate(stored, VIEW_SECTIONS) if stored else {}
+        cache.set(key, history, HISTORY_TIMEOUT)
+    return history or None
+
+
+def _insert_raw(model, instances, batch_size=500):
+    """
+    INSERT rows verbatim. bulk_create() would run pre_save() and overwrite the
+    archived created_at/recorded_at timestamps with the current time.
+    """
+    fields = model._meta.concrete_fields
+    for start in range(0, len(instances), batch_size):
+        model._base_manager._insert(instances[start:start + batch_size], fields=fields, raw=True)
+
+
+def restore_team(team_id):
+    """Move archived rows back into the hot tables and drop the archive"""
+    with transaction.atomic():
+        team = Team.objects.select_for_update().get(id=team_id)
+        archive = TeamArchive.objects.filter(team=team).first()
+        if archive is None:
+            return 0
+        data = _decode(archive)
+        history = _rehydrate(data, SECTIONS)
+
+        # Players removed since archiving take their rows with them; dangling nullable FKs are cleared
+        player_ids = set(Player.objects.filter(team=team).values_list("id", flat=True))
+        recorders = {a.recorded_by_id for a in history["attendance"]}
+        editors = {r.editor_id for r in history["stat_revisions"]}
+        user_ids = set(User.objects.filter(id__in=recorders | editors).values_list("id", flat=True))
+        for attendance in history["attendance"]:
+            if attendance.recorded_by_id not in user_ids:
+                attendance.recorded_by_id = None
+        for revision in history["stat_revisions"]:
+            if revision.editor_id not in user_ids:
+                revision.editor_id = None
+        season_ids = set(Season.objects.filter(team=team).values_list("id", flat=True))
+        opponent_ids = set(Opponent.objects.filter(team=team).values_list("id", flat=True))
+        for row in history["events"] + history["games"]:
+            if row.season_id not in season_ids:
+                row.season_id = None
+            if row.opponent_ref_id not in opponent_ids:
+                row.opponent_ref_id = None
+        event_ids = {e.id for e in history["events"]}
+        for game in history["games"]:
+            if game.event_id not in event_ids:
+                game.event_id = None
+        # Archives written before the partition keys existed lack them
+        event_dates = {e.id: e.date for e in history["events"]}
+        game_dates = {g.id: g.date for g in history["games"]}
+        for attendance in history["attendance"]:
+            attendance.event_date = attendance.event_date or event_dates.get(attendance.event_id)
+        for stat in history["player_stats"]:
+            stat.game_date = stat.game_date or game_dates.get(stat.game_id)
+            stat.version = stat.version or 1
+        history["attendance"] = [a for a in history["attendance"] if a.player_id in player_ids]
+        history["player_stats"] = [s for s in history["player_stats"] if s.player_id in player_ids]
+
+        restored = 0
+        for name, model, _ in SECTIONS:
+            _insert_raw(model, history[name])
+            restored += len(history[name])
+        archive.delete()
+        # Relink other teams' games, unless their coach filed them elsewhere meanwhile
+        games_by_event = defaultdict(list)
+        for game_id, event_id in data.get("linked_games", []):
+            if event_id in event_ids:
+                games_by_event[event_id].append(game_id)
+        relinked = []
+        for event_id, game_ids in games_by_event.items():
+            detached = list(Game.objects.filter(id__in=game_ids, event__isnull=True).values_list("id", flat=True))
+            Game.objects.filter(id__in=detached).update(event_id=event_id)
+            relinked += detached
+        _log_games(relinked)
+        # Archives written before the edit history was archived start over from a snapshot
+        covered = {revision.stat_id for revision in history["stat_revisions"]}
+        PlayerStatRevision.objects.bulk_create(
+            revisions.snapshot_of(stat) for stat in history["player_stats"] if stat.id not in covered
+        )
+        # Raw inserts skip signals; recount and bump the cache version
+        reconcile(Team.objects.filter(id=team.id))
+        Team.objects.filter(id=team.id).update(cache_version=F("cache_version") + 1)
+        changelog.record_team(team.id, ChangeLog.RESET)
+    return restored
+
+
+@job("archive_team")
+def archive_team_job(team_id):
+    # The coach may have reactivated the team while the job was queued
+    if not Team.objects.filter(id=team_id, status="Archived").exists():
+        return {"archived": 0}
+    return {"archived": archive_team(team_id)}
+
+
+@job("restore_team")
+def restore_team_job(team_id):
+    return {"restored": restore_team(team_id)}
+
+
+def schedule_status_change(team, previous_status, user=None):
+    """Archive history when a team is archived, bring it back when it is reactivated"""
+    if team.status == "Archived":
+        enqueue("archive_team", {"team_id": team.id}, priority=-5, user=user)
+    elif previous_status == "Archived":
+        enqueue("restore_team", {"team_id": team.id}, priority=5, user=user)
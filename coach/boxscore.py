@@ -0,0 +1,121 @@
+"""
+Merging concurrent box score edits.
+
+Every write to a PlayerStat row bumps its version. save_rows() merges each
+player's submitted stats into the current row. It commits with
+UPDATE ... WHERE version = <the version it merged against> and retries when
+another editor got there first, so no lock is held across editors.
+
+An editor sends the `version` it loaded and `base`, the values it started
+from. A submission made against an older version still keeps every field
+nobody else changed in between. Only fields that both editors changed, to
+different values, come back as conflicts together with the current row.
+Submissions without a version (older clients) overwrite the row.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import changelog, revisions
+from .models import Player, PlayerStat, PLAYER_STAT_EDIT_FIELDS
+from .signals import bump_team_version
+
+MAX_ATTEMPTS = 5
+
+
+def _clean(values):
+    """Submitted values converted to the column types; raises ValueError on unknown fields"""
+    unknown = set(values) - set(PLAYER_STAT_EDIT_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown stat field(s): {', '.join(sorted(unknown))}")
+    return {name: PlayerStat._meta.get_field(name).to_python(value) for name, value in values.items()}
+
+
+def _merge(current, values, base, version):
+    """(changes to write, conflicting fields) for `values` submitted against `version`"""
+    if version is None or version == current['version']:
+        return {f: v for f, v in values.items() if current[f] != v}, []
+    changes, conflicts = {}, []
+    for field, value in values.items():
+        theirs = current[field]
+        if value == theirs:
+            continue
+        if field in base:
+            if base[field] == value:
+                # This editor left the field as loaded
+                continue
+            if base[field] == theirs:
+                # Nobody else touched it since the editor loaded the row
+                changes[field] = value
+                continue
+        conflicts.append(field)
+    return changes, conflicts
+
+
+def save_row(game, player_id, submitted, editor=None):
+    """
+    Merge one player's submitted stats. Returns (current row as a dict,
+    conflicting field names, id of the row if it was written); conflicting
+    fields keep their stored value. Writes skip the model signals, so the
+    caller logs the written ids and bumps the team's cache version.
+    """
+    submitted = dict(submitted)
+    version = submitted.pop('version', None)
+    base = _clean(submitted.pop('base', None) or {})
+    values = _clean(submitted)
+    rows = PlayerStat.objects.filter(game=game, game_date=game.date, player_id=player_id)
+
+    for _ in range(MAX_ATTEMPTS):
+        current = rows.values('id', 'version', *PLAYER_STAT_EDIT_FIELDS).first()
+        if current is None:
+            try:
+                with transaction.atomic():
+                    [row] = PlayerStat.objects.bulk_create(
+                        [PlayerStat(game=game, game_date=game.date, player_id=player_id, **values)]
+                    )
+            except IntegrityError:
+                # Another editor created it first; merge against theirs
+                continue
+            revisions.record_created(row, editor)
+            current = {'id': row.id, 'version': row.version, **{f: getattr(row, f) for f in PLAYER_STAT_EDIT_FIELDS}}
+            return current, [], row.id
+
+        changes, conflicts = _merge(current, values, base, version)
+        if not changes:
+            return current, conflicts, None
+        updated = rows.filter(version=current['version']).update(
+            **changes, version=F('version') + 1, updated_at=timezone.now(),
+        )
+        if updated:
+            revisions.record_change(current['id'], game.id, player_id, changes, current['version'] + 1, editor)
+            return {**current, **changes, 'version': current['version'] + 1}, conflicts, current['id']
+        # Lost the race to another editor: merge again against the new row
+
+    current = rows.values('id', 'version', *PLAYER_STAT_EDIT_FIELDS).first()
+    return current, sorted(values), None
+
+
+def save_rows(game, stats_by_player, editor=None):
+    """
+    Save {player_id: {field: value, 'version': n, 'base': {...}}} for the
+    game's roster. Returns ({player_id: version}, [conflict, ...]).
+    """
+    roster = set(Player.objects.filter(team_id=game.team_id).values_list('id', flat=True))
+    versions, conflicts, written = {}, [], []
+    for player_id, submitted in stats_by_player.items():
+        try:
+            player_id = int(player_id)
+        except ValueError:
+            continue
+        if player_id not in roster:
+            continue
+        row, conflicting, written_id = save_row(game, player_id, submitted, editor)
+        versions[player_id] = row['version']
+        if written_id is not None:
+            written.append(written_id)
+        if conflicting:
+            conflicts.append({'player_id': player_id, 'fields': conflicting, 'current': row})
+    # One change log insert and one cache bump for the whole box score
+    changelog.record_many(PlayerStat, written, game.coach_id, game.team_id)
+    bump_team_version(id=game.team_id)
+    return versions, conflicts
@@ -0,0 +1,216 @@
+"""
+Change log behind the delta sync API.
+
+coach.signals appends one ChangeLog entry per saved or deleted Team, Player,
+Event, Attendance, Game and PlayerStat. Bulk code paths that bypass signals
+(archiving, season relinking, rollover) record a team RESET instead.
+changes_since() turns the entries after a cursor into the current rows of
+whatever changed, so a client cache stays current with small fetches.
+
+Ids are handed out when an entry is inserted but become visible when its
+transaction commits, so a lower id can show up after a higher one was
+served. Entries younger than SYNC_SAFETY_LAG_SECONDS are therefore held
+back, together with everything after them; transactions that log changes
+must finish within that lag (long jobs log theirs just before committing).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max, Min, Q, Subquery
+from django.utils import timezone
+
+from .models import Attendance, ChangeLog, Event, Game, Player, PlayerStat, Team
+
+PAGE_SIZE = 500
+
+# label -> (model, coach lookup, team lookup)
+MODELS = {
+    'team': (Team, 'coach_id', 'id'),
+    'player': (Player, 'coach_id', 'team_id'),
+    'event': (Event, 'coach_id', 'team_id'),
+    'game': (Game, 'coach_id', 'team_id'),
+    'attendance': (Attendance, 'event__coach_id', 'event__team_id'),
+    'playerstat': (PlayerStat, 'game__coach_id', 'game__team_id'),
+}
+LABELS = {model: label for label, (model, _, _) in MODELS.items()}
+
+# Attendance and stats take their owner from the parent event/game
+PARENTS = {Attendance: 'event', PlayerStat: 'game'}
+# Internal columns: partition-key copies of the parent's date and the cache version
+SKIPPED_FIELDS = {'event_date', 'game_date', 'cache_version', 'deleted_at'}
+
+
+def sync_fields(model):
+    return [f.attname for f in model._meta.concrete_fields if f.name not in SKIPPED_FIELDS]
+
+
+def _owner(instance):
+    """(coach_id, team_id) of `instance`; subqueries when the parent row is not loaded"""
+    if isinstance(instance, Team):
+        return instance.coach_id, instance.id
+    parent_field = PARENTS.get(type(instance))
+    if parent_field is None:
+        return instance.coach_id, instance.team_id
+    parent = instance._state.fields_cache.get(parent_field)
+    if parent is not None:
+        return parent.coach_id, parent.team_id
+    parent_model = instance._meta.get_field(parent_field).related_model
+    rows = parent_model._base_manager.filter(id=getattr(instance, f'{parent_field}_id'))
+    return Subquery(rows.values('coach_id')[:1]), Subquery(rows.values('team_id')[:1])
+
+
+def record(instance, action=ChangeLog.UPSERT):
+    coach_id, team_id = _owner(instance)
+    ChangeLog.objects.create(
+        coach_id=coach_id, team_id=team_id, model=LABELS[type(instance)], object_id=instance.pk, action=action,
+    )
+
+
+def record_many(model, ids, coach_id, team_id, action=ChangeLog.UPSERT):
+    """One entry per id, for rows written with bulk_create()/update()"""
+    ChangeLog.objects.bulk_create(
+        ChangeLog(coach_id=coach_id, team_id=team_id, model=LABELS[model], object_id=object_id, action=action)
+        for object_id in ids
+    )
+
+
+def record_team(team_id, action=ChangeLog.UPSERT):
+    """An entry for the team itself; RESET makes clients refetch all of its rows"""
+    coach_id = Team.all_objects.filter(id=team_id).values_list('coach_id', flat=True).first()
+    if coach_id is not None:
+        ChangeLog.objects.create(coach_id=coach_id, team_id=team_id, model='team', object_id=team_id, action=action)
+
+
+def _payload(coach_id, cursor, more, upserts, deletes, resets):
+    fields, changes = {}, {}
+    for label, (model, coach_lookup, team_lookup) in MODELS.items():
+        rows = []
+        if upserts[label] or resets:
+            wanted = Q(id__in=upserts[label]) | Q(**{f'{team_lookup}__in': resets})
+            rows = list(model.objects.filter(wanted, **{coach_lookup: coach_id}).values_list(*sync_fields(model)))
+        # Rows that were upserted but are gone by now (deleted, or soft-deleted teams) count as deletes
+        gone = deletes[label] | (upserts[label] - {row[0] for row in rows})
+        if rows or gone:
+            fields[label] = sync_fields(model)
+            changes[label] = {'rows': rows, 'deleted': sorted(gone)}
+    return {
+        'cursor': cursor,
+        'more': more,
+        'full': False,
+        'reset_teams': sorted(resets),
+        'fields': fields,
+        'changes': changes,
+    }
+
+
+def _held_back(coach_id, since):
+    """Lowest entry id after `since` still inside the safety lag, or None"""
+    cutoff = timezone.now() - timedelta(seconds=settings.SYNC_SAFETY_LAG_SECONDS)
+    young = ChangeLog.objects.filter(coach_id=coach_id, id__gt=since, created_at__gt=cutoff)
+    return young.aggregate(first=Min('id'))['first']
+
+
+def _snapshot_cursor(coach_id):
+    """Change log cursor a snapshot starting now is current as of"""
+    held_back = _held_back(coach_id, 0)
+    if held_back is not None:
+        return held_back - 1
+    return ChangeLog.objects.filter(coach_id=coach_id).aggregate(latest=Max('id'))['latest'] or 0
+
+
+def snapshot(coach_id, cursor=None, label=None, after=0, limit=PAGE_SIZE):
+    """
+    One page of every synced row of the coach, in (model, id) order. The
+    first page (no cursor) has full=True: the client replaces its cache with
+    it. Later pages resume after row `after` of `label`. Changes made while
+    paging are sent again by the deltas after the first page's cursor.
+    """
+    first_page = cursor is None
+    if first_page:
+        # Read the cursor before any rows, so nothing changed meanwhile is missed
+        cursor = _snapshot_cursor(coach_id)
+    hidden = list(Team.all_objects.filter(coach_id=coach_id, deleted_at__isnull=False).values_list('id', flat=True))
+    labels = list(MODELS)
+    fields, changes, remaining, resume = {}, {}, limit, None
+    for label in labels[labels.index(label) if label else 0:]:
+        model, coach_lookup, team_lookup = MODELS[label]
+        queryset = (
+            model.objects.filter(**{coach_lookup: coach_id}, id__gt=after)
+            .exclude(**{f'{team_lookup}__in': hidden})
+            .order_by('id')
+        )
+        fields[label] = sync_fields(model)
+        rows = list(queryset.values_list(*fields[label])[:remaining])
+        changes[label] = {'rows': rows, 'deleted': []}
+        remaining -= len(rows)
+        after = 0
+        if not remaining and rows:
+            resume = (label, rows[-1][0])
+            break
+    return {
+        # Echoed back as ?since= like any cursor; a plain number once the snapshot is complete
+        'cursor': f"{cursor}:{resume[0]}:{resume[1]}" if resume else cursor,
+        'more': resume is not None,
+        'full': first_page,
+        'reset_teams': [],
+        'fields': fields,
+        'changes': changes,
+    }
+
+
+def parse_cursor(value):
+    """(change log cursor, snapshot label, snapshot after) of a ?since= value; raises ValueError"""
+    parts = (value or '0').split(':')
+    if len(parts) == 1 and parts[0].isdigit():
+        return int(parts[0]), None, 0
+    if len(parts) == 3 and parts[0].isdigit() and parts[1] in MODELS and parts[2].isdigit():
+        return int(parts[0]), parts[1], int(parts[2])
+    raise ValueError(f"Invalid cursor: {value}")
+
+
+def changes_since(coach_id, since=0, limit=PAGE_SIZE, label=None, after=0):
+    """
+    Current rows of everything the coach changed after cursor `since`.
+    No cursor, or one older than the retained log, starts a paged full
+    snapshot; `label`/`after` continue one. `more` asks the client to fetch
+    again with the returned cursor.
+    """
+    if label is not None:
+        return snapshot(coach_id, since, label, after, limit)
+    oldest = ChangeLog.objects.aggregate(oldest=Min('id'))['oldest']
+    if not since or (oldest is not None and since < oldest - 1):
+        return snapshot(coach_id, limit=limit)
+
+    entries = ChangeLog.objects.filter(coach_id=coach_id, id__gt=since)
+    held_back = _held_back(coach_id, since)
+    if held_back is not None:
+        entries = entries.filter(id__lt=held_back)
+    entries = list(
+        entries.order_by('id').values_list('id', 'model', 'object_id', 'team_id', 'action')[:limit + 1]
+    )
+    more = len(entries) > limit
+    entries = entries[:limit]
+
+    latest, resets = {}, set()
+    upserts = {label: set() for label in MODELS}
+    deletes = {label: set() for label in MODELS}
+    for _, label, object_id, team_id, action in entries:
+        if action == ChangeLog.RESET:
+            resets.add(object_id)
+            continue
+        latest[(label, object_id)] = action
+        if team_id is not None:
+            # Child changes move the team's denormalized counters
+            upserts['team'].add(team_id)
+    for (label, object_id), action in latest.items():
+        (upserts if action == ChangeLog.UPSERT else deletes)[label].add(object_id)
+    upserts['team'] -= deletes['team']
+
+    cursor = entries[-1][0] if entries else since
+    return _payload(coach_id, cursor, more, upserts, deletes, resets)
+
+
+def prune(older_than):
+    cutoff = timezone.now() - older_than
+    deleted, _ = ChangeLog.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
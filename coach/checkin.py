@@ -0,0 +1,159 @@
+"""
+Player self check-in through a per-event QR link.
+
+A scan inserts one CheckInScan row; the unique (event, player) key drops
+repeat scans. The first new scan of a window also inserts the event's
+CheckInFlush row and schedules a `flush_checkins` job
+CHECKIN_FLUSH_INTERVAL_MS ahead; while that row exists, later scans fail
+its primary key and queue nothing, so a scan never has to look for queued
+jobs. The job deletes the row before reading the scans, which makes the next
+scan schedule a fresh flush, then upserts every unflushed scan into
+Attendance with a fixed handful of queries. A few hundred players scanning at
+practice start cost two indexed inserts each and a few bulk writes to
+Attendance instead of one transaction each. Scans are stored in the database
+rather than the cache, so any worker can flush them and nothing is lost to
+cache eviction. The per-player cache marker only spares repeat scans a query.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import changelog
+from .jobs import enqueue, job
+from .models import Attendance, CheckInFlush, CheckInScan, Event, Player
+from .signals import bump_team_version
+
+SALT = 'coach.checkin'
+ROSTER_TIMEOUT = 60
+SEEN_TIMEOUT = 60 * 60 * 24
+# Check-in stays open this many days either side of the event date (time zone slack)
+OPEN_DAYS = 1
+
+CHECKED_IN = 'checked_in'
+ALREADY_CHECKED_IN = 'already_checked_in'
+UNKNOWN_PLAYER = 'unknown_player'
+
+
+def make_token(event):
+    return signing.dumps(event.id, salt=SALT)
+
+
+def read_token(token):
+    """Event id of a check-in token, or None when it does not verify"""
+    try:
+        return signing.loads(token, salt=SALT)
+    except signing.BadSignature:
+        return None
+
+
+def _seen_key(event_id, player_id):
+    return f"checkin:seen:{event_id}:{player_id}"
+
+
+def roster(event_id):
+    """Cached event details and roster for the check-in page; None if the event is gone"""
+    key = f"checkin:roster:{event_id}"
+    entry = cache.get(key)
+    if entry is None:
+        event = Event.objects.select_related('team').filter(id=event_id).first()
+        if event is None or event.team.deleted_at is not None:
+            return None
+        players = list(
+            Player.objects.filter(team_id=event.team_id)
+            .order_by('last_name', 'first_name')
+            .values_list('id', 'name', 'jersey_number')
+        )
+        entry = {
+            'event_id': event.id,
+            'team_id': event.team_id,
+            'title': event.title,
+            'date': event.date,
+            'team_name': event.team.name,
+            'players': players,
+            'player_ids': {player_id for player_id, _, _ in players},
+        }
+        cache.set(key, entry, ROSTER_TIMEOUT)
+    return entry
+
+
+def is_open(entry):
+    return abs((timezone.localdate() - entry['date']).days) <= OPEN_DAYS
+
+
+def check_in(entry, player_id):
+    """Record one scan; returns CHECKED_IN, ALREADY_CHECKED_IN or UNKNOWN_PLAYER"""
+    if player_id not in entry['player_ids']:
+        return UNKNOWN_PLAYER
+    event_id = entry['event_id']
+    seen_key = _seen_key(event_id, player_id)
+    if cache.get(seen_key):
+        return ALREADY_CHECKED_IN
+    try:
+        with transaction.atomic():
+            CheckInScan.objects.create(event_id=event_id, player_id=player_id)
+        created = True
+    except IntegrityError:
+        created = False
+    cache.set(seen_key, True, SEEN_TIMEOUT)
+    if not created:
+        return ALREADY_CHECKED_IN
+    _schedule_flush(event_id)
+    return CHECKED_IN
+
+
+def _schedule_flush(event_id):
+    """Queue the event's flush unless its CheckInFlush row says one is pending"""
+    try:
+        # Row and job commit together, so a row never outlives a failed enqueue
+        with transaction.atomic():
+            CheckInFlush.objects.create(event_id=event_id)
+            enqueue(
+                "flush_checkins", {"event_id": event_id},
+                priority=10, delay=timedelta(milliseconds=settings.CHECKIN_FLUSH_INTERVAL_MS),
+            )
+    except IntegrityError:
+        pass
+
+
+@job("flush_checkins")
+def flush_checkins(event_id):
+    """Mark every unflushed check-in of the event present in one bulk upsert"""
+    event = Event.objects.filter(id=event_id).only('id', 'date', 'coach_id', 'team_id').first()
+    # Scans from here on schedule the next flush
+    CheckInFlush.objects.filter(event_id=event_id).delete()
+    if event is None:
+        return {'checked_in': 0}
+
+    scans = list(
+        CheckInScan.objects.filter(event_id=event_id, flushed_at__isnull=True)
+        .values_list('id', 'player_id', 'player__team_id')
+    )
+    # Players who left the team since scanning are dropped
+    scanned = [player_id for _, player_id, team_id in scans if team_id == event.team_id]
+    rows = Attendance.objects.filter(event_id=event_id, event_date=event.date)
+    done = set(rows.filter(present=True, player_id__in=scanned).values_list('player_id', flat=True))
+    pending = [player_id for player_id in scanned if player_id not in done]
+
+    with transaction.atomic():
+        if pending:
+            # Insert the missing rows, then flip existing absent ones; no ON CONFLICT target needed,
+            # which keeps this working on the partitioned Postgres table
+            Attendance.objects.bulk_create(
+                [Attendance(event_id=event_id, player_id=pid, event_date=event.date, present=True) for pid in pending],
+                ignore_conflicts=True,
+            )
+            rows.filter(player_id__in=pending, present=False).update(present=True, recorded_at=timezone.now())
+            # Bulk writes skip the signals that log changes and invalidate caches
+            ids = list(rows.filter(player_id__in=pending).values_list('id', flat=True))
+            changelog.record_many(Attendance, ids, event.coach_id, event.team_id)
+            bump_team_version(id=event.team_id)
+        CheckInScan.objects.filter(id__in=[scan_id for scan_id, _, _ in scans]).update(flushed_at=timezone.now())
+        # Scans of closed events are only kept to answer repeat scans
+        CheckInScan.objects.filter(
+            flushed_at__isnull=False, event__date__lt=timezone.localdate() - timedelta(days=OPEN_DAYS + 1),
+        ).delete()
+    return {'checked_in': len(pending)}
@@ -0,0 +1,51 @@
+"""
+Recounting the denormalized Team counters.
+
+coach.signals keeps player_count, event_count, wins and losses current with
+F() deltas. reconcile() recounts them from the source rows for code paths that
+bypass signals (archive restores, bulk imports) and for
+`manage.py reconcile_team_counters`.
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from . import changelog
+from .models import Event, Game, Player, Team
+
+COUNTERS = ("player_count", "event_count", "wins", "losses")
+
+
+def _count(model, **filters):
+    rows = (
+        model.objects.filter(team=OuterRef("pk"), **filters)
+        .order_by().values("team").annotate(n=Count("id")).values("n")
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+
+def _actual_counts():
+    return {
+        "player_count": _count(Player),
+        "event_count": _count(Event),
+        "wins": _count(Game, is_win=True),
+        "losses": _count(Game, is_win=False),
+    }
+
+
+def reconcile(teams=None):
+    """Recount the denormalized Team counters from source rows; returns the number of teams fixed"""
+    teams = Team.objects.all() if teams is None else teams
+    # Archived history lives in TeamArchive blobs; their counters keep the pre-archive totals
+    teams = teams.filter(archive__isnull=True)
+    actual = teams.annotate(**{f"actual_{field}": expr for field, expr in _actual_counts().items()})
+    drifted = Q()
+    for field in COUNTERS:
+        drifted |= ~Q(**{field: F(f"actual_{field}")})
+
+    drifted_ids = list(actual.filter(drifted).values_list("id", flat=True))
+    if drifted_ids:
+        # Recount inside the UPDATE itself so concurrent writes are not overwritten with stale numbers
+        Team.objects.filter(id__in=drifted_ids).update(cache_version=F("cache_version") + 1, **_actual_counts())
+        for team_id in drifted_ids:
+            changelog.record_team(team_id)
+    return len(drifted_ids)
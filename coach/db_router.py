@@ -0,0 +1,59 @@
+"""
+Optional read-replica routing.
+
+Views wrapped in @read_from_replica send their reads to the "replica" database
+(configured by DATABASE_REPLICA_URL) on GET/HEAD. After a client performs a
+successful write, ReplicaPinningMiddleware sets a short-lived cookie that keeps
+that client's reads on the primary so it always sees its own changes.
+"""
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+REPLICA = "replica"
+PIN_COOKIE = "db_pin"
+
+_use_replica = ContextVar("use_replica", default=False)
+
+# Never read these from a lagging replica
+PRIMARY_ONLY_APPS = {"sessions", "contenttypes"}
+
+
+def replica_enabled():
+    return REPLICA in settings.DATABASES
+
+
+def is_pinned(request):
+    return PIN_COOKIE in request.COOKIES
+
+
+def read_from_replica(view):
+    """Route the view's reads to the replica unless the client recently wrote"""
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD") or not replica_enabled() or is_pinned(request):
+            return view(request, *args, **kwargs)
+        token = _use_replica.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+    return wrapped
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            return REPLICA
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
@@ -0,0 +1,107 @@
+"""
+Set-based team deletion.
+
+`team.delete()` makes Django's collector load every related Player, Event,
+Attendance, Game and PlayerStat so it can fire signals and cascade in Python.
+purge_team() instead issues one DELETE per table in dependency order inside a
+single transaction. Signals are skipped on purpose: the team and everything
+counted against it disappear together.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import changelog
+from .jobs import enqueue, job
+from .models import (
+    Attendance, ChangeLog, CheckInFlush, CheckInScan, Event, Game, Opponent, Player, PlayerStat, PlayerStatRevision,
+    Season, Team, TeamArchive,
+)
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def _history_statements():
+    """(sql, param count) pairs removing a team's events, games, attendance and stats"""
+    event, game = _table(Event), _table(Game)
+    events_of_team = f"SELECT id FROM {event} WHERE team_id = %s"
+    games_of_team = f"SELECT id FROM {game} WHERE team_id = %s"
+    return [
+        (f"DELETE FROM {_table(PlayerStatRevision)} WHERE game_id IN ({games_of_team})", 1),
+        (f"DELETE FROM {_table(PlayerStat)} WHERE game_id IN ({games_of_team})", 1),
+        (f"DELETE FROM {_table(Attendance)} WHERE event_id IN ({events_of_team})", 1),
+        (f"DELETE FROM {_table(CheckInScan)} WHERE event_id IN ({events_of_team})", 1),
+        (f"DELETE FROM {_table(CheckInFlush)} WHERE event_id IN ({events_of_team})", 1),
+        (f"DELETE FROM {game} WHERE team_id = %s", 1),
+        # Game.event is SET_NULL: detach games of other teams that point at this team's events
+        (f"UPDATE {game} SET event_id = NULL WHERE event_id IN ({events_of_team})", 1),
+        (f"DELETE FROM {event} WHERE team_id = %s", 1),
+    ]
+
+
+def _purge_statements():
+    """History first, then whatever still references the roster, then the team itself"""
+    player = _table(Player)
+    players_of_team = f"SELECT id FROM {player} WHERE team_id = %s"
+    return _history_statements() + [
+        (f"DELETE FROM {_table(PlayerStatRevision)} WHERE player_id IN ({players_of_team})", 1),
+        (f"DELETE FROM {_table(PlayerStat)} WHERE player_id IN ({players_of_team})", 1),
+        (f"DELETE FROM {_table(Attendance)} WHERE player_id IN ({players_of_team})", 1),
+        (f"DELETE FROM {_table(CheckInScan)} WHERE player_id IN ({players_of_team})", 1),
+        (f"DELETE FROM {player} WHERE team_id = %s", 1),
+        (f"DELETE FROM {_table(TeamArchive)} WHERE team_id = %s", 1),
+        (f"DELETE FROM {_table(Season)} WHERE team_id = %s", 1),
+        (f"DELETE FROM {_table(Opponent)} WHERE team_id = %s", 1),
+        (f"DELETE FROM {_table(Team)} WHERE id = %s", 1),
+    ]
+
+
+def _execute(statements, team_id):
+    deleted = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        for sql, params in statements:
+            cursor.execute(sql, [team_id] * params)
+            if sql.startswith("DELETE"):
+                deleted += cursor.rowcount
+    return deleted
+
+
+def purge_team(team_id):
+    """Delete a team and all of its rows without loading them; returns rows deleted"""
+    return _execute(_purge_statements(), team_id)
+
+
+def purge_team_history(team_id):
+    """Drop a team's events, games, attendance and stats but keep the team and roster"""
+    return _execute(_history_statements(), team_id)
+
+
+def estimated_rows(team):
+    """Rough size of a team's cascade from its denormalized counters"""
+    return team.player_count * (team.event_count + 1) + team.event_count + team.wins + team.losses
+
+
+@job("purge_team")
+def purge_team_job(team_id):
+    # Only teams that were soft-deleted; a stray job must never remove a live team
+    if not Team.all_objects.filter(id=team_id, deleted_at__isnull=False).exists():
+        return {"deleted": 0}
+    return {"deleted": purge_team(team_id)}
+
+
+def delete_team(team, user=None):
+    """
+    Delete `team` now, or hide it and queue a background purge when it is
+    larger than TEAM_DELETE_BACKGROUND_ROWS. Returns True if deferred.
+    """
+    # Logged first: the entry needs the team row to find its coach
+    changelog.record_team(team.id, ChangeLog.DELETE)
+    if estimated_rows(team) <= settings.TEAM_DELETE_BACKGROUND_ROWS:
+        purge_team(team.id)
+        return False
+    with transaction.atomic():
+        Team.all_objects.filter(id=team.id).update(deleted_at=timezone.now())
+        enqueue("purge_team", {"team_id": team.id}, priority=-5, user=user)
+    return True
@@ -0,0 +1,157 @@
+import hashlib
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .jobs import enqueue, job
+from .models import CoachProfile
+
+logger = logging.getLogger(__name__)
+
+# Longest edge of the stored master image
+MAX_DIMENSION = 1024
+# Square avatar sizes rendered by the templates (1x and 2x of the displayed sizes)
+THUMBNAIL_SIZES = (64, 128, 256)
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+
+def _encode(image, fmt):
+    """Encode without any EXIF/ICC/XMP metadata"""
+    buf = io.BytesIO()
+    if fmt == "JPEG":
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(buf, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    elif fmt == "WEBP":
+        image.save(buf, "WEBP", quality=WEBP_QUALITY, method=6)
+    else:
+        image.save(buf, "PNG", optimize=True)
+    return buf.getvalue()
+
+
+def _hashed_name(directory, stem, data, ext):
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    return f"{directory}/{stem}.{digest}.{ext}"
+
+
+def _save_hashed(storage, directory, stem, data, ext):
+    """
+    Store `data` under its content-hashed name and return the stored name.
+    Identical content is already there under that name; saving it again would
+    get a collision suffix that media.HASHED_NAME_RE no longer recognizes.
+    """
+    name = _hashed_name(directory, stem, data, ext)
+    if storage.exists(name):
+        return name
+    return storage.save(name, ContentFile(data))
+
+
+def picture_files(profile):
+    """Storage names of the profile's current picture and all of its variants"""
+    names = {name for formats in (profile.profile_picture_variants or {}).values() for name in formats.values()}
+    if profile.profile_picture:
+        names.add(profile.profile_picture.name)
+    return names
+
+
+def _delete_files(storage, names):
+    for name in names:
+        try:
+            storage.delete(name)
+        except OSError:
+            logger.warning("Could not delete stale profile picture %s", name)
+
+
+def build_variants(source):
+    """
+    Decode `source`, drop metadata, cap its size and return
+    (master_bytes, master_ext, {size: {"webp": bytes, "jpg"/"png": bytes}}).
+    """
+    with Image.open(source) as img:
+        img = ImageOps.exif_transpose(img)
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        img = img.convert("RGBA" if has_alpha else "RGB")
+
+    fallback_fmt, fallback_ext = ("PNG", "png") if has_alpha else ("JPEG", "jpg")
+
+    master = img.copy()
+    master.thumbnail((MAX_DIMENSION, MAX_DIMENSION), Image.LANCZOS)
+
+    thumbs = {}
+    for size in THUMBNAIL_SIZES:
+        thumb = ImageOps.fit(master, (size, size), Image.LANCZOS)
+        thumbs[size] = {
+            "webp": _encode(thumb, "WEBP"),
+            fallback_ext: _encode(thumb, fallback_fmt),
+        }
+    return _encode(master, fallback_fmt), fallback_ext, thumbs
+
+
+@job("process_profile_picture")
+def process_profile_picture(profile_id, replaced=()):
+    """
+    Replace a coach's uploaded picture with a cleaned master plus thumbnails.
+    `replaced` names the files of the picture the upload superseded.
+    """
+    storage = CoachProfile._meta.get_field("profile_picture").storage
+    profile = CoachProfile.objects.filter(id=profile_id).first()
+    if not profile or not profile.profile_picture:
+        _delete_files(storage, replaced)
+        return
+
+    field = profile.profile_picture
+    original_name = field.name
+    directory = os.path.dirname(original_name) or "profile_pictures"
+    stem = f"coach-{profile.user_id}"
+
+    with storage.open(original_name, "rb") as fh:
+        master_bytes, ext, thumbs = build_variants(fh)
+
+    master_name = _save_hashed(storage, directory, stem, master_bytes, ext)
+    variants = {}
+    for size, encoded in thumbs.items():
+        variants[str(size)] = {
+            fmt: _save_hashed(storage, f"{directory}/thumbs", f"{stem}-{size}", data, fmt)
+            for fmt, data in encoded.items()
+        }
+
+    new_names = {master_name} | {name for formats in variants.values() for name in formats.values()}
+
+    # Only swap in the new files if the coach hasn't uploaded another picture meanwhile
+    updated = CoachProfile.objects.filter(id=profile.id, profile_picture=original_name).update(
+        profile_picture=master_name,
+        profile_picture_variants=variants,
+    )
+    if updated:
+        # A re-upload of the same picture hashes to the names it replaces; keep those
+        stale = (picture_files(profile) | set(replaced)) - new_names
+    else:
+        current = CoachProfile.objects.filter(id=profile.id).first()
+        stale = (new_names - (picture_files(current) if current else set())) | set(replaced)
+    _delete_files(storage, stale)
+
+
+def schedule_profile_picture_processing(profile, replaced=()):
+    """Queue the picture for the background worker; `replaced` files are deleted once it is done"""
+    enqueue(
+        "process_profile_picture", {"profile_id": profile.id, "replaced": sorted(replaced)},
+        priority=5, user=profile.user,
+    )
+
+
+def pick_variant(profile, size, fmt="webp"):
+    """URL of the smallest variant covering `size` pixels, or the original"""
+    if not profile or not profile.profile_picture:
+        return ""
+    variants = profile.profile_picture_variants or {}
+    storage = profile.profile_picture.storage
+    for available in sorted(int(s) for s in variants):
+        if available >= size:
+            formats = variants[str(available)]
+            name = formats.get(fmt) or next(iter(formats.values()))
+            return storage.url(name)
+    return profile.profile_picture.url
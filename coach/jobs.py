@@ -0,0 +1,171 @@
+"""
+Database-backed background jobs.
+
+Register a handler with @job("name") and queue work with enqueue("name", {...}).
+Handlers receive the JSON payload and may return a JSON-serializable result.
+`python manage.py run_jobs` claims and runs queued jobs; on Postgres several
+workers can run side by side thanks to SELECT ... FOR UPDATE SKIP LOCKED.
+While a handler runs, a heartbeat thread keeps refreshing the job's
+locked_at, so only jobs whose worker died look stale to requeue_stale().
+"""
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def job(name):
+    """Decorator registering a job handler under `name`"""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, priority=0, user=None, max_attempts=3, delay=None):
+    """
+    Queue a job and return its Job row. The row is written in the caller's
+    transaction, so workers only see it if that commits; eager jobs run
+    after the commit.
+    """
+    if name not in _registry:
+        raise ValueError(f"Unknown job: {name}")
+    run_after = timezone.now() + (delay or timedelta())
+    queued = Job.objects.create(
+        name=name,
+        payload=payload or {},
+        priority=priority,
+        created_by=user,
+        max_attempts=max_attempts,
+        run_after=run_after,
+    )
+    if settings.JOBS_RUN_EAGERLY:
+        transaction.on_commit(lambda: run_job(queued.id))
+    return queued
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_next(worker_id):
+    """Atomically mark the next runnable job as running and return it (or None)"""
+    now = timezone.now()
+    runnable = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).order_by('-priority', 'run_after', 'id')
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            picked = runnable.select_for_update(skip_locked=True).first()
+            if picked is None:
+                return None
+            Job.objects.filter(id=picked.id).update(
+                status=Job.RUNNING, locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1,
+            )
+    else:
+        # SQLite: no row locks, so claim with a conditional UPDATE and retry on a lost race
+        while True:
+            picked = runnable.first()
+            if picked is None:
+                return None
+            claimed = Job.objects.filter(id=picked.id, status=Job.QUEUED).update(
+                status=Job.RUNNING, locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1,
+            )
+            if claimed:
+                break
+
+    picked.refresh_from_db()
+    return picked
+
+
+def run_job(job_or_id, worker_id=None):
+    """Run a claimed (or, when called eagerly, still queued) job and record the outcome"""
+    current = job_or_id if isinstance(job_or_id, Job) else Job.objects.get(id=job_or_id)
+    if current.status == Job.QUEUED:
+        Job.objects.filter(id=current.id).update(
+            status=Job.RUNNING, locked_by=worker_id or default_worker_id(),
+            locked_at=timezone.now(), attempts=F('attempts') + 1,
+        )
+        current.refresh_from_db()
+
+    handler = _registry.get(current.name)
+    stop = _start_heartbeat(current.id)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job '{current.name}'")
+        result = handler(**current.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception("Job %s failed (attempt %s/%s)", current.id, current.attempts, current.max_attempts)
+        if current.attempts < current.max_attempts:
+            # Exponential backoff: 30s, 60s, 120s, ...
+            backoff = timedelta(seconds=settings.JOBS_RETRY_BASE_DELAY * 2 ** (current.attempts - 1))
+            Job.objects.filter(id=current.id).update(
+                status=Job.QUEUED, run_after=timezone.now() + backoff,
+                locked_by='', locked_at=None, last_error=error, updated_at=timezone.now(),
+            )
+        else:
+            Job.objects.filter(id=current.id).update(
+                status=Job.FAILED, locked_by='', locked_at=None, last_error=error, updated_at=timezone.now(),
+            )
+        return False
+    finally:
+        stop.set()
+
+    Job.objects.filter(id=current.id).update(
+        status=Job.DONE, result=result, locked_by='', locked_at=None, updated_at=timezone.now(),
+    )
+    return True
+
+
+def _start_heartbeat(job_id):
+    """Refresh the running job's locked_at until the returned event is set"""
+    stop = threading.Event()
+    interval = settings.JOBS_STALE_AFTER / 3
+
+    def beat():
+        try:
+            while not stop.wait(interval):
+                try:
+                    Job.objects.filter(id=job_id, status=Job.RUNNING).update(locked_at=timezone.now())
+                except Exception:
+                    # A missed beat only matters if the next ones fail too
+                    logger.exception("Heartbeat of job %s failed", job_id)
+        finally:
+            close_old_connections()
+
+    threading.Thread(target=beat, name=f"job-{job_id}-heartbeat", daemon=True).start()
+    return stop
+
+
+def requeue_stale(timeout):
+    """
+    Put back jobs whose worker died mid-run (no heartbeat within `timeout`);
+    jobs that used up their attempts are failed instead. Returns (requeued, failed).
+    """
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=timezone.now() - timeout)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, locked_by='', locked_at=None,
+        last_error='Worker stopped responding', updated_at=timezone.now(),
+    )
+    requeued = stale.update(status=Job.QUEUED, locked_by='', locked_at=None, updated_at=timezone.now())
+    return requeued, failed
+
+
+def purge_finished(older_than):
+    """Delete jobs that finished successfully more than `older_than` ago"""
+    cutoff = timezone.now() - older_than
+    deleted, _ = Job.objects.filter(status=Job.DONE, updated_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,164 @@
+"""
+Live stat entry: single-stat increments pushed to viewers over Server-Sent Events.
+
+apply_delta() bumps one PlayerStat column with an F() expression, so two
+scorers tapping at once both land without reading the row first. After the
+transaction commits, the new value is published on the game's channel.
+stream() is the async generator behind the SSE response. It is only served
+through ASGI (the Procfile runs uvicorn on team_mgmt.asgi), where an open
+stream costs no worker thread; under WSGI the view answers 503 rather than pin
+a worker for the whole game.
+
+Channels use Redis pub/sub when REDIS_URL is set and reach every process.
+Without Redis they are in-process queues, enough for a single dev server.
+Messages carry the new absolute value, so applying one twice is harmless.
+Clients should refetch event_stats when the EventSource (re)connects.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+try:
+    import redis
+    import redis.asyncio as redis_async
+except ImportError:  # pragma: no cover - redis is only needed with REDIS_URL
+    redis = redis_async = None
+
+from . import changelog, revisions
+from .models import PlayerStat
+from .signals import bump_team_version
+
+PING = b": ping\n\n"
+
+
+class StatRowGone(Exception):
+    """The stat row was deleted while a delta was being applied to it"""
+
+_local_subscribers = defaultdict(set)
+_local_lock = threading.Lock()
+
+
+def _channel(game_id):
+    return f"live:game:{game_id}"
+
+
+@lru_cache(maxsize=None)
+def _redis():
+    return redis.Redis.from_url(settings.REDIS_URL)
+
+
+def publish(game_id, message):
+    data = json.dumps(message, cls=DjangoJSONEncoder)
+    if settings.REDIS_URL:
+        _redis().publish(_channel(game_id), data)
+        return
+    with _local_lock:
+        subscribers = list(_local_subscribers.get(game_id, ()))
+    for loop, queue in subscribers:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, data)
+        except RuntimeError:
+            # The subscriber's event loop has shut down
+            pass
+
+
+def apply_delta(game, player_id, stat, delta, user=None):
+    """Add `delta` to one stat of a player (never below 0); returns the new value"""
+    rows = PlayerStat.objects.filter(game=game, game_date=game.date, player_id=player_id)
+    change = {
+        stat: Greatest(Coalesce(F(stat), Value(0)) + delta, Value(0)),
+        'version': F('version') + 1,
+        'updated_at': timezone.now(),
+    }
+    with transaction.atomic():
+        updated = rows.update(**change)
+        if not updated:
+            try:
+                with transaction.atomic():
+                    # First action for this player; save() signals log the row and bump the team
+                    row = PlayerStat.objects.create(game=game, player_id=player_id, **{stat: max(delta, 0)})
+                revisions.record_created(row, user)
+                value = getattr(row, stat)
+            except IntegrityError:
+                # Another scorer created it first
+                updated = rows.update(**change)
+                if not updated:
+                    # ...and it was deleted again before this update reached it
+                    raise StatRowGone(f"Stat row of player {player_id} in game {game.id} was deleted")
+        if updated:
+            # update() skips the signals that log changes and invalidate caches
+            stat_id, value, version = rows.values_list('id', stat, 'version').get()
+            changelog.record_many(PlayerStat, [stat_id], game.coach_id, game.team_id)
+            revisions.record_change(stat_id, game.id, player_id, {stat: value}, version, user)
+            bump_team_version(id=game.team_id)
+        message = {
+            'game_id': game.id,
+            'player_id': player_id,
+            'stat': stat,
+            'value': value,
+            'delta': delta,
+            'by': user.username if user else None,
+            'at': timezone.now(),
+        }
+        transaction.on_commit(lambda: publish(game.id, message))
+    return value
+
+
+def _event(data):
+    if isinstance(data, bytes):
+        data = data.decode()
+    return f"event: stat\ndata: {data}\n\n".encode()
+
+
+async def _redis_stream(game_id, heartbeat):
+    client = redis_async.from_url(settings.REDIS_URL)
+    pubsub = client.pubsub()
+    await pubsub.subscribe(_channel(game_id))
+    try:
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=heartbeat)
+            yield _event(message['data']) if message else PING
+    finally:
+        await pubsub.aclose()
+        await client.aclose()
+
+
+async def _local_stream(game_id, heartbeat):
+    subscriber = (asyncio.get_running_loop(), asyncio.Queue())
+    with _local_lock:
+        _local_subscribers[game_id].add(subscriber)
+    try:
+        while True:
+            try:
+                data = await asyncio.wait_for(subscriber[1].get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield PING
+            else:
+                yield _event(data)
+    finally:
+        with _local_lock:
+            _local_subscribers[game_id].discard(subscriber)
+            if not _local_subscribers[game_id]:
+                del _local_subscribers[game_id]
+
+
+async def stream(game_id):
+    """SSE bytes for one game; comment pings keep proxies from timing the connection out"""
+    heartbeat = settings.LIVE_STATS_HEARTBEAT_SECONDS
+    yield b"retry: 3000\n\n"
+    messages = _redis_stream(game_id, heartbeat) if settings.REDIS_URL else _local_stream(game_id, heartbeat)
+    try:
+        async for chunk in messages:
+            yield chunk
+    finally:
+        # Unsubscribe as soon as the client goes away
+        await messages.aclose()
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from coach.archive import archive_team, restore_team
+from coach.models import Team
+
+
+class Command(BaseCommand):
+    help = "Mark every team of a season as Archived and move its history into cold storage."
+
+    def add_arguments(self, parser):
+        parser.add_argument("season", help="Team.season value, e.g. 'Fall 2024'")
+        parser.add_argument("--coach", help="Only teams of this username")
+        parser.add_argument("--restore", action="store_true", help="Bring archived history back into the live tables")
+        parser.add_argument("--dry-run", action="store_true", help="List the teams without changing anything")
+
+    def handle(self, *args, **opts):
+        teams = Team.objects.filter(season=opts["season"])
+        if opts["coach"]:
+            teams = teams.filter(coach__username=opts["coach"])
+        if opts["restore"]:
+            teams = teams.filter(archive__isnull=False)
+        if not teams.exists():
+            raise CommandError(f"No teams found for season '{opts['season']}'")
+
+        total = 0
+        selected = list(teams.order_by("id"))
+        for team in selected:
+            if opts["dry_run"]:
+                self.stdout.write(f"Would {'restore' if opts['restore'] else 'archive'} {team} (#{team.id})")
+                continue
+            if opts["restore"]:
+                rows = restore_team(team.id)
+                Team.objects.filter(id=team.id).update(status="Active")
+            else:
+                Team.objects.filter(id=team.id).update(status="Archived")
+                rows = archive_team(team.id)
+            total += rows
+            self.stdout.write(f"{team} (#{team.id}): {rows} rows")
+
+        verb = "Restored" if opts["restore"] else "Archived"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {total} rows across {len(selected)} team(s)"))
@@ -0,0 +1,117 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time as dtime
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from coach import checkin, jobs
+from coach.models import Attendance, ChangeLog, CoachProfile, Event, Job, Player, Team
+from coach.views import event_checkin
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire a burst of concurrent QR check-ins (including repeat scans) at a seeded event, "
+        "drain the flush jobs and report throughput and database work. The seeded data is deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--players", type=int, default=300)
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--repeat", type=float, default=0.5, help="Extra scans as a fraction of players")
+
+    def handle(self, *args, **opts):
+        user, event, player_ids = self._seed(opts["players"])
+        user_id = user.id
+        started = timezone.now()
+        try:
+            self._run(event, player_ids, opts)
+        finally:
+            Job.objects.filter(name="flush_checkins", created_at__gte=started).delete()
+            with transaction.atomic():
+                user.delete()
+                # Written by the delete signals of the cascaded rows
+                ChangeLog.objects.filter(coach_id=user_id).delete()
+
+    def _seed(self, count):
+        user = User.objects.create_user(username=f"bench-{random.randint(0, 10**9)}", password="x")
+        CoachProfile.objects.create(user=user, sport="Basketball")
+        team = Team.objects.create(name="Check-in Bench", coach=user, sport="Basketball")
+        players = Player.objects.bulk_create(
+            Player(coach=user, team=team, name=f"Player {i}", first_name="Player", last_name=str(i), jersey_number=str(i))
+            for i in range(count)
+        )
+        event = Event.objects.create(
+            coach=user, team=team, title="Practice", event_type="Practice",
+            date=timezone.localdate(), time=dtime(18, 0), location="Gym",
+        )
+        return user, event, [p.id for p in players]
+
+    def _run(self, event, player_ids, opts):
+        token = checkin.make_token(event)
+        url = reverse("event_checkin", args=[token])
+        scans = player_ids + random.choices(player_ids, k=int(len(player_ids) * opts["repeat"]))
+        random.shuffle(scans)
+        cache.delete_many([f"checkin:seen:{event.id}:{pid}" for pid in player_ids])
+
+        factory = RequestFactory()
+        lock = threading.Lock()
+        scan_queries = [0]
+
+        def count_query(execute, sql, params, many, context):
+            with lock:
+                scan_queries[0] += 1
+            return execute(sql, params, many, context)
+
+        def scan(player_id):
+            with connection.execute_wrapper(count_query):
+                response = event_checkin(factory.post(url, {"player_id": player_id}), token)
+            return b"already checked in" not in response.content
+
+        def worker(chunk):
+            try:
+                return [scan(pid) for pid in chunk]
+            finally:
+                close_old_connections()
+
+        chunks = [scans[i::opts["threads"]] for i in range(opts["threads"])]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=opts["threads"]) as pool:
+            results = [r for chunk in pool.map(worker, chunks) for r in chunk]
+        elapsed = time.perf_counter() - start
+
+        # Stand in for `run_jobs`: wait out the flush window, then drain what the scans queued
+        time.sleep(settings.CHECKIN_FLUSH_INTERVAL_MS / 1000)
+        flushes = 0
+        with CaptureQueriesContext(connection) as flush_queries:
+            while (current := jobs.claim_next("benchmark")) is not None:
+                jobs.run_job(current, "benchmark")
+                flushes += 1
+
+        present = Attendance.objects.filter(event=event, present=True).count()
+        with CaptureQueriesContext(connection) as direct:
+            Attendance.objects.update_or_create(
+                event=event, player_id=player_ids[0], event_date=event.date, defaults={"present": True},
+            )
+
+        self.stdout.write(
+            f"{len(scans)} scans ({results.count(True)} new, {results.count(False)} repeats) from {opts['threads']} threads "
+            f"in {elapsed * 1000:.0f} ms: {len(scans) / elapsed:,.0f} scans/s"
+        )
+        self.stdout.write(f"Scan path: {scan_queries[0]} queries in total (roster load, one scan row each and flush scheduling)")
+        self.stdout.write(
+            f"Flushes: {flushes} queued job(s) run by this command, {len(flush_queries)} queries "
+            f"(eager jobs run inline: JOBS_RUN_EAGERLY={settings.JOBS_RUN_EAGERLY})"
+        )
+        self.stdout.write(f"Writing each scan directly would cost {len(direct) * len(scans)} queries")
+        self.stdout.write(f"Attendance present: {present}/{len(player_ids)}")
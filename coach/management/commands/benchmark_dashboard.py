@@ -0,0 +1,96 @@
+import random
+import time
+from datetime import date, time as dtime, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from coach.counters import reconcile
+from coach.models import Attendance, CoachProfile, Event, Player, Team
+from coach.views import coach_dashboard, team_detail
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Seed a large coach account (rolled back afterwards) and time dashboard/team detail renders cold vs. warm"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--teams", type=int, default=8)
+        parser.add_argument("--players", type=int, default=25, help="Players per team")
+        parser.add_argument("--events", type=int, default=80, help="Events per team")
+        parser.add_argument("--runs", type=int, default=5)
+
+    def handle(self, *args, **opts):
+        try:
+            with transaction.atomic():
+                user, team = self._seed(opts)
+                for tab in ("teams", "players", "schedule"):
+                    self._measure(f"dashboard:{tab}", coach_dashboard, user, opts["runs"], f"/?tab={tab}")
+                self._measure("team_detail", lambda req: team_detail(req, team.id), user, opts["runs"])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, opts):
+        user = User.objects.create_user(username=f"bench-{random.randint(0, 10**9)}", password="x")
+        CoachProfile.objects.create(user=user, sport="Basketball")
+        today = date.today()
+        for t in range(opts["teams"]):
+            team = Team.objects.create(name=f"Bench Team {t}", coach=user, sport="Basketball")
+            players = Player.objects.bulk_create(
+                Player(coach=user, team=team, name=f"P{t}-{i}", first_name=f"P{i}", last_name=f"T{t}", jersey_number=str(i))
+                for i in range(opts["players"])
+            )
+            events = Event.objects.bulk_create(
+                Event(
+                    coach=user, team=team, title=f"Event {i}",
+                    event_type="Game" if i % 3 == 0 else "Practice",
+                    date=today + timedelta(days=i - opts["events"] // 2), time=dtime(18, 0),
+                    location="Gym", opponent="Rivals",
+                )
+                for i in range(opts["events"])
+            )
+            Attendance.objects.bulk_create(
+                Attendance(event=e, player=p, present=random.random() < 0.8, event_date=e.date)
+                for e in events for p in players
+            )
+        # bulk_create skips the signals that maintain the Team counters
+        reconcile(Team.objects.filter(coach=user))
+        self.stdout.write(
+            f"Seeded {opts['teams']} teams x {opts['players']} players x {opts['events']} events "
+            f"({opts['teams'] * opts['players'] * opts['events']} attendance rows)"
+        )
+        return user, team
+
+    def _measure(self, label, view, user, runs, path="/"):
+        factory = RequestFactory()
+
+        def render_once():
+            request = factory.get(path)
+            request.user = user
+            request.session = {}
+            request._messages = []
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                view(request)
+                elapsed = time.perf_counter() - start
+            return elapsed, len(queries)
+
+        cold = []
+        for _ in range(runs):
+            cache.clear()
+            cold.append(render_once())
+        warm = [render_once() for _ in range(runs)]
+
+        def summary(samples):
+            best = min(samples)
+            return f"{best[0] * 1000:8.1f} ms, {best[1]:4d} queries"
+
+        self.stdout.write(f"{label:20s} cold: {summary(cold)} | warm: {summary(warm)}")
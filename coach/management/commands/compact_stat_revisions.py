@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from coach import revisions
+
+
+class Command(BaseCommand):
+    help = "Fold stat edit history older than the detail window into snapshots. Run from cron, e.g. weekly."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.STAT_REVISION_DETAIL_DAYS)
+
+    def handle(self, *args, **opts):
+        removed = revisions.compact(timedelta(days=opts["days"]))
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} stat revisions"))
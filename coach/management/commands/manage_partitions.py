@@ -0,0 +1,45 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from coach import partitioning
+
+
+class Command(BaseCommand):
+    help = (
+        "Maintain the yearly Attendance/PlayerStat partitions on Postgres: create upcoming years "
+        "and detach old ones. Run from cron, e.g. monthly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ahead", type=int, default=1, help="Years after the current one to pre-create")
+        parser.add_argument("--detach-before", type=int, help="Detach partitions for years before this one")
+        parser.add_argument("--drop", action="store_true", help="Drop detached partitions instead of keeping them")
+        parser.add_argument("--convert", action="store_true", help="Partition tables that are still plain tables")
+
+    def handle(self, *args, **opts):
+        if connection.vendor != "postgresql":
+            raise CommandError("Table partitioning is only available on Postgres")
+
+        this_year = date.today().year
+        for table in partitioning.TABLES:
+            with transaction.atomic():
+                if not partitioning.is_partitioned(connection, table):
+                    if not opts["convert"]:
+                        self.stdout.write(f"{table}: not partitioned (use --convert)")
+                        continue
+                    partitioning.convert(connection, table, years_ahead=opts["ahead"])
+                    self.stdout.write(f"{table}: converted to a partitioned table")
+
+                for year in range(this_year, this_year + opts["ahead"] + 1):
+                    if partitioning.create_partition(connection, table, year):
+                        self.stdout.write(f"{table}: created partition for {year}")
+
+                if opts["detach_before"]:
+                    for year in sorted(partitioning.existing_partitions(connection, table)):
+                        if year < opts["detach_before"]:
+                            partitioning.detach_partition(connection, table, year, drop=opts["drop"])
+                            self.stdout.write(f"{table}: {'dropped' if opts['drop'] else 'detached'} {year}")
+
+        self.stdout.write(self.style.SUCCESS("Partitions up to date"))
@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from coach import changelog
+
+
+class Command(BaseCommand):
+    help = "Delete delta sync change log entries past retention. Run from cron, e.g. daily."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.CHANGE_LOG_RETENTION_DAYS)
+
+    def handle(self, *args, **opts):
+        deleted = changelog.prune(timedelta(days=opts["days"]))
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} change log entries"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from coach.counters import reconcile
+from coach.models import Team
+
+
+class Command(BaseCommand):
+    help = "Repair drift in Team.player_count / event_count / wins / losses (e.g. after bulk imports)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--team", type=int, action="append", help="Only check these team ids")
+
+    def handle(self, *args, **opts):
+        teams = Team.objects.filter(id__in=opts["team"]) if opts["team"] else None
+        fixed = reconcile(teams)
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {fixed} team(s)"))
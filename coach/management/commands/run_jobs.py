@@ -0,0 +1,50 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from coach import jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (see coach.jobs). Start several on Postgres to scale out."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the queue and exit")
+        parser.add_argument("--sleep", type=float, default=1.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument("--worker-id", default=None)
+
+    def handle(self, *args, **opts):
+        worker_id = opts["worker_id"] or jobs.default_worker_id()
+        stale_after = timedelta(seconds=settings.JOBS_STALE_AFTER)
+        keep_done = timedelta(seconds=settings.JOBS_KEEP_DONE_FOR)
+        self.stdout.write(f"Worker {worker_id} started")
+
+        last_sweep = 0.0
+        while True:
+            close_old_connections()
+
+            if time.monotonic() - last_sweep > 60:
+                requeued, failed = jobs.requeue_stale(stale_after)
+                if requeued or failed:
+                    self.stdout.write(f"Requeued {requeued} and failed {failed} stale job(s)")
+                purged = jobs.purge_finished(keep_done)
+                if purged:
+                    self.stdout.write(f"Purged {purged} finished job(s)")
+                last_sweep = time.monotonic()
+
+            current = jobs.claim_next(worker_id)
+            if current is None:
+                if opts["once"]:
+                    return
+                time.sleep(opts["sleep"])
+                continue
+
+            started = time.monotonic()
+            ok = jobs.run_job(current, worker_id)
+            self.stdout.write(
+                f"{'done' if ok else 'FAILED'} {current.name} #{current.id} "
+                f"in {(time.monotonic() - started) * 1000:.0f} ms"
+            )
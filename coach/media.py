@@ -0,0 +1,160 @@
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+# Filenames carrying a content hash (e.g. avatar.3f9a1c2b7e.webp) never change,
+# so browsers may keep them forever.
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{8,}\.[A-Za-z0-9]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class _RangeFile:
+    """Read-only view of `length` bytes of an open file starting at `start`"""
+
+    def __init__(self, fileobj, start, length):
+        self.name = fileobj.name
+        self._file = fileobj
+        self._remaining = length
+        fileobj.seek(start)
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b""
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+def _etag_for(st):
+    return f'"{int(st.st_mtime):x}-{st.st_size:x}"'
+
+
+def _cache_control_for(path):
+    if HASHED_NAME_RE.search(path):
+        return IMMUTABLE_CACHE_CONTROL
+    return f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}"
+
+
+class _RangeNotSatisfiable(Exception):
+    pass
+
+
+def _parse_range(header, size):
+    """
+    (start, end) of a single byte range. None when the header is malformed or
+    asks for several ranges: it is ignored and the whole file is served.
+    Raises _RangeNotSatisfiable for a valid range that lies outside the file.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise _RangeNotSatisfiable
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise _RangeNotSatisfiable
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    date = parse_http_date_safe(if_range)
+    return date is not None and int(last_modified) <= date
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve an uploaded file, offloading to the proxy when one is configured"""
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+        st = os.stat(fullpath)
+    except (ValueError, OSError):
+        raise Http404("File not found")
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404("File not found")
+
+    etag = _etag_for(st)
+    last_modified = st.st_mtime
+    cache_control = _cache_control_for(path)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        not_modified["Cache-Control"] = cache_control
+        return not_modified
+
+    content_type = mimetypes.guess_type(fullpath)[0] or "application/octet-stream"
+
+    if settings.MEDIA_ACCEL_REDIRECT_PREFIX:
+        # nginx: internal location maps back onto MEDIA_ROOT and handles ranges
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + quote(path)
+    elif settings.MEDIA_USE_SENDFILE:
+        # Apache mod_xsendfile / lighttpd
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = fullpath
+    else:
+        response = _stream_file(request, fullpath, st, content_type, etag, last_modified)
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = cache_control
+    return response
+
+
+def _stream_file(request, fullpath, st, content_type, etag, last_modified):
+    size = st.st_size
+    range_header = request.headers.get("Range")
+
+    byte_range = None
+    if range_header and _if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = _parse_range(range_header, size)
+        except _RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    if byte_range is not None:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(
+            _RangeFile(open(fullpath, "rb"), start, length),
+            status=206,
+            content_type=content_type,
+        )
+        response["Content-Length"] = str(length)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    else:
+        response = FileResponse(open(fullpath, "rb"), content_type=content_type)
+
+    response["Accept-Ranges"] = "bytes"
+    return response
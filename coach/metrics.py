@@ -0,0 +1,101 @@
+"""
+Per-sport derived metrics as database expressions.
+
+Every metric is built from a term function, so the same definition works per
+row (one PlayerStat) and as a total over a group (ratio of sums, not average
+of ratios). Missing stats count as 0 via Coalesce, and ratios are NULL
+instead of a division error when the denominator is 0.
+
+    PlayerStat.objects.with_metrics('fg_pct').order_by('-fg_pct')
+    PlayerStat.objects.values('player_id').with_metric_totals('points', 'efg_pct')
+    PlayerStat.objects.filter(game__team=team).metric_summary('batting_average')
+"""
+from django.db.models import F, FloatField, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+
+def _row(field):
+    return Coalesce(F(field), Value(0))
+
+
+def _total(field):
+    return Coalesce(Sum(field), Value(0))
+
+
+def _ratio(numerator, denominator):
+    """numerator / denominator as a float; NULL when the denominator is 0"""
+    return Cast(numerator, FloatField()) / NullIf(Cast(denominator, FloatField()), Value(0.0))
+
+
+def _field_goals_made(t):
+    return t('two_pt_made') + t('three_pt_made')
+
+
+def _field_goals_attempted(t):
+    return t('two_pt_attempt') + t('three_pt_attempt')
+
+
+def _points(t):
+    return 2 * t('two_pt_made') + 3 * t('three_pt_made') + t('ft_made')
+
+
+# name -> (sport, builder taking a term function)
+METRICS = {
+    # Basketball
+    'points': ('Basketball', _points),
+    'fg_pct': ('Basketball', lambda t: _ratio(_field_goals_made(t), _field_goals_attempted(t))),
+    'three_pt_pct': ('Basketball', lambda t: _ratio(t('three_pt_made'), t('three_pt_attempt'))),
+    'ft_pct': ('Basketball', lambda t: _ratio(t('ft_made'), t('ft_attempt'))),
+    'efg_pct': ('Basketball', lambda t: _ratio(
+        _field_goals_made(t) + 0.5 * t('three_pt_made'), _field_goals_attempted(t),
+    )),
+    'ts_pct': ('Basketball', lambda t: _ratio(
+        _points(t), 2 * (_field_goals_attempted(t) + 0.44 * t('ft_attempt')),
+    )),
+    'assist_turnover_ratio': ('Basketball', lambda t: _ratio(t('assists'), t('turnovers'))),
+    # Football
+    'completion_pct': ('Football', lambda t: _ratio(t('pass_completions'), t('pass_attempts'))),
+    'yards_per_attempt': ('Football', lambda t: _ratio(t('passing_yards'), t('pass_attempts'))),
+    'yards_per_reception': ('Football', lambda t: _ratio(t('receiving_yards'), t('receptions'))),
+    'total_yards': ('Football', lambda t: t('passing_yards') + t('rushing_yards') + t('receiving_yards')),
+    # Soccer; save % treats the game's goals against as goals conceded by the keeper
+    'shot_accuracy': ('Soccer', lambda t: _ratio(t('shots_on_target'), t('shots'))),
+    'conversion_rate': ('Soccer', lambda t: _ratio(t('goals'), t('shots'))),
+    'save_pct': ('Soccer', lambda t: _ratio(t('saves'), t('saves') + t('game__points_against'))),
+    # Baseball; no HBP/sacrifice columns, so OBP is (H + BB) / (AB + BB)
+    'batting_average': ('Baseball', lambda t: _ratio(t('hits'), t('at_bats'))),
+    'obp': ('Baseball', lambda t: _ratio(t('hits') + t('walks'), t('at_bats') + t('walks'))),
+    'strikeout_rate': ('Baseball', lambda t: _ratio(t('strikeouts'), t('at_bats') + t('walks'))),
+    # Volleyball
+    'kill_pct': ('Volleyball', lambda t: _ratio(t('kills'), t('attacks'))),
+    'hitting_pct': ('Volleyball', lambda t: _ratio(t('kills') - t('errors'), t('attacks'))),
+    # Tennis
+    'winner_error_ratio': ('Tennis', lambda t: _ratio(t('winners'), t('unforced_errors'))),
+}
+
+
+def for_sport(sport):
+    """Names of the metrics that apply to `sport`"""
+    return [name for name, (metric_sport, _) in METRICS.items() if metric_sport == sport]
+
+
+def _expressions(names, term):
+    names = names or METRICS
+    unknown = [name for name in names if name not in METRICS]
+    if unknown:
+        raise ValueError(f"Unknown metric(s): {', '.join(unknown)}")
+    return {name: METRICS[name][1](term) for name in names}
+
+
+def row_expressions(names=()):
+    """{name: expression} over a single PlayerStat row"""
+    return _expressions(names, _row)
+
+
+def total_expressions(names=()):
+    """{name: aggregate expression} over a group of PlayerStat rows"""
+    return _expressions(names, _total)
+
+
+def total(name):
+    return total_expressions([name])[name]
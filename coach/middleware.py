@@ -0,0 +1,86 @@
+import gzip
+
+from django.conf import settings
+
+from .db_router import PIN_COOKIE, replica_enabled
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+re_accepts_br = _lazy_re_compile(r"\bbr\b")
+re_accepts_gzip = _lazy_re_compile(r"\bgzip\b")
+
+
+class JsonCompressionMiddleware:
+    """
+    Compress JSON responses above JSON_COMPRESS_MIN_SIZE bytes with brotli
+    (when installed and accepted) or gzip. HTML is left alone so pages carrying
+    CSRF tokens are not exposed to BREACH.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if (
+            response.streaming
+            or response.has_header("Content-Encoding")
+            or not response.get("Content-Type", "").startswith("application/json")
+            or len(response.content) < settings.JSON_COMPRESS_MIN_SIZE
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        accept = request.META.get("HTTP_ACCEPT_ENCODING", "")
+
+        if brotli is not None and re_accepts_br.search(accept):
+            content, encoding = brotli.compress(response.content, quality=5), "br"
+        elif re_accepts_gzip.search(accept):
+            content, encoding = gzip.compress(response.content, compresslevel=6, mtime=0), "gzip"
+        else:
+            return response
+
+        if len(content) >= len(response.content):
+            return response
+
+        response.content = content
+        response["Content-Length"] = str(len(content))
+        response["Content-Encoding"] = encoding
+
+        # The representation changed, so a strong ETag no longer applies
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
+
+
+class ReplicaPinningMiddleware:
+    """
+    After a successful write, keep the client's reads on the primary for
+    DATABASE_REPLICA_PIN_SECONDS so replica lag never hides its own changes.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            replica_enabled()
+            and request.method not in ("GET", "HEAD", "OPTIONS")
+            and response.status_code < 400
+        ):
+            response.set_cookie(
+                PIN_COOKIE, "1",
+                max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+                httponly=True,
+                secure=settings.SESSION_COOKIE_SECURE,
+                samesite="Lax",
+            )
+        return response
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0005_alter_event_options_alter_game_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coachprofile',
+            name='profile_picture_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0006_coachprofile_profile_picture_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='team',
+            name='cache_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
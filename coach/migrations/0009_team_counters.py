@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:35
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count(model, **filters):
+    rows = (
+        model.objects.filter(team=OuterRef('pk'), **filters)
+        .order_by().values('team').annotate(n=Count('id')).values('n')
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+
+def backfill_counters(apps, schema_editor):
+    Team = apps.get_model('coach', 'Team')
+    Team.objects.update(
+        player_count=_count(apps.get_model('coach', 'Player')),
+        event_count=_count(apps.get_model('coach', 'Event')),
+        wins=_count(apps.get_model('coach', 'Game'), is_win=True),
+        losses=_count(apps.get_model('coach', 'Game'), is_win=False),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0008_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='team',
+            name='event_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='losses',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='player_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='wins',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
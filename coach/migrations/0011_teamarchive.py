@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0010_team_deleted_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeamArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.CharField(blank=True, max_length=50)),
+                ('payload', models.BinaryField()),
+                ('row_counts', models.JSONField(default=dict)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('team', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='archive', to='coach.team')),
+            ],
+        ),
+    ]
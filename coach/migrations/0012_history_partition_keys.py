@@ -0,0 +1,32 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_partition_keys(apps, schema_editor):
+    Attendance = apps.get_model('coach', 'Attendance')
+    Event = apps.get_model('coach', 'Event')
+    PlayerStat = apps.get_model('coach', 'PlayerStat')
+    Game = apps.get_model('coach', 'Game')
+    Attendance.objects.update(event_date=Subquery(Event.objects.filter(id=OuterRef('event_id')).values('date')[:1]))
+    PlayerStat.objects.update(game_date=Subquery(Game.objects.filter(id=OuterRef('game_id')).values('date')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0011_teamarchive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='event_date',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='playerstat',
+            name='game_date',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_partition_keys, migrations.RunPython.noop),
+    ]
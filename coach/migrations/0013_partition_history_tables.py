@@ -0,0 +1,38 @@
+from django.db import migrations, models
+
+
+def partition_tables(apps, schema_editor):
+    from coach import partitioning
+
+    connection = schema_editor.connection
+    if not partitioning.enabled(connection):
+        return
+    for table in partitioning.TABLES:
+        if not partitioning.is_partitioned(connection, table):
+            partitioning.convert(connection, table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0012_history_partition_keys'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendance',
+            name='event_date',
+            field=models.DateField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='playerstat',
+            name='game_date',
+            field=models.DateField(editable=False),
+        ),
+        # Database only: the partitioned tables keep their columns and Django's constraint and
+        # index names (see coach.partitioning), so the model state stays as it is
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(partition_tables, migrations.RunPython.noop)],
+            state_operations=[],
+        ),
+    ]
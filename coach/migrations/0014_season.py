@@ -0,0 +1,75 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def seasons_from_existing_teams(apps, schema_editor):
+    """One open-ended season per team, named after Team.season and starting at its first event or game"""
+    Team = apps.get_model('coach', 'Team')
+    Season = apps.get_model('coach', 'Season')
+    Event = apps.get_model('coach', 'Event')
+    Game = apps.get_model('coach', 'Game')
+    for team in Team.objects.all().iterator():
+        events = Event.objects.filter(team=team).aggregate(first=Min('date'))
+        games = Game.objects.filter(team=team).aggregate(first=Min('date'))
+        firsts = [d for d in (events['first'], games['first']) if d]
+        start = min(firsts) if firsts else team.created_at.date()
+        # Left open so events scheduled after the migration still land in it
+        season = Season.objects.create(team=team, name=team.season or str(start.year), start_date=start)
+        Event.objects.filter(team=team).update(season=season)
+        Game.objects.filter(team=team).update(season=season)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0013_partition_history_tables'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Season',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seasons', to='coach.team')),
+            ],
+            options={
+                'ordering': ['-start_date'],
+            },
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='season',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='events', to='coach.season'),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='season',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='games', to='coach.season'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['season', 'date'], name='coach_event_season_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['season', 'date'], name='coach_game_season_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='season',
+            index=models.Index(fields=['team', 'start_date', 'end_date'], name='coach_season_team_dates_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='season',
+            constraint=models.CheckConstraint(condition=models.Q(('end_date__isnull', True), ('end_date__gte', models.F('start_date')), _connector='OR'), name='coach_season_dates_ordered'),
+        ),
+        migrations.RunPython(seasons_from_existing_teams, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.8 on 2026-10-19 12:47
+
+import django.db.models.deletion
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def _normalize(name):
+    return " ".join((name or "").split()).casefold()
+
+
+def backfill_opponents(apps, schema_editor):
+    """One Opponent per team and normalized name; the most common spelling becomes its display name"""
+    Opponent = apps.get_model('coach', 'Opponent')
+    Event = apps.get_model('coach', 'Event')
+    Game = apps.get_model('coach', 'Game')
+
+    spellings = {}
+    for model in (Event, Game):
+        rows = model.objects.exclude(opponent__isnull=True).exclude(opponent='').values_list('team_id', 'opponent')
+        for team_id, raw in rows.iterator():
+            key = _normalize(raw)
+            if key:
+                spellings.setdefault((team_id, key), Counter())[raw] += 1
+
+    for (team_id, key), counts in spellings.items():
+        display = " ".join(counts.most_common(1)[0][0].split())
+        opponent = Opponent.objects.create(team_id=team_id, name=display, normalized_name=key)
+        for model in (Event, Game):
+            model.objects.filter(team_id=team_id, opponent__in=list(counts)).update(opponent_ref=opponent)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0014_season'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='points_against',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='points_for',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='Opponent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('normalized_name', models.CharField(editable=False, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='opponents', to='coach.team')),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='opponent_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='events', to='coach.opponent'),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='opponent_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='games', to='coach.opponent'),
+        ),
+        migrations.AddConstraint(
+            model_name='opponent',
+            constraint=models.UniqueConstraint(fields=('team', 'normalized_name'), name='coach_opponent_team_name_uniq'),
+        ),
+        migrations.RunPython(backfill_opponents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0017_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='playerstat',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
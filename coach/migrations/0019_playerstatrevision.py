@@ -0,0 +1,61 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:19
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def snapshot_existing_stats(apps, schema_editor):
+    """A starting snapshot of every stat line, stamped with its last update"""
+    PlayerStat = apps.get_model('coach', 'PlayerStat')
+    PlayerStatRevision = apps.get_model('coach', 'PlayerStatRevision')
+    stat_fields = [
+        f for f in PlayerStat._meta.concrete_fields
+        if f.editable and not f.primary_key and not f.is_relation
+    ]
+
+    batch = []
+    for row in PlayerStat.objects.order_by('id').iterator(chunk_size=2000):
+        batch.append(PlayerStatRevision(
+            stat_id=row.id, game_id=row.game_id, player_id=row.player_id, kind='snapshot', version=row.version,
+            changes={
+                f.name: getattr(row, f.name) for f in stat_fields
+                if getattr(row, f.name) != f.get_default()
+            },
+            created_at=row.updated_at,
+        ))
+        if len(batch) >= 2000:
+            PlayerStatRevision.objects.bulk_create(batch)
+            batch = []
+    PlayerStatRevision.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0018_playerstat_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerStatRevision',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('stat_id', models.BigIntegerField()),
+                ('game_id', models.BigIntegerField()),
+                ('player_id', models.BigIntegerField()),
+                ('kind', models.CharField(choices=[('snapshot', 'Snapshot'), ('change', 'Change'), ('delete', 'Delete')], max_length=10)),
+                ('version', models.PositiveIntegerField()),
+                ('changes', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('editor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['game_id', 'id'], name='coach_statrev_game_idx'), models.Index(fields=['stat_id', 'id'], name='coach_statrev_stat_idx'), models.Index(fields=['created_at'], name='coach_statrev_created_idx')],
+            },
+        ),
+        migrations.RunPython(snapshot_existing_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def install_search(apps, schema_editor):
+    from coach import search
+
+    search.install(schema_editor.connection)
+
+
+def uninstall_search(apps, schema_editor):
+    from coach import search
+
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0019_playerstatrevision'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search, uninstall_search),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:32
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0020_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckInScan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scanned_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('flushed_at', models.DateTimeField(blank=True, null=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkin_scans', to='coach.event')),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkin_scans', to='coach.player')),
+            ],
+            options={
+                'unique_together': {('event', 'player')},
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:44
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coach', '0021_checkinscan'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckInFlush',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='coach.event')),
+                ('scheduled_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -1,5 +1,11 @@
+from datetime import date
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from . import metrics
 
 # ----------------------------
 # COACH PROFILE MODEL
@@ -28,14 +34,37 @@ class CoachProfile(models.Model):
     gender = models.CharField(max_length=10, choices=GENDER_CHOICES, null=True, blank=True)
     birthday = models.DateField(null=True, blank=True)
     profile_picture = models.ImageField(upload_to='profile_pictures/', null=True, blank=True)
+    # {"<size>": {"webp": <storage name>, "jpg"/"png": <storage name>}}, filled by coach.images
+    profile_picture_variants = models.JSONField(default=dict, blank=True)
 
     def __str__(self):
         return f"{self.user.username} - {self.sport}"
 
 
+class TracksLoadedValues:
+    """
+    Remembers the values of `tracked_fields` as loaded from the database so
+    signal handlers can tell what an update changed (see coach.signals).
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {f: instance.__dict__[f] for f in cls.tracked_fields if f in instance.__dict__}
+        return instance
+
+
 # ----------------------------
 # TEAM MODEL
 # ----------------------------
+class ActiveTeamManager(models.Manager):
+    """Hides teams that are soft-deleted and waiting for coach.deletion to purge them"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Team(models.Model):
     name = models.CharField(max_length=100)
     coach = models.ForeignKey(User, on_delete=models.CASCADE, related_name="teams")
@@ -53,6 +82,19 @@ class Team(models.Model):
     )
     location = models.CharField(max_length=255, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped by coach.signals whenever the team or its players/events/attendance/stats change
+    cache_version = models.PositiveIntegerField(default=0, editable=False)
+
+    # Denormalized counters maintained by coach.signals; `manage.py reconcile_team_counters` fixes drift
+    player_count = models.PositiveIntegerField(default=0, editable=False)
+    event_count = models.PositiveIntegerField(default=0, editable=False)
+    wins = models.PositiveIntegerField(default=0, editable=False)
+    losses = models.PositiveIntegerField(default=0, editable=False)
+    # Set when a large team is queued for background deletion
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = ActiveTeamManager()
+    all_objects = models.Manager()
 
     class Meta:
         ordering = ["-created_at"]
@@ -60,11 +102,116 @@ class Team(models.Model):
     def __str__(self):
         return self.name
 
+    @property
+    def cache_key(self):
+        """Template fragment cache key component for this team's data"""
+        return f"{self.id}.{self.cache_version}"
+
+    def reserve_roster_spot(self):
+        """
+        Atomically claim a roster spot, respecting max_players_allowed (0 = unlimited).
+        Returns False when the team is full. Pair with creating a Player that has
+        `_roster_spot_reserved = True` so the spot is not counted twice.
+        """
+        return bool(
+            Team.objects.filter(id=self.id)
+            .filter(models.Q(max_players_allowed__lte=0) | models.Q(player_count__lt=models.F('max_players_allowed')))
+            .update(player_count=models.F('player_count') + 1)
+        )
+
+
+# ----------------------------
+# SEASON MODEL
+# ----------------------------
+class SeasonQuerySet(models.QuerySet):
+    def covering(self, day):
+        return self.filter(models.Q(end_date__isnull=True) | models.Q(end_date__gte=day), start_date__lte=day)
+
+
+class Season(models.Model):
+    """A dated season of a team; events and games are linked to the season covering their date"""
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='seasons')
+    name = models.CharField(max_length=50)
+    start_date = models.DateField()
+    end_date = models.DateField(null=True, blank=True)  # None while the season is still running
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = SeasonQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['team', 'start_date', 'end_date'], name='coach_season_team_dates_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(end_date__isnull=True) | models.Q(end_date__gte=models.F('start_date')),
+                name='coach_season_dates_ordered',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.team} - {self.name}"
+
+    @property
+    def dates(self):
+        """(start, end) for __range lookups; an open-ended season runs up to date.max"""
+        return self.start_date, self.end_date or date.max
+
+    @classmethod
+    def for_date(cls, team_id, day):
+        """The team's season covering `day` (latest start wins on overlap), or None"""
+        if not team_id or not day:
+            return None
+        return cls.objects.filter(team_id=team_id).covering(day).order_by('-start_date').first()
+
+
+# ----------------------------
+# OPPONENT MODEL
+# ----------------------------
+def normalize_opponent_name(name):
+    """Case- and whitespace-insensitive key, so "Central  High" and "central high" match"""
+    return " ".join((name or "").split()).casefold()
+
+
+class Opponent(models.Model):
+    """A team's opponent; Event.opponent / Game.opponent keep the text as typed"""
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='opponents')
+    name = models.CharField(max_length=200)
+    normalized_name = models.CharField(max_length=200, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['team', 'normalized_name'], name='coach_opponent_team_name_uniq'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_opponent_name(self.name)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def resolve(cls, team_id, name):
+        """The team's Opponent for free-text `name`, created on first use; None for blank names"""
+        key = normalize_opponent_name(name)
+        if not team_id or not key:
+            return None
+        opponent, _ = cls.objects.get_or_create(
+            team_id=team_id, normalized_name=key, defaults={'name': " ".join(name.split())},
+        )
+        return opponent
+
 
 # ----------------------------
 # PLAYER MODEL
 # ----------------------------
-class Player(models.Model):
+class Player(TracksLoadedValues, models.Model):
+    tracked_fields = ('team_id',)
+
     coach = models.ForeignKey(User, on_delete=models.CASCADE)
     team = models.ForeignKey(Team, on_delete=models.CASCADE, null=True, blank=True)
     name = models.CharField(max_length=100)
@@ -95,7 +242,9 @@ class Player(models.Model):
 # ----------------------------
 # EVENT MODEL
 # ----------------------------
-class Event(models.Model):
+class Event(TracksLoadedValues, models.Model):
+    tracked_fields = ('team_id', 'date')
+
     EVENT_TYPES = [
         ('Game', 'Game'),
         ('Practice', 'Practice'),
@@ -109,15 +258,26 @@ class Event(models.Model):
     time = models.TimeField()
     location = models.CharField(max_length=200)
     opponent = models.CharField(max_length=200, blank=True, null=True)
+    opponent_ref = models.ForeignKey(Opponent, on_delete=models.SET_NULL, null=True, blank=True, related_name='events')
     notes = models.TextField(blank=True, null=True)
+    season = models.ForeignKey(Season, on_delete=models.SET_NULL, null=True, blank=True, related_name='events')
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-date', '-time']
+        indexes = [
+            models.Index(fields=['season', 'date'], name='coach_event_season_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.date}"
 
+    def save(self, *args, **kwargs):
+        # The season always follows the date, so moving an event re-links it
+        self.season = Season.for_date(self.team_id, self.date)
+        self.opponent_ref = Opponent.resolve(self.team_id, self.opponent)
+        super().save(*args, **kwargs)
+
 
 # ----------------------------
 # ATTENDANCE MODEL
@@ -128,29 +288,77 @@ class Attendance(models.Model):
     present = models.BooleanField(default=False)
     recorded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     recorded_at = models.DateTimeField(auto_now=True)
+    # Copy of event.date kept in step by coach.signals; the partition key on Postgres (see coach.partitioning)
+    event_date = models.DateField(editable=False)
 
     class Meta:
         unique_together = (('event', 'player'),)
 
+    def save(self, *args, **kwargs):
+        if self.event_date is None and self.event_id:
+            self.event_date = self.event.date
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.player.name} - {self.event.title}: {'Present' if self.present else 'Absent'}"
 
 
+# ----------------------------
+# CHECK-IN SCAN MODEL
+# ----------------------------
+class CheckInScan(models.Model):
+    """A QR self check-in waiting to be folded into Attendance (see coach.checkin)"""
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='checkin_scans')
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='checkin_scans')
+    scanned_at = models.DateTimeField(default=timezone.now)
+    flushed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = (('event', 'player'),)
+
+    def __str__(self):
+        return f"Check-in {self.player_id} @ {self.event_id}"
+
+
+class CheckInFlush(models.Model):
+    """Marks an event whose scans have a `flush_checkins` job queued; at most one per event"""
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    scheduled_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Check-in flush @ {self.event_id}"
+
+
 # ----------------------------
 # GAME MODEL
 # ----------------------------
-class Game(models.Model):
+class Game(TracksLoadedValues, models.Model):
+    tracked_fields = ('team_id', 'is_win', 'date')
+
     coach = models.ForeignKey(User, on_delete=models.CASCADE)
     team = models.ForeignKey(Team, on_delete=models.CASCADE)
     event = models.ForeignKey(Event, on_delete=models.SET_NULL, null=True, blank=True, related_name='games')
     title = models.CharField(max_length=255, blank=True, null=True)
     opponent = models.CharField(max_length=255, blank=True, null=True)
+    opponent_ref = models.ForeignKey(Opponent, on_delete=models.SET_NULL, null=True, blank=True, related_name='games')
     date = models.DateField()
     is_win = models.BooleanField(default=False)
+    # Final score, when the coach records it
+    points_for = models.PositiveIntegerField(null=True, blank=True)
+    points_against = models.PositiveIntegerField(null=True, blank=True)
+    season = models.ForeignKey(Season, on_delete=models.SET_NULL, null=True, blank=True, related_name='games')
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['season', 'date'], name='coach_game_season_date_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.season = Season.for_date(self.team_id, self.date)
+        self.opponent_ref = Opponent.resolve(self.team_id, self.opponent)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         result = "Win" if self.is_win else "Loss"
@@ -160,10 +368,28 @@ class Game(models.Model):
 # ----------------------------
 # PLAYER STAT MODEL
 # ----------------------------
+class PlayerStatQuerySet(models.QuerySet):
+    """Derived metrics (see coach.metrics) computed in SQL"""
+
+    def with_metrics(self, *names):
+        """Annotate each row with the named metrics (all of them by default)"""
+        return self.annotate(**metrics.row_expressions(names))
+
+    def with_metric_totals(self, *names):
+        """Per-group metrics for a values(...) queryset, e.g. one row per player"""
+        return self.annotate(**metrics.total_expressions(names))
+
+    def metric_summary(self, *names):
+        """The named metrics over the whole queryset as a dict"""
+        return self.aggregate(**metrics.total_expressions(names))
+
+
 class PlayerStat(models.Model):
     """Stores statistics for a player in a specific game - supports multiple sports"""
     game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='player_stats')
     player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='stats')
+    # Copy of game.date kept in step by coach.signals; the partition key on Postgres (see coach.partitioning)
+    game_date = models.DateField(editable=False)
 
     # Basketball stats
     two_pt_made = models.IntegerField(default=0, null=True, blank=True)
@@ -235,6 +461,10 @@ class PlayerStat(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Bumped by every write; concurrent editors merge against it (see coach.boxscore)
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    objects = PlayerStatQuerySet.as_manager()
 
     class Meta:
         unique_together = ('game', 'player')
@@ -243,10 +473,188 @@ class PlayerStat(models.Model):
     def __str__(self):
         return f"{self.player.name} - {self.game}"
 
+    def save(self, *args, **kwargs):
+        if self.game_date is None and self.game_id:
+            self.game_date = self.game.date
+        super().save(*args, **kwargs)
+
     def calculate_basketball_points(self):
-        """Calculate total points for basketball"""
+        """Calculate total points for basketball (in SQL: with_metrics('points'))"""
         return (
             (self.two_pt_made or 0) * 2 +
             (self.three_pt_made or 0) * 3 +
             (self.ft_made or 0)
-        )
\ No newline at end of file
+        )
+
+
+# Integer counting-stat columns of PlayerStat
+PLAYER_STAT_FIELDS = [
+    f.name for f in PlayerStat._meta.fields
+    if isinstance(f, models.IntegerField) and f.editable and not f.primary_key
+]
+
+# Every column an editor writes: the counting stats plus the decimal and text ones
+PLAYER_STAT_EDIT_FIELDS = [
+    f.name for f in PlayerStat._meta.concrete_fields
+    if f.editable and not f.primary_key and not f.is_relation
+]
+
+# ----------------------------
+# ARCHIVED SEASON MODEL
+# ----------------------------
+class TeamArchive(models.Model):
+    """
+    Cold storage for an archived team's events, games, attendance and stats:
+    one zlib-compressed JSON blob instead of rows in the hot tables (see coach.archive).
+    """
+    team = models.OneToOneField(Team, on_delete=models.CASCADE, related_name='archive')
+    season = models.CharField(max_length=50, blank=True)
+    payload = models.BinaryField()
+    row_counts = models.JSONField(default=dict)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archive of {self.team} ({self.season or 'no season'})"
+
+    @property
+    def size(self):
+        return len(self.payload)
+
+
+# ----------------------------
+# BACKGROUND JOB MODEL
+# ----------------------------
+class Job(models.Model):
+    """A unit of deferred work picked up by `manage.py run_jobs` (see coach.jobs)"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    priority = models.SmallIntegerField(default=0)  # Higher runs first
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Serves the worker's "next runnable job" query
+            models.Index(fields=['status', '-priority', 'run_after'], name='coach_job_pick_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
+
+
+# ----------------------------
+# CHANGE LOG MODEL
+# ----------------------------
+class ChangeLog(models.Model):
+    """
+    Append-only record of row changes; the id is the delta sync cursor (see coach.changelog).
+    RESET entries (model 'team') stand for bulk changes: the client refetches that team's rows.
+    """
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    RESET = 'reset'
+    ACTION_CHOICES = [
+        (UPSERT, 'Upsert'),
+        (DELETE, 'Delete'),
+        (RESET, 'Reset'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    coach = models.ForeignKey(User, on_delete=models.CASCADE, null=True, related_name='+')
+    # Plain column so entries outlive purged teams
+    team_id = models.IntegerField(null=True)
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['coach', 'id'], name='coach_changelog_cursor_idx'),
+            models.Index(fields=['created_at'], name='coach_changelog_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.action} {self.model} {self.object_id}"
+
+
+# ----------------------------
+# IDEMPOTENCY KEY MODEL
+# ----------------------------
+class IdempotencyKey(models.Model):
+    """Stored result of a batch operation; a retry with the same key gets it back instead of re-running"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    key = models.CharField(max_length=100)
+    operation = models.CharField(max_length=50)
+    # sha256 of the operation and its arguments, to reject a key reused for a different request
+    request_hash = models.CharField(max_length=64)
+    result = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='coach_idempotencykey_user_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.operation} {self.key}"
+
+
+# ----------------------------
+# STAT REVISION MODEL
+# ----------------------------
+class PlayerStatRevision(models.Model):
+    """
+    Append-only edit history of PlayerStat rows (see coach.revisions).
+    CHANGE holds only the fields a write changed, SNAPSHOT every non-default stat.
+    """
+    SNAPSHOT = 'snapshot'
+    CHANGE = 'change'
+    DELETE = 'delete'
+    KIND_CHOICES = [
+        (SNAPSHOT, 'Snapshot'),
+        (CHANGE, 'Change'),
+        (DELETE, 'Delete'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    # Plain columns: the history outlives deleted rows, and PlayerStat may be partitioned
+    stat_id = models.BigIntegerField()
+    game_id = models.BigIntegerField()
+    player_id = models.BigIntegerField()
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # PlayerStat.version after this revision
+    version = models.PositiveIntegerField()
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    editor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['game_id', 'id'], name='coach_statrev_game_idx'),
+            models.Index(fields=['stat_id', 'id'], name='coach_statrev_stat_idx'),
+            models.Index(fields=['created_at'], name='coach_statrev_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} stat {self.stat_id} v{self.version}"
@@ -0,0 +1,178 @@
+"""
+Yearly range partitioning of the append-mostly history tables on Postgres.
+
+Attendance is partitioned on event_date and PlayerStat on game_date (copies of
+the event/game date kept in step by coach.signals). Queries that filter on the
+key let the planner skip every other year. Turned on with
+PARTITION_HISTORY_TABLES; `manage.py manage_partitions` creates upcoming
+partitions and detaches old ones. Other databases keep the plain tables.
+
+The converted tables keep Django's constraint and index names, so migrations
+that add, alter or drop fields run unchanged. Changing their unique_together
+needs a hand-written migration, since the unique constraint includes the key.
+"""
+from datetime import date
+
+from django.conf import settings
+
+# Postgres requires the partition key in every unique constraint, so the
+# primary key becomes (id, key) and unique_together gains the key as well.
+# A foreign key from (parent id, key) to the parent's (id, date) that cascades
+# date changes makes the key a function of the parent row, so (event, player)
+# and (game, player) stay unique in fact.
+TABLES = {
+    "coach_attendance": {
+        "key": "event_date",
+        "unique": ("event_id", "player_id"),
+        "parent": ("event_id", "coach_event", "date"),
+    },
+    "coach_playerstat": {
+        "key": "game_date",
+        "unique": ("game_id", "player_id"),
+        "parent": ("game_id", "coach_game", "date"),
+    },
+}
+
+
+def enabled(connection):
+    return connection.vendor == "postgresql" and settings.PARTITION_HISTORY_TABLES
+
+
+def is_partitioned(connection, table):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [table])
+        return cursor.fetchone() is not None
+
+
+def partition_name(table, year):
+    return f"{table}_y{year}"
+
+
+def existing_partitions(connection, table):
+    """{year: partition name} for the yearly partitions currently attached to `table`"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s)",
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    prefix = f"{table}_y"
+    return {int(name[len(prefix):]): name for name in names if name.startswith(prefix)}
+
+
+def create_partition(connection, table, year, parent=None):
+    """
+    Add the partition for `year`, moving any rows that already landed in the
+    default partition so ATTACH does not fail. Returns False if it exists.
+    """
+    parent = parent or table
+    name = partition_name(table, year)
+    key = TABLES[table]["key"]
+    bounds = [date(year, 1, 1), date(year + 1, 1, 1)]
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [name])
+        if cursor.fetchone()[0] is not None:
+            return False
+        cursor.execute(f"CREATE TABLE {name} (LIKE {parent} INCLUDING DEFAULTS)")
+        cursor.execute(f"INSERT INTO {name} SELECT * FROM {table}_default WHERE {key} >= %s AND {key} < %s", bounds)
+        cursor.execute(f"DELETE FROM {table}_default WHERE {key} >= %s AND {key} < %s", bounds)
+        cursor.execute(f"ALTER TABLE {parent} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)", bounds)
+    return True
+
+
+def detach_partition(connection, table, year, drop=False):
+    name = partition_name(table, year)
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+        if drop:
+            cursor.execute(f"DROP TABLE {name}")
+
+
+def _index_definitions(connection, table):
+    """{name: definition after the table name} of the plain (non-unique) indexes of `table`"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_indexdef(i.indexrelid) FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid WHERE i.indrelid = to_regclass(%s) AND NOT i.indisunique",
+            [table],
+        )
+        return {name: definition.split(" USING ", 1)[1] for name, definition in cursor.fetchall()}
+
+
+def convert(connection, table, years_ahead=1):
+    """
+    Rebuild `table` as a partitioned table with one partition per year of
+    existing data. The new table takes over the names of the old primary key,
+    unique constraint, foreign keys and indexes, so the model state of
+    migration 0013 still matches and later migrations find them.
+    """
+    spec = TABLES[table]
+    key = spec["key"]
+    staging = f"{table}_partitioned"
+    sequence = f"{table}_id_pseq"
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    pk_name = next(name for name, c in constraints.items() if c["primary_key"])
+    unique_name = next(
+        name for name, c in constraints.items()
+        if c["unique"] and not c["primary_key"] and c["columns"] == list(spec["unique"])
+    )
+    foreign_keys = {
+        name: (c["columns"][0], *c["foreign_key"])
+        for name, c in constraints.items() if c["foreign_key"] and len(c["columns"]) == 1
+    }
+    indexes = _index_definitions(connection, table)
+    # Built under temporary names while the old table still holds the real ones
+    renames = {f"{table}_pk": pk_name, f"{table}_uniq": unique_name}
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT min({key}), max({key}), COALESCE(max(id), 0) FROM {table}")
+        first, last, max_id = cursor.fetchone()
+
+        # LIKE without INCLUDING IDENTITY/INDEXES: identity columns and unique
+        # indexes without the partition key are not allowed on partitioned tables
+        cursor.execute(f"CREATE TABLE {staging} (LIKE {table} INCLUDING DEFAULTS) PARTITION BY RANGE ({key})")
+        cursor.execute(f"CREATE SEQUENCE {sequence} START WITH {max_id + 1}")
+        cursor.execute(f"ALTER TABLE {staging} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+        cursor.execute(f"ALTER TABLE {staging} ADD CONSTRAINT {table}_pk PRIMARY KEY (id, {key})")
+        unique = ", ".join(spec["unique"])
+        cursor.execute(f"ALTER TABLE {staging} ADD CONSTRAINT {table}_uniq UNIQUE ({unique}, {key})")
+        for n, (name, (column, target, target_column)) in enumerate(sorted(foreign_keys.items())):
+            renames[f"{table}_fk{n}"] = name
+            cursor.execute(
+                f"ALTER TABLE {staging} ADD CONSTRAINT {table}_fk{n} FOREIGN KEY ({column}) "
+                f"REFERENCES {target} ({target_column}) DEFERRABLE INITIALLY DEFERRED"
+            )
+        parent_column, parent, parent_date = spec["parent"]
+        cursor.execute(
+            "SELECT 1 FROM pg_constraint WHERE conrelid = to_regclass(%s) AND conname = %s",
+            [parent, f"{parent}_id_{parent_date}_key"],
+        )
+        if cursor.fetchone() is None:
+            cursor.execute(f"ALTER TABLE {parent} ADD CONSTRAINT {parent}_id_{parent_date}_key UNIQUE (id, {parent_date})")
+        cursor.execute(
+            f"ALTER TABLE {staging} ADD CONSTRAINT {table}_{key}_fk FOREIGN KEY ({parent_column}, {key}) "
+            f"REFERENCES {parent} (id, {parent_date}) ON UPDATE CASCADE DEFERRABLE INITIALLY DEFERRED"
+        )
+        for n, (name, definition) in enumerate(sorted(indexes.items())):
+            renames[f"{table}_ix{n}"] = name
+            cursor.execute(f"CREATE INDEX {table}_ix{n} ON {staging} USING {definition}")
+        cursor.execute(f"CREATE TABLE {table}_default PARTITION OF {staging} DEFAULT")
+
+    this_year = date.today().year
+    start = first.year if first else this_year
+    end = max(last.year if last else this_year, this_year) + years_ahead
+    for year in range(start, end + 1):
+        create_partition(connection, table, year, parent=staging)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {staging} SELECT * FROM {table}")
+        cursor.execute(f"DROP TABLE {table}")
+        cursor.execute(f"ALTER TABLE {staging} RENAME TO {table}")
+        cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id")
+        for temporary, name in renames.items():
+            if name in indexes:
+                cursor.execute(f"ALTER INDEX {temporary} RENAME TO {name}")
+            else:
+                cursor.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {temporary} TO {name}")
@@ -0,0 +1,59 @@
+import json
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def strip_empty(value):
+    """Recursively drop None and numeric-zero values from dicts (booleans are kept)"""
+    if isinstance(value, dict):
+        return {
+            k: strip_empty(v)
+            for k, v in value.items()
+            if v is not None and not (
+                isinstance(v, (int, float, Decimal)) and not isinstance(v, bool) and v == 0
+            )
+        }
+    if isinstance(value, (list, tuple)):
+        return [strip_empty(v) for v in value]
+    return value
+
+
+def wants_compact(request):
+    """Clients opt into null/zero stripping with ?compact=1"""
+    return request.GET.get("compact") in ("1", "true")
+
+
+_django_encoder = DjangoJSONEncoder()
+
+
+def dumps(data):
+    """Serialize to UTF-8 JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_django_encoder.default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(",", ":")).encode("utf-8")
+
+
+class FastJsonResponse(HttpResponse):
+    """
+    Drop-in replacement for JsonResponse with a faster encoder and
+    optional removal of empty fields. Compression is applied by
+    coach.middleware.JsonCompressionMiddleware.
+    """
+
+    def __init__(self, data, compact=False, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                "In order to allow non-dict objects to be serialized set the "
+                "safe parameter to False."
+            )
+        if compact:
+            data = strip_empty(data)
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=dumps(data), **kwargs)
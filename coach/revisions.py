@@ -0,0 +1,139 @@
+"""
+Append-only edit history of box scores.
+
+coach.boxscore and coach.live append a PlayerStatRevision for every write
+they make, carrying the editor and a timestamp:
+- a SNAPSHOT of the non-default stats when a row is created
+- a CHANGE holding just the fields a write changed
+- a DELETE tombstone from coach.signals when the row goes away
+
+box_score_at() replays a game's revisions up to a moment. compact() folds
+each row's revisions older than the detail window into one snapshot, so old
+history costs one small row per stat line to store and to replay.
+"""
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import PlayerStat, PlayerStatRevision, PLAYER_STAT_EDIT_FIELDS
+
+DEFAULTS = {name: PlayerStat._meta.get_field(name).get_default() for name in PLAYER_STAT_EDIT_FIELDS}
+COMPACT_BATCH_SIZE = 500
+
+
+def _compact(values):
+    """Only the stats that differ from the column defaults"""
+    return {name: value for name, value in values.items() if value != DEFAULTS[name]}
+
+
+def _load(changes):
+    # JSON turns decimals into strings; convert back to the column types
+    return {name: PlayerStat._meta.get_field(name).to_python(value) for name, value in changes.items()}
+
+
+def snapshot_of(row, editor=None, created_at=None):
+    return PlayerStatRevision(
+        stat_id=row.id, game_id=row.game_id, player_id=row.player_id, kind=PlayerStatRevision.SNAPSHOT,
+        version=row.version, changes=_compact({name: getattr(row, name) for name in PLAYER_STAT_EDIT_FIELDS}),
+        editor=editor, created_at=created_at or timezone.now(),
+    )
+
+
+def record_created(row, editor=None):
+    snapshot_of(row, editor).save()
+
+
+def record_change(stat_id, game_id, player_id, changes, version, editor=None):
+    PlayerStatRevision.objects.create(
+        stat_id=stat_id, game_id=game_id, player_id=player_id, kind=PlayerStatRevision.CHANGE,
+        version=version, changes=changes, editor=editor,
+    )
+
+
+def record_deleted(row):
+    PlayerStatRevision.objects.create(
+        stat_id=row.id, game_id=row.game_id, player_id=row.player_id, kind=PlayerStatRevision.DELETE,
+        version=row.version,
+    )
+
+
+def _replay(revisions):
+    """{stat_id: {'player_id', 'version', 'values'}} after applying (id-ordered) revisions"""
+    rows = {}
+    for stat_id, player_id, kind, changes, version in revisions:
+        if kind == PlayerStatRevision.DELETE:
+            rows.pop(stat_id, None)
+        elif kind == PlayerStatRevision.SNAPSHOT:
+            rows[stat_id] = {'player_id': player_id, 'version': version, 'values': {**DEFAULTS, **_load(changes)}}
+        elif stat_id in rows:
+            rows[stat_id]['values'].update(_load(changes))
+            rows[stat_id]['version'] = version
+    return rows
+
+
+def box_score_at(game_id, when):
+    """{player_id: {'version', **stats}} of a game as it stood at `when`"""
+    revisions = (
+        PlayerStatRevision.objects.filter(game_id=game_id, created_at__lte=when)
+        .order_by('id')
+        .values_list('stat_id', 'player_id', 'kind', 'changes', 'version')
+    )
+    return {
+        row['player_id']: {'version': row['version'], **row['values']}
+        for row in _replay(revisions.iterator()).values()
+    }
+
+
+def history(game_id, player_id=None, limit=200):
+    """Newest-first revisions of a game (or one player in it) with the editor's username"""
+    revisions = PlayerStatRevision.objects.filter(game_id=game_id)
+    if player_id is not None:
+        revisions = revisions.filter(player_id=player_id)
+    return list(
+        revisions.order_by('-id')
+        .values('id', 'player_id', 'kind', 'version', 'changes', 'editor__username', 'created_at')[:limit]
+    )
+
+
+def compact(older_than):
+    """
+    Fold every row's revisions older than the cutoff into one snapshot: the
+    newest of them becomes a snapshot of the replayed state and the rest are
+    deleted. Rows deleted before the cutoff lose their history altogether.
+    Returns the number of revisions removed.
+    """
+    cutoff = timezone.now() - older_than
+    old = PlayerStatRevision.objects.filter(created_at__lt=cutoff)
+    stat_ids = list(
+        old.values('stat_id')
+        .annotate(total=Count('id'), deletes=Count('id', filter=Q(kind=PlayerStatRevision.DELETE)))
+        .filter(Q(total__gt=1) | Q(deletes__gt=0))
+        .values_list('stat_id', flat=True)
+    )
+
+    removed = 0
+    for start in range(0, len(stat_ids), COMPACT_BATCH_SIZE):
+        batch = stat_ids[start:start + COMPACT_BATCH_SIZE]
+        with transaction.atomic():
+            revisions = list(
+                old.filter(stat_id__in=batch)
+                .order_by('stat_id', 'id')
+                .values_list('id', 'stat_id', 'player_id', 'kind', 'changes', 'version')
+            )
+            folded, snapshots = [], []
+            for stat_id, group in groupby(revisions, key=lambda r: r[1]):
+                group = list(group)
+                state = _replay(r[1:] for r in group).get(stat_id)
+                if state is None:
+                    folded.extend(r[0] for r in group)
+                else:
+                    folded.extend(r[0] for r in group[:-1])
+                    snapshots.append((group[-1][0], _compact(state['values'])))
+            for revision_id, values in snapshots:
+                PlayerStatRevision.objects.filter(id=revision_id).update(
+                    kind=PlayerStatRevision.SNAPSHOT, changes=values,
+                )
+            removed += PlayerStatRevision.objects.filter(id__in=folded).delete()[0]
+    return removed
@@ -0,0 +1,207 @@
+"""
+Typeahead search over a coach's players and events.
+
+Players match on name, jersey number and email; events on title, location
+and notes. Each backend ranks ids inside the database and one values()
+query per kind loads the display fields:
+- Postgres: pg_trgm GIN indexes serve the ILIKE '%q%' filters, and
+  word_similarity() ranks the matches.
+- SQLite: an FTS5 table with the trigram tokenizer, kept in step with
+  coach_player/coach_event by triggers, so bulk writes and raw deletes are
+  covered as well. bm25() ranks the matches, favouring names and titles.
+- Anything else, or queries shorter than a trigram: plain prefix/contains
+  lookups scoped to the coach.
+
+install() creates the indexes (migration 0020); backend() says which path a
+connection uses.
+"""
+from django.db import connections, router
+from django.db.models import Q
+
+from .models import Event, Player
+
+MIN_TRIGRAM_LENGTH = 3
+
+FTS_TABLE = "coach_search"
+# Trigram-indexed columns per table on Postgres
+TRGM_COLUMNS = {
+    "coach_player": ("name", "jersey_number", "email"),
+    "coach_event": ("title", "location", "notes"),
+}
+# FTS rowids interleave the two tables: players even, events odd
+FTS_SOURCES = {
+    "player": {
+        "table": "coach_player",
+        "rowid": "{row}.id * 2",
+        "title": "{row}.name",
+        "detail": "COALESCE({row}.jersey_number, '') || ' ' || COALESCE({row}.email, '')",
+        "notes": "''",
+        "columns": "name, jersey_number, email, coach_id",
+    },
+    "event": {
+        "table": "coach_event",
+        "rowid": "{row}.id * 2 + 1",
+        "title": "{row}.title",
+        "detail": "COALESCE({row}.location, '')",
+        "notes": "COALESCE({row}.notes, '')",
+        "columns": "title, location, notes, coach_id",
+    },
+}
+
+_backends = {}
+
+
+def _fts_values(source, row):
+    return ", ".join([
+        source["rowid"].format(row=row), f"'{source['kind']}'", f"{row}.id", f"{row}.coach_id",
+        source["title"].format(row=row), source["detail"].format(row=row), source["notes"].format(row=row),
+    ])
+
+
+def _sqlite_statements():
+    statements = [
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+        "kind UNINDEXED, object_id UNINDEXED, coach_id UNINDEXED, title, detail, notes, tokenize = 'trigram')",
+    ]
+    for kind, source in FTS_SOURCES.items():
+        source = {**source, "kind": kind}
+        table, delete = source["table"], f"DELETE FROM {FTS_TABLE} WHERE rowid = {source['rowid'].format(row='old')};"
+        insert = (
+            f"INSERT INTO {FTS_TABLE} (rowid, kind, object_id, coach_id, title, detail, notes) "
+            f"VALUES ({_fts_values(source, 'new')});"
+        )
+        statements += [
+            f"CREATE TRIGGER {FTS_TABLE}_{kind}_ai AFTER INSERT ON {table} BEGIN {insert} END",
+            f"CREATE TRIGGER {FTS_TABLE}_{kind}_ad AFTER DELETE ON {table} BEGIN {delete} END",
+            f"CREATE TRIGGER {FTS_TABLE}_{kind}_au AFTER UPDATE OF {source['columns']} ON {table} "
+            f"BEGIN {delete} {insert} END",
+            f"INSERT INTO {FTS_TABLE} (rowid, kind, object_id, coach_id, title, detail, notes) "
+            f"SELECT {_fts_values(source, table)} FROM {table}",
+        ]
+    return statements
+
+
+def _fts5_supported(connection):
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp.coach_search_probe USING fts5(x, tokenize = 'trigram')")
+        except Exception:
+            # SQLite built without FTS5, or older than 3.34 (no trigram tokenizer)
+            return False
+        cursor.execute("DROP TABLE temp.coach_search_probe")
+    return True
+
+
+def install(connection):
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            for table, columns in TRGM_COLUMNS.items():
+                for column in columns:
+                    cursor.execute(
+                        f"CREATE INDEX IF NOT EXISTS {table}_{column}_trgm ON {table} USING gin ({column} gin_trgm_ops)"
+                    )
+    elif connection.vendor == "sqlite" and _fts5_supported(connection):
+        with connection.cursor() as cursor:
+            for statement in _sqlite_statements():
+                cursor.execute(statement)
+    _backends.pop(connection.alias, None)
+
+
+def uninstall(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            for table, columns in TRGM_COLUMNS.items():
+                for column in columns:
+                    cursor.execute(f"DROP INDEX IF EXISTS {table}_{column}_trgm")
+        elif connection.vendor == "sqlite":
+            for kind in FTS_SOURCES:
+                for suffix in ("ai", "ad", "au"):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{kind}_{suffix}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    _backends.pop(connection.alias, None)
+
+
+def backend(connection):
+    """'trigram', 'fts5' or 'basic'"""
+    if connection.alias not in _backends:
+        if connection.vendor == "postgresql":
+            _backends[connection.alias] = "trigram"
+        elif connection.vendor == "sqlite" and FTS_TABLE in connection.introspection.table_names():
+            _backends[connection.alias] = "fts5"
+        else:
+            _backends[connection.alias] = "basic"
+    return _backends[connection.alias]
+
+
+def _like(query):
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _trigram_ids(connection, kind, coach_id, query, limit):
+    columns = TRGM_COLUMNS[f"coach_{kind}"]
+    match = " OR ".join(f"{c} ILIKE %s" for c in columns)
+    rank = ", ".join(f"word_similarity(%s, COALESCE({c}, ''))" for c in columns)
+    sql = (
+        f"SELECT id FROM coach_{kind} WHERE coach_id = %s AND ({match}) "
+        f"ORDER BY GREATEST({rank}) DESC, id DESC LIMIT %s"
+    )
+    params = [coach_id, *[_like(query)] * len(columns), *[query] * len(columns), limit]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fts_ids(connection, kind, coach_id, query, limit):
+    phrase = '"' + query.replace('"', '""') + '"'
+    # Weights follow the column order: kind, object_id, coach_id, title, detail, notes
+    sql = (
+        f"SELECT object_id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND kind = %s AND coach_id = %s "
+        f"ORDER BY bm25({FTS_TABLE}, 0, 0, 0, 10.0, 4.0, 1.0) LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [phrase, kind, coach_id, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _basic_filter(kind, query):
+    if len(query) < MIN_TRIGRAM_LENGTH:
+        # Too short for a trigram index: prefixes and exact jersey numbers only
+        if kind == "player":
+            return Q(name__istartswith=query) | Q(jersey_number=query)
+        return Q(title__istartswith=query) | Q(location__istartswith=query)
+    if kind == "player":
+        return Q(name__icontains=query) | Q(jersey_number__icontains=query) | Q(email__icontains=query)
+    return Q(title__icontains=query) | Q(location__icontains=query) | Q(notes__icontains=query)
+
+
+PLAYER_FIELDS = ("id", "name", "jersey_number", "position", "team_id", "team__name")
+EVENT_FIELDS = ("id", "title", "event_type", "date", "time", "location", "team_id", "team__name")
+SEARCHES = (
+    ("player", Player, PLAYER_FIELDS, ("name",)),
+    ("event", Event, EVENT_FIELDS, ("-date", "-time")),
+)
+
+
+def search(coach_id, query, limit=8):
+    """{'players': [...], 'events': [...]} matching `query`, best matches first"""
+    query = " ".join(query.split())
+    results = {"players": [], "events": []}
+    if not query:
+        return results
+    connection = connections[router.db_for_read(Player)]
+    engine = backend(connection) if len(query) >= MIN_TRIGRAM_LENGTH else "basic"
+
+    for kind, model, fields, ordering in SEARCHES:
+        # Players and events of soft-deleted teams stay out of the results
+        rows = model.objects.filter(coach_id=coach_id, team__deleted_at__isnull=True)
+        if engine == "basic":
+            results[f"{kind}s"] = list(rows.filter(_basic_filter(kind, query)).order_by(*ordering).values(*fields)[:limit])
+            continue
+        # Overfetch a little so rows of deleted teams don't leave the list short
+        find = _trigram_ids if engine == "trigram" else _fts_ids
+        ids = find(connection, kind, coach_id, query, limit * 2)
+        by_id = {row["id"]: row for row in rows.filter(id__in=ids).values(*fields)}
+        results[f"{kind}s"] = [by_id[i] for i in ids if i in by_id][:limit]
+    return results
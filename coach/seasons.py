@@ -0,0 +1,47 @@
+"""
+Season linking and rollover.
+
+Events and games point at the Season covering their date (see Event.save and
+Game.save). relink_team_seasons() re-applies that rule in bulk whenever a
+season is added, moved or removed. rollover_team() starts the next season of a
+team: the roster stays linked, and the season still running is closed the day
+before the new one starts.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+
+from . import changelog
+from .models import ChangeLog, Event, Game, Season, Team
+
+
+def relink_team_seasons(team_id):
+    """Point every event/game of the team at the season covering its date"""
+    with transaction.atomic():
+        Event.objects.filter(team_id=team_id).update(season=None)
+        Game.objects.filter(team_id=team_id).update(season=None)
+        # Ascending start date: on overlap the later season wins, matching Season.for_date
+        for season in Season.objects.filter(team_id=team_id).order_by('start_date', 'id'):
+            Event.objects.filter(team_id=team_id, date__range=season.dates).update(season=season)
+            Game.objects.filter(team_id=team_id, date__range=season.dates).update(season=season)
+        Team.objects.filter(id=team_id).update(cache_version=F('cache_version') + 1)
+        changelog.record_team(team_id, ChangeLog.RESET)
+
+
+def rollover_team(team, name, start_date, end_date=None):
+    """
+    Start season `name` of `team` on start_date, open-ended unless end_date
+    is given. Raises ValueError unless it starts after every existing season.
+    Returns the new Season.
+    """
+    with transaction.atomic():
+        seasons = Season.objects.select_for_update().filter(team=team)
+        if seasons.filter(start_date__gte=start_date).exists():
+            raise ValueError("A new season must start after the current one.")
+        # update() skips the relink signal; creating the new season below runs it once for both
+        seasons.filter(Q(end_date__isnull=True) | Q(end_date__gte=start_date)).update(
+            end_date=start_date - timedelta(days=1),
+        )
+        Team.objects.filter(id=team.id).update(season=name)
+        return Season.objects.create(team=team, name=name, start_date=start_date, end_date=end_date)
@@ -0,0 +1,187 @@
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import changelog, revisions
+from .models import Attendance, ChangeLog, Event, Game, Player, PlayerStat, Season, Team
+
+
+def bump_team_version(**filters):
+    """Invalidate cached fragments for the matching team(s)"""
+    Team.objects.filter(**filters).update(cache_version=F("cache_version") + 1)
+
+
+def adjust_team_counters(team_id, **deltas):
+    """
+    Apply +/- deltas to Team counters with F() expressions in the caller's
+    transaction, also bumping the cache version. Counters never go below zero.
+    """
+    if not team_id:
+        return
+    updates = {
+        field: F(field) + delta if delta > 0 else Greatest(F(field) + delta, Value(0))
+        for field, delta in deltas.items() if delta
+    }
+    updates["cache_version"] = F("cache_version") + 1
+    Team.objects.filter(id=team_id).update(**updates)
+
+
+def _previous(instance, field):
+    """(True, value) when `field` was loaded from the database, else (False, None)"""
+    loaded = getattr(instance, "_loaded_values", {})
+    return field in loaded, loaded.get(field)
+
+
+def _remember_loaded_values(instance):
+    instance._loaded_values = {f: instance.__dict__.get(f) for f in instance.tracked_fields}
+
+
+def _sync_partition_key(instance, model, fk, key):
+    """Carry a changed event/game date over to its attendance/stat rows"""
+    known, previous_date = _previous(instance, "date")
+    if known and str(previous_date) != str(instance.date):
+        model.objects.filter(**{fk: instance}).update(**{key: instance.date})
+
+
+def _result_field(is_win):
+    return "wins" if is_win else "losses"
+
+
+@receiver(post_save, sender=Team)
+def team_saved(sender, instance, created, **kwargs):
+    if not created:
+        bump_team_version(id=instance.id)
+
+
+# ----------------------------
+# Seasons
+# ----------------------------
+@receiver([post_save, post_delete], sender=Season)
+def season_changed(sender, instance, **kwargs):
+    from .seasons import relink_team_seasons
+
+    relink_team_seasons(instance.team_id)
+
+
+# ----------------------------
+# Players
+# ----------------------------
+@receiver(post_save, sender=Player)
+def player_saved(sender, instance, created, **kwargs):
+    if created:
+        # add_player reserves the spot up front (Team.reserve_roster_spot)
+        if getattr(instance, "_roster_spot_reserved", False):
+            bump_team_version(id=instance.team_id)
+        else:
+            adjust_team_counters(instance.team_id, player_count=1)
+    else:
+        known, previous_team_id = _previous(instance, "team_id")
+        if known and previous_team_id != instance.team_id:
+            adjust_team_counters(previous_team_id, player_count=-1)
+            changelog.record_team(previous_team_id)
+            adjust_team_counters(instance.team_id, player_count=1)
+        else:
+            bump_team_version(id=instance.team_id)
+    _remember_loaded_values(instance)
+
+
+@receiver(post_delete, sender=Player)
+def player_deleted(sender, instance, **kwargs):
+    adjust_team_counters(instance.team_id, player_count=-1)
+
+
+# ----------------------------
+# Events
+# ----------------------------
+@receiver(post_save, sender=Event)
+def event_saved(sender, instance, created, **kwargs):
+    if created:
+        adjust_team_counters(instance.team_id, event_count=1)
+    else:
+        known, previous_team_id = _previous(instance, "team_id")
+        if known and previous_team_id != instance.team_id:
+            adjust_team_counters(previous_team_id, event_count=-1)
+            changelog.record_team(previous_team_id)
+            adjust_team_counters(instance.team_id, event_count=1)
+        else:
+            bump_team_version(id=instance.team_id)
+        _sync_partition_key(instance, Attendance, "event", "event_date")
+    _remember_loaded_values(instance)
+
+
+@receiver(post_delete, sender=Event)
+def event_deleted(sender, instance, **kwargs):
+    adjust_team_counters(instance.team_id, event_count=-1)
+
+
+# ----------------------------
+# Games (win/loss record)
+# ----------------------------
+@receiver(post_save, sender=Game)
+def game_saved(sender, instance, created, **kwargs):
+    result = _result_field(instance.is_win)
+    if created:
+        adjust_team_counters(instance.team_id, **{result: 1})
+    else:
+        team_known, previous_team_id = _previous(instance, "team_id")
+        result_known, previous_is_win = _previous(instance, "is_win")
+        if not (team_known and result_known):
+            bump_team_version(id=instance.team_id)
+        elif previous_team_id != instance.team_id:
+            adjust_team_counters(previous_team_id, **{_result_field(previous_is_win): -1})
+            changelog.record_team(previous_team_id)
+            adjust_team_counters(instance.team_id, **{result: 1})
+        elif previous_is_win != instance.is_win:
+            adjust_team_counters(instance.team_id, **{_result_field(previous_is_win): -1, result: 1})
+        else:
+            bump_team_version(id=instance.team_id)
+        _sync_partition_key(instance, PlayerStat, "game", "game_date")
+    _remember_loaded_values(instance)
+
+
+@receiver(post_delete, sender=Game)
+def game_deleted(sender, instance, **kwargs):
+    adjust_team_counters(instance.team_id, **{_result_field(instance.is_win): -1})
+
+
+# ----------------------------
+# Attendance / stats only affect cached fragments
+# ----------------------------
+@receiver([post_save, post_delete], sender=Attendance)
+def attendance_changed(sender, instance, **kwargs):
+    bump_team_version(event__id=instance.event_id)
+
+
+@receiver([post_save, post_delete], sender=PlayerStat)
+def player_stat_changed(sender, instance, **kwargs):
+    bump_team_version(game__id=instance.game_id)
+
+
+@receiver(post_delete, sender=PlayerStat)
+def player_stat_deleted(sender, instance, **kwargs):
+    # Creates and edits are recorded by coach.boxscore / coach.live, which know the editor
+    revisions.record_deleted(instance)
+
+
+# ----------------------------
+# Change log for delta sync
+# ----------------------------
+@receiver(post_save, sender=Team)
+@receiver(post_save, sender=Player)
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=Attendance)
+@receiver(post_save, sender=Game)
+@receiver(post_save, sender=PlayerStat)
+def log_saved(sender, instance, **kwargs):
+    changelog.record(instance)
+
+
+@receiver(post_delete, sender=Team)
+@receiver(post_delete, sender=Player)
+@receiver(post_delete, sender=Event)
+@receiver(post_delete, sender=Attendance)
+@receiver(post_delete, sender=Game)
+@receiver(post_delete, sender=PlayerStat)
+def log_deleted(sender, instance, **kwargs):
+    changelog.record(instance, ChangeLog.DELETE)
@@ -0,0 +1,110 @@
+"""
+"Players like X" search over per-game stat profiles.
+
+For each coach and sport the cache holds a float32 matrix of per-player stat
+totals plus the cache_version of every team it was built from. A lookup
+re-aggregates only the teams whose version moved since (any stat, roster or
+game change bumps it), so saving one box score rebuilds one team's rows on
+the next lookup and writes never pay for it. Because versions are compared
+on every read, results are never stale.
+Queries standardize the per-game averages column-wise and rank with cosine
+similarity or euclidean distance in a few vectorized operations.
+
+NumPy is in requirements.txt; callers still check `available()` first.
+"""
+import hashlib
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - only on installs without requirements.txt
+    np = None
+
+from django.core.cache import cache
+from django.db.models import Count, Sum
+
+from .models import PlayerStat, Team, PLAYER_STAT_FIELDS
+
+MATRIX_TIMEOUT = 60 * 60 * 24 * 7
+METRICS = ("cosine", "euclidean")
+
+
+def available():
+    return np is not None
+
+
+def _key(coach_id, sport):
+    token = hashlib.md5(sport.encode(), usedforsecurity=False).hexdigest()[:12]
+    return f"similarity:{coach_id}:{token}"
+
+
+def _aggregate(team_ids):
+    """Matrix rows for the players currently on `team_ids`"""
+    rows = list(
+        PlayerStat.objects.filter(player__team_id__in=team_ids)
+        .values('player_id', 'player__team_id')
+        .annotate(games=Count('id'), **{f: Sum(f) for f in PLAYER_STAT_FIELDS})
+        .values_list('player_id', 'player__team_id', 'games', *PLAYER_STAT_FIELDS)
+    )
+    data = np.array(rows, dtype=float).reshape(-1, 3 + len(PLAYER_STAT_FIELDS))
+    return {
+        'ids': data[:, 0].astype(np.int64),
+        'team_ids': data[:, 1].astype(np.int64),
+        'games': data[:, 2].astype(np.float32),
+        'totals': np.nan_to_num(data[:, 3:]).astype(np.float32),
+    }
+
+
+def stat_matrix(coach_id, sport):
+    """The cached matrix for one coach and sport, refreshed for teams whose data changed"""
+    versions = dict(Team.objects.filter(coach_id=coach_id, sport=sport).values_list('id', 'cache_version'))
+    key = _key(coach_id, sport)
+    entry = cache.get(key)
+    if entry is not None and entry['teams'] == versions:
+        return entry
+
+    previous = entry['teams'] if entry else {}
+    stale = [team_id for team_id, version in versions.items() if previous.get(team_id) != version]
+    fresh = _aggregate(stale)
+    if entry is not None:
+        # Keep rows of unchanged teams; stale teams are rebuilt and vanished teams dropped
+        keep = np.isin(entry['team_ids'], [t for t in versions if t not in stale])
+        fresh = {name: np.concatenate([entry[name][keep], rows]) for name, rows in fresh.items()}
+    entry = {'teams': versions, **fresh}
+    cache.set(key, entry, MATRIX_TIMEOUT)
+    return entry
+
+
+def _profiles(entry):
+    """Column-standardized per-game averages of every player with at least one game"""
+    played = entry['games'] > 0
+    averages = entry['totals'][played] / entry['games'][played, None]
+    mean, std = averages.mean(axis=0), averages.std(axis=0)
+    # Columns nobody varies on (often another sport's stats) carry no signal
+    profiles = np.divide(averages - mean, std, out=np.zeros_like(averages), where=std > 0)
+    return entry['ids'][played], profiles
+
+
+def similar_players(player, k=5, metric="cosine"):
+    """[(player id, score)] of the k players closest to `player` within its coach and sport"""
+    entry = stat_matrix(player.coach_id, player.team.sport)
+    if not (entry['games'][entry['ids'] == player.id] > 0).any():
+        return []
+    ids, profiles = _profiles(entry)
+    position = np.flatnonzero(ids == player.id)
+    target = profiles[position[0]]
+
+    if metric == "cosine":
+        norms = np.linalg.norm(profiles, axis=1) * np.linalg.norm(target)
+        scores = np.divide(profiles @ target, norms, out=np.zeros(len(ids), dtype=np.float32), where=norms > 0)
+        order_scores = -scores
+    else:
+        scores = np.linalg.norm(profiles - target, axis=1)
+        order_scores = scores
+    order_scores[position[0]] = np.inf
+
+    k = min(k, len(ids) - 1)
+    if k <= 0:
+        return []
+    top = np.argpartition(order_scores, k - 1)[:k]
+    top = top[np.argsort(order_scores[top])]
+    return [(int(ids[i]), round(float(scores[i]), 4)) for i in top]
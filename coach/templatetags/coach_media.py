@@ -0,0 +1,14 @@
+from django import template
+
+from coach.images import pick_variant
+
+register = template.Library()
+
+
+@register.simple_tag
+def avatar_url(profile, size=128, fmt="webp"):
+    """
+    Usage: {% avatar_url coach_profile 256 %}
+    Returns the smallest processed variant at least `size` px wide.
+    """
+    return pick_variant(profile, int(size), fmt)
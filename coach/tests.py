@@ -1,3 +1,1554 @@
-from django.test import TestCase
+import asyncio
+import base64
+import gzip
+import io
+import json
+import math
+import tempfile
+from datetime import date, time, timedelta
+from decimal import Decimal
+from importlib import import_module
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, models, transaction
+from django.http import HttpResponse
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import (
+    analytics, archive, boxscore, changelog, checkin, counters, images, jobs, live, metrics, partitioning, revisions,
+    search, seasons, similarity, trends,
+)
+from .media import HASHED_NAME_RE, serve_media
+from .db_router import PIN_COOKIE, REPLICA, ReplicaRouter, read_from_replica
+from .middleware import JsonCompressionMiddleware, ReplicaPinningMiddleware, brotli
+from .models import (
+    Attendance, ChangeLog, CheckInFlush, CheckInScan, CoachProfile, Event, Game, IdempotencyKey, Job, Player, PlayerStat, PlayerStatRevision, Season, Team, TeamArchive,
+)
+from .responses import FastJsonResponse
+from .views import DASHBOARD_PAGE_SIZE, _dashboard_roster, _encode_bits
+
+
+class CoachTestCase(TestCase):
+    """A logged-in coach with one team of two players and a game event"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("coach", "coach@example.com", "pw")
+        self.client.force_login(self.user)
+        self.team = Team.objects.create(coach=self.user, name="Hawks", sport="Basketball")
+        self.alice = Player.objects.create(coach=self.user, team=self.team, name="Alice A", first_name="Alice", last_name="A")
+        self.bob = Player.objects.create(coach=self.user, team=self.team, name="Bob B", first_name="Bob", last_name="B")
+        self.event = Event.objects.create(
+            coach=self.user, team=self.team, title="Game vs Eagles", event_type="Game",
+            date=timezone.localdate(), time=time(18),
+        )
+
+    def reload_team(self):
+        return Team.objects.get(id=self.team.id)
+
+    def post_json(self, url, data):
+        return self.client.post(url, json.dumps(data), content_type="application/json")
+
+
+# ===============================
+# BOX SCORES
+# ===============================
+
+class SaveGameStatsTests(CoachTestCase):
+    def save(self, stats):
+        return self.post_json(reverse("save_game_stats"), {
+            "game": {"team_id": self.team.id, "event_id": self.event.id, "date": str(self.event.date)},
+            "stats": stats,
+        })
+
+    def stat(self, player):
+        return PlayerStat.objects.get(player=player)
+
+    def test_unversioned_save_replaces_box_score(self):
+        self.save({str(self.alice.id): {"assists": 2}, str(self.bob.id): {"assists": 1}})
+        response = self.save({str(self.alice.id): {"assists": 3}})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["message"], "Stats saved successfully for 1 players")
+        self.assertEqual(self.stat(self.alice).assists, 3)
+        self.assertFalse(PlayerStat.objects.filter(player=self.bob).exists())
+
+    def test_disjoint_edits_against_old_version_merge(self):
+        version = self.save({str(self.alice.id): {"assists": 0, "rebounds": 0}}).json()["versions"][str(self.alice.id)]
+        base = {"assists": 0, "rebounds": 0}
+        self.save({str(self.alice.id): {"assists": 4, "rebounds": 0, "version": version, "base": base}})
+
+        response = self.save({str(self.alice.id): {"assists": 0, "rebounds": 7, "version": version, "base": base}})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["conflicts"], [])
+        row = self.stat(self.alice)
+        self.assertEqual((row.assists, row.rebounds, row.version), (4, 7, version + 2))
+
+    def test_conflicting_edit_returns_409_with_current_row(self):
+        version = self.save({str(self.alice.id): {"assists": 0, "steals": 0}}).json()["versions"][str(self.alice.id)]
+        base = {"assists": 0, "steals": 0}
+        self.save({str(self.alice.id): {"assists": 4, "version": version, "base": base}})
+
+        response = self.save({
+            str(self.alice.id): {"assists": 6, "steals": 2, "version": version, "base": base},
+            str(self.bob.id): {"assists": 1, "version": None},
+        })
+        self.assertEqual(response.status_code, 409)
+        body = response.json()
+        self.assertFalse(body["success"])
+        self.assertIn("conflict with another editor", body["message"])
+        self.assertNotIn("saved successfully", body["message"])
+        [conflict] = body["conflicts"]
+        self.assertEqual((conflict["player_id"], conflict["fields"]), (self.alice.id, ["assists"]))
+        self.assertEqual(conflict["current"]["assists"], 4)
+        # The conflicting field keeps the stored value; everything else is saved
+        row = self.stat(self.alice)
+        self.assertEqual((row.assists, row.steals), (4, 2))
+        self.assertEqual(self.stat(self.bob).assists, 1)
+
+
+# ===============================
+# BATCH OPERATIONS
+# ===============================
+
+class BatchTests(CoachTestCase):
+    def batch(self, operations):
+        return self.post_json(reverse("batch"), {"operations": operations})
+
+    def mark(self, key, present):
+        return {"key": key, "op": "mark_attendance", "args": {"event_id": self.event.id, "present_player_ids": present}}
+
+    def test_invalid_args_are_reported_per_field_before_running(self):
+        save_stats = {
+            "key": "k2", "op": "save_stats", "args": {
+                "game": {"team_id": "x", "event_id": self.event.id, "date": "2025-02-30", "points_for": -1},
+                "stats": {str(self.alice.id): {"assists": "many", "dunks": 1, "version": "2"}, "bob": {}},
+            },
+        }
+        response = self.batch([self.mark("k1", [self.alice.id]), save_stats])
+        self.assertEqual(response.status_code, 400)
+        body = response.json()
+        self.assertEqual((body["index"], body["key"]), (1, "k2"))
+        self.assertEqual(set(body["fields"]), {
+            "game.team_id", "game.date", "game.points_for", f"stats.{self.alice.id}.assists",
+            f"stats.{self.alice.id}.dunks", f"stats.{self.alice.id}.version", "stats.bob",
+        })
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_invalid_edit_event_args(self):
+        response = self.batch([{
+            "key": "k1", "op": "edit_event",
+            "args": {"event_id": self.event.id, "event_type": "Party", "time": "25:00", "team_id": [1]},
+        }])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()["fields"]), {"event_type", "time", "team_id"})
+        self.assertEqual(Event.objects.get(id=self.event.id).event_type, "Game")
+
+
+# ===============================
+# MEDIA
+# ===============================
+
+class MediaRangeTests(SimpleTestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        with open(f"{media_root.name}/clip.bin", "wb") as f:
+            f.write(bytes(range(100)))
+        settings = override_settings(MEDIA_ROOT=media_root.name, MEDIA_ACCEL_REDIRECT_PREFIX="", MEDIA_USE_SENDFILE=False)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def get(self, range_header):
+        response = serve_media(RequestFactory().get("/media/clip.bin", HTTP_RANGE=range_header), "clip.bin")
+        self.addCleanup(response.close)
+        return response
+
+    def test_single_ranges(self):
+        for header, content_range, body in (
+            ("bytes=10-19", "bytes 10-19/100", bytes(range(10, 20))),
+            ("bytes=95-", "bytes 95-99/100", bytes(range(95, 100))),
+            ("bytes=-3", "bytes 97-99/100", bytes(range(97, 100))),
+            ("bytes=90-500", "bytes 90-99/100", bytes(range(90, 100))),
+        ):
+            response = self.get(header)
+            self.assertEqual((response.status_code, response["Content-Range"]), (206, content_range), header)
+            self.assertEqual(b"".join(response.streaming_content), body)
+
+    def test_malformed_or_multiple_ranges_serve_the_whole_file(self):
+        for header in ("bytes=0-1,5-6", "bytes=-", "bytes=20-10", "items=0-5", "bytes=abc"):
+            response = self.get(header)
+            self.assertEqual(response.status_code, 200, header)
+            self.assertNotIn("Content-Range", response)
+            self.assertEqual(b"".join(response.streaming_content), bytes(range(100)))
+
+    def test_ranges_outside_the_file_are_not_satisfiable(self):
+        for header in ("bytes=100-", "bytes=150-200", "bytes=-0"):
+            response = self.get(header)
+            self.assertEqual((response.status_code, response["Content-Range"]), (416, "bytes */100"), header)
+
+
+# ===============================
+# PROFILE PICTURES
+# ===============================
+
+def _image_file(name="avatar.png", size=(1600, 1200), mode="RGB"):
+    buf = io.BytesIO()
+    Image.new(mode, size, "orange").save(buf, "PNG")
+    return SimpleUploadedFile(name, buf.getvalue(), content_type="image/png")
+
+
+class ProfilePictureTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings = override_settings(MEDIA_ROOT=media_root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create_user("coach", "coach@example.com", "pw")
+        self.client.force_login(self.user)
+        self.profile = CoachProfile.objects.create(user=self.user, sport="Basketball")
+        self.storage = CoachProfile._meta.get_field("profile_picture").storage
+
+    def upload(self, image=None):
+        self.client.post(reverse("profile"), {"first_name": "Pat", "profile_picture": image or _image_file()})
+        self.profile.refresh_from_db()
+        return Job.objects.filter(name="process_profile_picture").latest("id")
+
+    def process(self, queued):
+        images.process_profile_picture(**queued.payload)
+        self.profile.refresh_from_db()
+
+    def test_processing_writes_capped_master_and_hashed_thumbnails(self):
+        queued = self.upload()
+        original = self.profile.profile_picture.name
+        self.process(queued)
+
+        self.assertTrue(HASHED_NAME_RE.search(self.profile.profile_picture.name))
+        self.assertFalse(self.storage.exists(original))
+        with self.storage.open(self.profile.profile_picture.name) as fh, Image.open(fh) as master:
+            self.assertEqual(master.size, (1024, 768))
+        self.assertEqual(set(self.profile.profile_picture_variants), {"64", "128", "256"})
+        for size, formats in self.profile.profile_picture_variants.items():
+            self.assertEqual(set(formats), {"webp", "jpg"})
+            with self.storage.open(formats["webp"]) as fh, Image.open(fh) as thumb:
+                self.assertEqual(thumb.size, (int(size), int(size)))
+
+    def test_transparent_pictures_fall_back_to_png(self):
+        self.process(self.upload(_image_file(mode="RGBA")))
+        self.assertTrue(self.profile.profile_picture.name.endswith(".png"))
+        self.assertEqual(set(self.profile.profile_picture_variants["64"]), {"webp", "png"})
+
+    def test_new_upload_clears_variants_and_replaces_old_files(self):
+        self.process(self.upload())
+        old_files = images.picture_files(self.profile)
+
+        queued = self.upload(_image_file(size=(300, 300)))
+        self.assertEqual(self.profile.profile_picture_variants, {})
+        self.assertEqual(set(queued.payload["replaced"]), old_files)
+        self.process(queued)
+        self.assertFalse(any(self.storage.exists(name) for name in old_files - images.picture_files(self.profile)))
+
+    def test_same_picture_keeps_its_hashed_names(self):
+        self.process(self.upload())
+        first = images.picture_files(self.profile)
+        self.process(self.upload())
+        self.assertEqual(images.picture_files(self.profile), first)
+        self.assertTrue(all(self.storage.exists(name) for name in first))
+
+    def test_pick_variant_uses_smallest_covering_size(self):
+        self.process(self.upload())
+        variants = self.profile.profile_picture_variants
+        self.assertEqual(images.pick_variant(self.profile, 100), self.storage.url(variants["128"]["webp"]))
+        self.assertEqual(images.pick_variant(self.profile, 64, "jpg"), self.storage.url(variants["64"]["jpg"]))
+        self.assertEqual(images.pick_variant(self.profile, 512), self.profile.profile_picture.url)
+
+
+# ===============================
+# FRAGMENT CACHING
+# ===============================
+
+class CacheVersionTests(CoachTestCase):
+    def assertBumps(self, change):
+        before = self.reload_team().cache_key
+        change()
+        self.assertNotEqual(self.reload_team().cache_key, before)
+
+    def test_child_writes_bump_team_cache_version(self):
+        self.assertBumps(lambda: Player.objects.filter(id=self.alice.id).get().save())
+        self.assertBumps(lambda: Attendance.objects.create(event=self.event, player=self.alice, event_date=self.event.date, present=True))
+        game = Game.objects.create(coach=self.user, team=self.team, event=self.event, date=self.event.date)
+        self.assertBumps(lambda: PlayerStat.objects.create(game=game, player=self.alice, assists=1))
+        self.assertBumps(lambda: boxscore.save_rows(game, {str(self.alice.id): {"assists": 2}}))
+
+    def test_other_teams_keep_their_version(self):
+        other = Team.objects.create(coach=self.user, name="Other", sport="Basketball")
+        before = Team.objects.get(id=other.id).cache_key
+        Player.objects.create(coach=self.user, team=self.team, name="Cara C")
+        self.assertEqual(Team.objects.get(id=other.id).cache_key, before)
+
+    def test_dashboard_fragment_is_rendered_again_after_a_change(self):
+        url = reverse("dashboard_tab", args=["players"])
+        self.assertContains(self.client.get(url), "Alice")
+        Player.objects.filter(id=self.alice.id).get().delete()
+        self.assertNotContains(self.client.get(url), "Alice")
+
+    def test_team_roster_fragment_is_cached_until_the_team_changes(self):
+        url = reverse("team_detail", args=[self.team.id])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as cached:
+            self.assertContains(self.client.get(url), "Alice")
+        # Bypass the signals: the cached fragment is served as it was
+        Player.objects.filter(id=self.alice.id).update(first_name="Alicia", name="Alicia A")
+        self.assertNotContains(self.client.get(url), "Alicia")
+
+        Player.objects.get(id=self.alice.id).save()
+        with CaptureQueriesContext(connection) as rendered:
+            self.assertContains(self.client.get(url), "Alicia")
+        self.assertLess(len(cached), len(rendered))
+
+
+# ===============================
+# JSON RESPONSES
+# ===============================
+
+class FastJsonResponseTests(SimpleTestCase):
+    def test_encodes_django_types(self):
+        response = FastJsonResponse({"when": date(2025, 3, 1), "avg": Decimal("1.50"), "ids": (1, 2)})
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(json.loads(response.content), {"when": "2025-03-01", "avg": "1.50", "ids": [1, 2]})
+
+    def test_compact_drops_nulls_and_zeros_but_keeps_booleans(self):
+        data = {"a": 0, "b": None, "c": False, "d": [{"x": 0.0, "y": 2}], "e": ""}
+        response = FastJsonResponse(data, compact=True)
+        self.assertEqual(json.loads(response.content), {"c": False, "d": [{"y": 2}], "e": ""})
+
+    def test_non_dict_needs_safe_false(self):
+        with self.assertRaises(TypeError):
+            FastJsonResponse([1, 2])
+        self.assertEqual(json.loads(FastJsonResponse([1, 2], safe=False).content), [1, 2])
+
+
+@override_settings(JSON_COMPRESS_MIN_SIZE=100)
+class JsonCompressionMiddlewareTests(SimpleTestCase):
+    def respond(self, response, accept="gzip, deflate"):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept)
+        return JsonCompressionMiddleware(lambda request: response)(request)
+
+    def big_json(self):
+        response = FastJsonResponse({"rows": [{"name": "player", "points": i} for i in range(50)]})
+        response["ETag"] = '"abc"'
+        return response
+
+    def test_large_json_is_gzipped_with_weak_etag(self):
+        original = self.big_json().content
+        response = self.respond(self.big_json(), accept="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), original)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertEqual(response["ETag"], 'W/"abc"')
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    @skipUnless(brotli, "brotli is not installed")
+    def test_brotli_is_preferred_when_accepted(self):
+        response = self.respond(self.big_json(), accept="gzip, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+
+    def test_small_html_and_unaccepted_responses_are_left_alone(self):
+        for response, accept in (
+            (FastJsonResponse({"ok": True}), "gzip"),
+            (HttpResponse("<p>" * 500, content_type="text/html"), "gzip"),
+            (self.big_json(), "identity"),
+        ):
+            self.assertFalse(self.respond(response, accept).has_header("Content-Encoding"))
+
+
+# ===============================
+# DASHBOARD TABS
+# ===============================
+
+class DashboardTabTests(CoachTestCase):
+    def test_dashboard_renders_only_the_requested_tab(self):
+        response = self.client.get(reverse("coach_dashboard"))
+        self.assertContains(response, "Hawks")
+        self.assertNotContains(response, "Alice")
+        self.assertContains(response, reverse("dashboard_tab", args=["players"]))
+
+        response = self.client.get(reverse("coach_dashboard"), {"tab": "players"})
+        self.assertContains(response, "Alice")
+
+    def test_tab_fragments(self):
+        self.assertContains(self.client.get(reverse("dashboard_tab", args=["players"])), "Bob")
+        self.assertContains(self.client.get(reverse("dashboard_tab", args=["schedule"])), "vs. TBD")
+        self.assertEqual(self.client.get(reverse("dashboard_tab", args=["statistics"])).status_code, 404)
+
+    def test_fragments_revalidate_with_etag(self):
+        url = reverse("dashboard_tab", args=["teams"])
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Player.objects.create(coach=self.user, team=self.team, name="Cara C")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_players_data_groups_roster_by_team(self):
+        body = self.client.get(reverse("dashboard_players_data")).json()
+        self.assertEqual([p["name"] for p in body["players_by_team"][str(self.team.id)]], ["Alice A", "Bob B"])
+
+    def test_tabs_need_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse("dashboard_tab", args=["teams"])).status_code, 302)
+
+
+# ===============================
+# BACKGROUND JOBS
+# ===============================
+
+@jobs.job("tests.add")
+def _add_job(a, b):
+    return a + b
+
+
+@jobs.job("tests.boom")
+def _boom_job():
+    raise RuntimeError("boom")
+
+
+class JobQueueTests(CoachTestCase):
+    def test_enqueue_rejects_unknown_jobs(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue("tests.missing")
+
+    def test_claim_runs_highest_priority_due_job_first(self):
+        jobs.enqueue("tests.add", {"a": 1, "b": 1})
+        urgent = jobs.enqueue("tests.add", {"a": 2, "b": 2}, priority=5)
+        jobs.enqueue("tests.add", {"a": 3, "b": 3}, priority=9, delay=timedelta(hours=1))
+
+        claimed = jobs.claim_next("w1")
+        self.assertEqual(claimed.id, urgent.id)
+        self.assertEqual((claimed.status, claimed.locked_by, claimed.attempts), (Job.RUNNING, "w1", 1))
+
+        self.assertTrue(jobs.run_job(claimed, "w1"))
+        urgent.refresh_from_db()
+        self.assertEqual((urgent.status, urgent.result, urgent.locked_by), (Job.DONE, 4, ""))
+
+    @override_settings(JOBS_RETRY_BASE_DELAY=30)
+    def test_failures_back_off_then_fail(self):
+        queued = jobs.enqueue("tests.boom", max_attempts=2)
+
+        before = timezone.now()
+        with self.assertLogs("coach.jobs", "ERROR"):
+            self.assertFalse(jobs.run_job(jobs.claim_next("w1")))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Job.QUEUED)
+        self.assertGreaterEqual(queued.run_after, before + timedelta(seconds=30))
+        self.assertIn("RuntimeError: boom", queued.last_error)
+        self.assertIsNone(jobs.claim_next("w1"))
+
+        Job.objects.filter(id=queued.id).update(run_after=timezone.now())
+        with self.assertLogs("coach.jobs", "ERROR"):
+            self.assertFalse(jobs.run_job(jobs.claim_next("w1")))
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Job.FAILED, 2))
+
+    def test_requeue_stale_respects_attempts(self):
+        retry = jobs.enqueue("tests.add", {"a": 1, "b": 2})
+        spent = jobs.enqueue("tests.add", {"a": 1, "b": 2}, max_attempts=1)
+        fresh = jobs.enqueue("tests.add", {"a": 1, "b": 2})
+        long_ago = timezone.now() - timedelta(hours=1)
+        Job.objects.filter(id__in=[retry.id, spent.id]).update(status=Job.RUNNING, attempts=1, locked_at=long_ago)
+        Job.objects.filter(id=fresh.id).update(status=Job.RUNNING, attempts=1, locked_at=timezone.now())
+
+        self.assertEqual(jobs.requeue_stale(timedelta(minutes=15)), (1, 1))
+        statuses = dict(Job.objects.values_list("id", "status"))
+        self.assertEqual(statuses, {retry.id: Job.QUEUED, spent.id: Job.FAILED, fresh.id: Job.RUNNING})
+
+    def test_purge_finished_keeps_recent_and_failed_jobs(self):
+        old_done = jobs.enqueue("tests.add", {"a": 1, "b": 2})
+        old_failed = jobs.enqueue("tests.add", {"a": 1, "b": 2})
+        new_done = jobs.enqueue("tests.add", {"a": 1, "b": 2})
+        long_ago = timezone.now() - timedelta(days=2)
+        Job.objects.filter(id=old_done.id).update(status=Job.DONE, updated_at=long_ago)
+        Job.objects.filter(id=old_failed.id).update(status=Job.FAILED, updated_at=long_ago)
+        Job.objects.filter(id=new_done.id).update(status=Job.DONE)
+
+        self.assertEqual(jobs.purge_finished(timedelta(days=1)), 1)
+        self.assertFalse(Job.objects.filter(id=old_done.id).exists())
+
+    def test_run_jobs_once_drains_the_queue(self):
+        for n in range(3):
+            jobs.enqueue("tests.add", {"a": n, "b": 1})
+        out = io.StringIO()
+        call_command("run_jobs", once=True, worker_id="test", stdout=out)
+        self.assertEqual(sorted(Job.objects.values_list("result", flat=True)), [1, 2, 3])
+        self.assertEqual(out.getvalue().count("done tests.add"), 3)
+
+    @override_settings(JOBS_RUN_EAGERLY=True)
+    def test_eager_jobs_run_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            queued = jobs.enqueue("tests.add", {"a": 2, "b": 3})
+            self.assertEqual(Job.objects.get(id=queued.id).status, Job.QUEUED)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.result), (Job.DONE, 5))
+
+    def test_job_status_is_private_to_its_creator(self):
+        queued = jobs.enqueue("tests.add", {"a": 1, "b": 2}, user=self.user)
+        body = self.client.get(reverse("job_status", args=[queued.id])).json()
+        self.assertEqual((body["status"], body["attempts"]), (Job.QUEUED, 0))
+
+        User.objects.create_user("other", "other@example.com", "pw")
+        self.client.login(username="other", password="pw")
+        self.assertEqual(self.client.get(reverse("job_status", args=[queued.id])).status_code, 404)
+
+
+# ===============================
+# READ REPLICA ROUTING
+# ===============================
+
+@mock.patch("coach.middleware.replica_enabled", return_value=True)
+@mock.patch("coach.db_router.replica_enabled", return_value=True)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+
+    def route(self, request, model=Team):
+        """Return the alias the router picks for `model` inside a replica-routed view"""
+        @read_from_replica
+        def view(request):
+            return HttpResponse(self.router.db_for_read(model))
+        return view(request).content.decode()
+
+    def test_gets_read_from_the_replica(self, *mocks):
+        self.assertEqual(self.route(self.factory.get("/")), REPLICA)
+        self.assertEqual(self.router.db_for_read(Team), "default")
+
+    def test_writes_sessions_and_pinned_clients_stay_on_primary(self, *mocks):
+        self.assertEqual(self.route(self.factory.post("/")), "default")
+        self.assertEqual(self.route(self.factory.get("/"), model=Session), "default")
+        pinned = self.factory.get("/")
+        pinned.COOKIES[PIN_COOKIE] = "1"
+        self.assertEqual(self.route(pinned), "default")
+        self.assertEqual(self.router.db_for_write(Team), "default")
+        self.assertFalse(self.router.allow_migrate(REPLICA, "coach"))
+
+    def test_disabled_replica_is_never_used(self, router_enabled, middleware_enabled):
+        router_enabled.return_value = False
+        self.assertEqual(self.route(self.factory.get("/")), "default")
+
+    def test_successful_writes_pin_the_client(self, *mocks):
+        def respond(status):
+            return ReplicaPinningMiddleware(lambda request: HttpResponse(status=status))
+
+        self.assertIn(PIN_COOKIE, respond(200)(self.factory.post("/")).cookies)
+        self.assertNotIn(PIN_COOKIE, respond(400)(self.factory.post("/")).cookies)
+        self.assertNotIn(PIN_COOKIE, respond(200)(self.factory.get("/")).cookies)
+
+
+# ===============================
+# TEAM COUNTERS
+# ===============================
+
+class TeamCounterTests(CoachTestCase):
+    def test_counters_follow_players_events_and_games(self):
+        team = self.reload_team()
+        self.assertEqual((team.player_count, team.event_count), (2, 1))
+
+        game = Game.objects.create(coach=self.user, team=self.team, event=self.event, date=self.event.date, is_win=True)
+        self.assertEqual((self.reload_team().wins, self.reload_team().losses), (1, 0))
+        game.is_win = False
+        game.save()
+        self.assertEqual((self.reload_team().wins, self.reload_team().losses), (0, 1))
+
+        self.bob.delete()
+        game.delete()
+        team = self.reload_team()
+        self.assertEqual((team.player_count, team.losses), (1, 0))
+
+    def test_add_player_respects_capacity(self):
+        Team.objects.filter(id=self.team.id).update(max_players_allowed=3)
+        url = reverse("add_player", args=[self.team.id])
+        for first_name in ("Cara", "Dan"):
+            self.client.post(url, {"first_name": first_name, "last_name": "C"})
+        self.assertEqual(self.reload_team().player_count, 3)
+        self.assertEqual(Player.objects.filter(team=self.team).count(), 3)
+
+    def test_edit_team_keeps_counters_changed_since_loading(self):
+        real_save = Team.save
+
+        def save_after_concurrent_signup(team, *args, **kwargs):
+            # A player joins between the view loading the team and saving the form
+            Player.objects.create(coach=self.user, team=self.team, name="Cara C")
+            real_save(team, *args, **kwargs)
+
+        with mock.patch.object(Team, "save", save_after_concurrent_signup):
+            self.client.post(reverse("edit_team", args=[self.team.id]), {
+                "team_name": "Hawks II", "sport": "Basketball", "status": "Active", "max_players_allowed": "0",
+            })
+        team = self.reload_team()
+        self.assertEqual((team.name, team.player_count, team.event_count), ("Hawks II", 3, 1))
+
+
+class BatchedTeamWriteTests(CoachTestCase):
+    """Roster-wide saves log their rows and bump the team once, not once per row"""
+
+    def add_players(self, count):
+        for n in range(count):
+            Player.objects.create(coach=self.user, team=self.team, name=f"Extra {n}")
+
+    def test_mark_attendance_writes_do_not_grow_with_the_roster(self):
+        url = reverse("mark_attendance", args=[self.event.id])
+        with CaptureQueriesContext(connection) as small:
+            self.post_json(url, {"present_player_ids": [self.alice.id]})
+        Attendance.objects.all().delete()
+        self.add_players(10)
+        version = self.reload_team().cache_version
+        ChangeLog.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as large:
+            response = self.post_json(url, {"present_player_ids": [self.alice.id]})
+        self.assertEqual(response.json(), {"success": True})
+        self.assertEqual(len(large), len(small))
+        self.assertEqual(self.reload_team().cache_version, version + 1)
+        self.assertEqual(ChangeLog.objects.filter(model="attendance").count(), 12)
+        marked = dict(Attendance.objects.values_list("player_id", "present"))
+        self.assertEqual(len(marked), 12)
+        self.assertEqual([pid for pid, present in marked.items() if present], [self.alice.id])
+
+    def test_mark_attendance_updates_existing_rows(self):
+        url = reverse("mark_attendance", args=[self.event.id])
+        self.post_json(url, {"present_player_ids": [self.alice.id]})
+        self.post_json(url, {"present_player_ids": [self.bob.id]})
+        self.assertEqual(dict(Attendance.objects.values_list("player_id", "present")), {
+            self.alice.id: False, self.bob.id: True,
+        })
+
+    def test_box_score_save_bumps_the_team_once(self):
+        self.add_players(10)
+        stats = {str(pid): {"assists": 1} for pid in Player.objects.values_list("id", flat=True)}
+        version = self.reload_team().cache_version
+        ChangeLog.objects.all().delete()
+
+        response = self.post_json(reverse("save_game_stats"), {
+            "game": {"team_id": self.team.id, "event_id": self.event.id, "date": str(self.event.date)},
+            "stats": stats,
+        })
+        self.assertEqual(response.status_code, 200)
+        # The Game upsert bumps once more
+        self.assertEqual(self.reload_team().cache_version, version + 2)
+        self.assertEqual(ChangeLog.objects.filter(model="playerstat").count(), 12)
+        self.assertEqual(PlayerStat.objects.filter(assists=1, game_date=self.event.date).count(), 12)
+
+
+# ===============================
+# TEAM DELETION
+# ===============================
+
+class TeamDeletionTests(CoachTestCase):
+    def setUp(self):
+        super().setUp()
+        self.game = Game.objects.create(coach=self.user, team=self.team, event=self.event, date=self.event.date)
+        PlayerStat.objects.create(game=self.game, player=self.alice, assists=3)
+        Attendance.objects.create(event=self.event, player=self.alice, event_date=self.event.date, present=True)
+        self.other = Team.objects.create(coach=self.user, name="Owls", sport="Basketball")
+        self.other_player = Player.objects.create(coach=self.user, team=self.other, name="Olly O")
+        # Another team's game filed against this team's event
+        self.other_game = Game.objects.create(coach=self.user, team=self.other, event=self.event, date=self.event.date)
+
+    def test_small_team_is_purged_at_once(self):
+        response = self.client.post(reverse("delete_team", args=[self.team.id]))
+        self.assertRedirects(response, reverse("coach_dashboard"), fetch_redirect_response=False)
+
+        self.assertFalse(Team.all_objects.filter(id=self.team.id).exists())
+        self.assertEqual(list(Player.objects.values_list("id", flat=True)), [self.other_player.id])
+        self.assertFalse(Event.objects.exists())
+        self.assertFalse(Attendance.objects.exists())
+        self.assertFalse(PlayerStat.objects.exists())
+        self.assertEqual(list(Game.objects.values_list("id", "event_id")), [(self.other_game.id, None)])
+        self.assertTrue(ChangeLog.objects.filter(model="team", object_id=self.team.id, action=ChangeLog.DELETE).exists())
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(TEAM_DELETE_BACKGROUND_ROWS=0)
+    def test_large_team_is_hidden_and_purged_in_the_background(self):
+        self.client.post(reverse("delete_team", args=[self.team.id]))
+        self.assertFalse(Team.objects.filter(id=self.team.id).exists())
+        self.assertTrue(Team.all_objects.filter(id=self.team.id).exists())
+
+        queued = Job.objects.get(name="purge_team")
+        self.assertTrue(jobs.run_job(queued))
+        self.assertFalse(Team.all_objects.filter(id=self.team.id).exists())
+        self.assertFalse(Player.objects.filter(team_id=self.team.id).exists())
+
+    def test_purge_job_never_touches_live_teams(self):
+        queued = jobs.enqueue("purge_team", {"team_id": self.team.id})
+        jobs.run_job(queued)
+        queued.refresh_from_db()
+        self.assertEqual(queued.result, {"deleted": 0})
+        self.assertEqual(self.reload_team().player_count, 2)
+
+
+# ===============================
+# ARCHIVING
+# ===============================
+
+class ArchiveTests(CoachTestCase):
+    def setUp(self):
+        super().setUp()
+        self.game = Game.objects.create(
+            coach=self.user, team=self.team, event=self.event, date=self.event.date, is_win=True,
+        )
+        boxscore.save_rows(self.game, {str(self.alice.id): {"assists": 3}}, self.user)
+        Attendance.objects.create(event=self.event, player=self.alice, event_date=self.event.date, present=True)
+        self.other = Team.objects.create(coach=self.user, name="Owls", sport="Basketball")
+        # Another team's game filed against this team's event
+        self.other_game = Game.objects.create(coach=self.user, team=self.other, event=self.event, date=self.event.date)
+
+    def test_archive_moves_history_into_cold_storage(self):
+        self.assertEqual(archive.archive_team(self.team.id), 5)
+
+        self.assertFalse(Event.objects.filter(team=self.team).exists())
+        self.assertFalse(PlayerStat.objects.exists())
+        self.assertFalse(Attendance.objects.exists())
+        stored = TeamArchive.objects.get(team=self.team)
+        self.assertEqual(stored.row_counts, {
+            "events": 1, "games": 1, "attendance": 1, "player_stats": 1, "stat_revisions": 1,
+        })
+        team = self.reload_team()
+        self.assertEqual((team.player_count, team.event_count, team.wins), (2, 1, 1))
+        self.assertIsNone(Game.objects.get(id=self.other_game.id).event_id)
+        self.assertEqual([e.title for e in archive.load_history(team)["events"]], ["Game vs Eagles"])
+
+    def test_restore_puts_rows_and_links_back(self):
+        archive.archive_team(self.team.id)
+        self.assertEqual(archive.restore_team(self.team.id), 5)
+
+        self.assertFalse(TeamArchive.objects.exists())
+        self.assertEqual(PlayerStat.objects.get(player=self.alice).assists, 3)
+        self.assertTrue(Attendance.objects.get(player=self.alice).present)
+        self.assertEqual(revisions.box_score_at(self.game.id, timezone.now())[self.alice.id]["assists"], 3)
+        self.assertEqual(Game.objects.get(id=self.other_game.id).event_id, self.event.id)
+        team = self.reload_team()
+        self.assertEqual((team.player_count, team.event_count, team.wins), (2, 1, 1))
+
+    def test_restore_keeps_games_refiled_meanwhile(self):
+        archive.archive_team(self.team.id)
+        elsewhere = Event.objects.create(
+            coach=self.user, team=self.other, title="Rematch", date=self.event.date, time=time(18),
+        )
+        Game.objects.filter(id=self.other_game.id).update(event=elsewhere)
+
+        archive.restore_team(self.team.id)
+        self.assertEqual(Game.objects.get(id=self.other_game.id).event_id, elsewhere.id)
+
+
+class ReconcileCountersTests(CoachTestCase):
+    def test_reconcile_fixes_drift(self):
+        Team.objects.filter(id=self.team.id).update(player_count=9, event_count=0)
+        out = io.StringIO()
+        call_command("reconcile_team_counters", team=[self.team.id], stdout=out)
+        self.assertIn("Reconciled 1 team(s)", out.getvalue())
+        team = self.reload_team()
+        self.assertEqual((team.player_count, team.event_count), (2, 1))
+        self.assertEqual(counters.reconcile(), 0)
+
+    def test_archived_teams_keep_their_totals(self):
+        archive.archive_team(self.team.id)
+        self.assertEqual(counters.reconcile(), 0)
+        self.assertEqual(self.reload_team().event_count, 1)
+
+
+# ===============================
+# PARTITIONED HISTORY TABLES
+# ===============================
+
+@skipUnless(partitioning.enabled(connection), "Needs Postgres with PARTITION_HISTORY_TABLES=True")
+class PartitionedTableTests(CoachTestCase):
+    def constraints(self, model):
+        with connection.cursor() as cursor:
+            return connection.introspection.get_constraints(cursor, model._meta.db_table)
+
+    def test_tables_keep_djangos_constraint_names(self):
+        with connection.schema_editor() as editor:
+            for model, parent in ((Attendance, "event"), (PlayerStat, "game")):
+                self.assertTrue(partitioning.is_partitioned(connection, model._meta.db_table))
+                names = set(self.constraints(model))
+                unique = editor._create_index_name(model._meta.db_table, [f"{parent}_id", "player_id"], suffix="_uniq")
+                self.assertIn(unique, names)
+                for field in (model._meta.get_field(parent), model._meta.get_field("player")):
+                    self.assertIn(str(editor._fk_constraint_name(model, field, "_fk_%(to_table)s_%(to_column)s")), names)
+
+    def test_event_and_player_stay_unique(self):
+        Attendance.objects.create(event=self.event, player=self.alice, event_date=self.event.date)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            # A second row under another date key is caught by the (event, event_date) foreign key
+            Attendance.objects.create(event=self.event, player=self.alice, event_date=date(2001, 1, 1))
+            connection.check_constraints()
+
+    def test_date_changes_move_rows_to_the_new_partition(self):
+        Attendance.objects.create(event=self.event, player=self.alice, event_date=self.event.date)
+        Event.objects.filter(id=self.event.id).update(date=date(2001, 6, 1))
+        self.assertEqual(Attendance.objects.get(event=self.event).event_date, date(2001, 6, 1))
+
+    def test_later_schema_changes_run_on_the_converted_table(self):
+        added = models.PositiveIntegerField(default=1)
+        added.set_attributes_from_name("late_minutes")
+        player = PlayerStat._meta.get_field("player")
+        unindexed = models.ForeignKey(Player, on_delete=models.CASCADE, related_name="+", db_index=False)
+        unindexed.set_attributes_from_name("player")
+        unindexed.model = PlayerStat
+
+        # Fire the deferred foreign key checks of setUp; ALTER TABLE refuses to run with pending ones
+        connection.check_constraints()
+        with connection.schema_editor() as editor:
+            editor.add_field(PlayerStat, added)
+            editor.alter_field(PlayerStat, player, unindexed, strict=True)
+            editor.alter_field(PlayerStat, unindexed, player, strict=True)
+            editor.remove_field(PlayerStat, added)
+        game = Game.objects.create(coach=self.user, team=self.team, event=self.event, date=self.event.date)
+        self.assertEqual(PlayerStat.objects.create(game=game, player=self.alice, assists=2).game_date, self.event.date)
+
+
+# ===============================
+# SEASONS
+# ===============================
+
+class SeasonRolloverTests(CoachTestCase):
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+        self.current = Season.objects.create(team=self.team, name="2025", start_date=self.today - timedelta(days=200))
+
+    def event_on(self, day):
+        return Event.objects.create(coach=self.user, team=self.team, title="Practice", date=day, time=time(18))
+
+    def test_open_ended_season_covers_later_events(self):
+        self.assertEqual(self.event_on(self.today + timedelta(days=400)).season, self.current)
+        self.assertEqual(Event.objects.get(id=self.event.id).season, self.current)
+
+    def test_rollover_starts_a_season_on_the_same_team(self):
+        before = self.event_on(self.today - timedelta(days=10))
+        after = self.event_on(self.today + timedelta(days=10))
+
+        response = self.client.post(reverse("rollover_season", args=[self.team.id]), {
+            "season_name": "2026", "start_date": str(self.today),
+        })
+        self.assertRedirects(response, reverse("team_detail", args=[self.team.id]), fetch_redirect_response=False)
+
+        new = Season.objects.get(team=self.team, name="2026")
+        self.assertIsNone(new.end_date)
+        self.current.refresh_from_db()
+        self.assertEqual(self.current.end_date, self.today - timedelta(days=1))
+        self.assertEqual(Event.objects.get(id=before.id).season, self.current)
+        self.assertEqual(Event.objects.get(id=after.id).season, new)
+        self.assertEqual(self.event_on(self.today + timedelta(days=400)).season, new)
+
+        team = self.reload_team()
+        self.assertEqual((Team.objects.count(), team.season, team.player_count), (1, "2026", 2))
+        self.assertEqual(set(Player.objects.values_list("team_id", flat=True)), {self.team.id})
+
+    def test_rollover_must_start_after_the_current_season(self):
+        with self.assertRaises(ValueError):
+            seasons.rollover_team(self.team, "Old", self.current.start_date)
+        self.assertEqual(Season.objects.count(), 1)
+
+    def test_backfilled_seasons_stay_open(self):
+        Season.objects.all().delete()
+        backfill = import_module("coach.migrations.0014_season").seasons_from_existing_teams
+        backfill(django_apps, None)
+
+        season = Season.objects.get(team=self.team)
+        self.assertEqual((season.start_date, season.end_date), (self.event.date, None))
+        self.assertEqual(self.event_on(self.today + timedelta(days=30)).season, season)
+
+
+# ===============================
+# OPPONENTS
+# ===============================
+
+class HeadToHeadTests(CoachTestCase):
+    def game(self, opponent, is_win, scored=None, **stats):
+        game = Game.objects.create(
+            coach=self.user, team=self.team, event=self.event, date=self.event.date, opponent=opponent, is_win=is_win,
+            points_for=scored and scored[0], points_against=scored and scored[1],
+        )
+        PlayerStat.objects.create(game=game, player=self.alice, **stats)
+        return game
+
+    def test_spelling_variants_share_one_opponent(self):
+        first = self.game("Central  High", True)
+        second = self.game("central high", False)
+        self.assertEqual(first.opponent_ref_id, second.opponent_ref_id)
+        self.assertEqual(first.opponent_ref.name, "Central High")
+        self.assertIsNone(self.game("  ", True).opponent_ref)
+
+    def test_record_points_and_player_totals_per_opponent(self):
+        self.game("Central High", True, (70, 60), assists=4)
+        self.game("central high", False, (50, 55), assists=2)
+        self.game("Central High", True, assists=1)
+        self.game("Westside", False, (40, 41), assists=7)
+
+        body = self.client.get(reverse("team_head_to_head", args=[self.team.id])).json()
+        central, westside = body["opponents"]
+        self.assertEqual(
+            (central["name"], central["games"], central["wins"], central["losses"]), ("Central High", 3, 2, 1),
+        )
+        # The unscored game counts towards the record but not the points
+        self.assertEqual((central["points_for"], central["points_against"], central["point_diff"]), (120, 115, 5))
+        [alice] = central["players"]
+        self.assertEqual((alice["player__name"], alice["games"], alice["assists"]), ("Alice A", 3, 7))
+        self.assertEqual((westside["name"], westside["point_diff"]), ("Westside", -1))
+
+        only = self.client.get(reverse("team_head_to_head", args=[self.team.id]), {"opponent": westside["id"]}).json()
+        self.assertEqual([o["name"] for o in only["opponents"]], ["Westside"])
+
+    def test_other_coaches_get_404(self):
+        User.objects.create_user("other", "other@example.com", "pw")
+        self.client.login(username="other", password="pw")
+        self.assertEqual(self.client.get(reverse("team_head_to_head", args=[self.team.id])).status_code, 404)
+
+
+# ===============================
+# DERIVED METRICS
+# ===============================
+
+class MetricTests(CoachTestCase):
+    def setUp(self):
+        super().setUp()
+        self.games = [
+            Game.objects.create(coach=self.user, team=self.team, event=self.event, date=self.event.date, points_against=pa)
+            for pa in (2, 0)
+        ]
+        # Alice: 1/2 then 9/10 from the field; a 3 in the first game
+        PlayerStat.objects.create(game=self.games[0], player=self.alice, two_pt_made=0, two_pt_attempt=1,
+                                  three_pt_made=1, three_pt_attempt=1, ft_made=2, ft_attempt=2)
+        PlayerStat.objects.create(game=self.games[1], player=self.alice, two_pt_made=9, two_pt_attempt=10)
+        # Bob never shot
+        PlayerStat.objects.create(game=self.games[0], player=self.bob, assists=3, turnovers=0)
+
+    def test_row_metrics(self):
+        rows = {
+            (r.game_id, r.player_id): r
+            for r in PlayerStat.objects.with_metrics("points", "fg_pct", "assist_turnover_ratio")
+        }
+        first = rows[self.games[0].id, self.alice.id]
+        self.assertEqual((first.points, first.fg_pct), (5, 0.5))
+        bob = rows[self.games[0].id, self.bob.id]
+        self.assertEqual(bob.points, 0)
+        self.assertIsNone(bob.fg_pct)
+        self.assertIsNone(bob.assist_turnover_ratio)
+
+    def test_totals_are_ratios_of_sums(self):
+        [alice] = PlayerStat.objects.filter(player=self.alice).values("player_id").with_metric_totals("fg_pct", "points")
+        # 10/12, not the average of 0.5 and 0.9
+        self.assertAlmostEqual(alice["fg_pct"], 10 / 12)
+        self.assertEqual(alice["points"], 23)
+        summary = PlayerStat.objects.metric_summary("efg_pct")
+        self.assertAlmostEqual(summary["efg_pct"], 10.5 / 12)
+
+    def test_save_pct_counts_the_games_goals_against(self):
+        PlayerStat.objects.filter(player=self.bob).update(saves=6)
+        bob = PlayerStat.objects.filter(player=self.bob).with_metrics("save_pct").get()
+        self.assertAlmostEqual(bob.save_pct, 6 / 8)
+
+    def test_unknown_metrics_are_rejected(self):
+        with self.assertRaises(ValueError):
+            PlayerStat.objects.with_metrics("vibes")
+        self.assertEqual(metrics.for_sport("Tennis"), ["winner_error_ratio"])
+
+    def test_leaderboard_ranks_players_without_attempts_last(self):
+        url = reverse("team_leaderboard", args=[self.team.id])
+        leaders = self.client.get(url, {"stat": "fg_pct"}).json()["leaders"]
+        self.assertEqual([(l["name"], l["games"]) for l in leaders], [("Alice A", 2), ("Bob B", 1)])
+        self.assertIsNone(leaders[1]["total"])
+        self.assertEqual(self.client.get(url, {"stat": "vibes"}).status_code, 400)
+
+
+# ===============================
+# FORM & STREAKS
+# ===============================
+
+class FormAndStreakTests(CoachTestCase):
+    def play(self, results):
+        """One game per day from 2025-03-01 with the given W/L results; returns the games"""
+        return [
+            Game.objects.create(coach=self.user, team=self.team, date=date(2025, 3, 1 + n), is_win=result == "W")
+            for n, result in enumerate(results)
+        ]
+
+    def test_rolling_averages_cover_the_last_n_games(self):
+        for game, assists in zip(self.play("WWWW"), (2, 4, 6, 8)):
+            PlayerStat.objects.create(game=game, player=self.alice, assists=assists)
+
+        games = trends.rolling_form(PlayerStat.objects.filter(player=self.alice), ["assists"], 2)
+        self.assertEqual([g["assists"] for g in games], [2, 3, 5, 7])
+        self.assertEqual(games[0]["date"], "2025-03-01")
+
+        body = self.client.get(reverse("player_form", args=[self.alice.id]), {"window": "3", "stats": "assists"}).json()
+        self.assertEqual((body["window"], body["current"]["assists"]), (3, 6))
+        self.assertEqual(
+            self.client.get(reverse("player_form", args=[self.alice.id]), {"stats": "vibes"}).status_code, 400,
+        )
+
+    def test_streaks_find_runs_in_date_order(self):
+        self.play("WWLLLWW")
+        body = self.client.get(reverse("team_streaks", args=[self.team.id])).json()
+        self.assertEqual(body["current"], {"result": "Win", "length": 2, "start": "2025-03-06", "end": "2025-03-07"})
+        # Ties go to the earliest run
+        self.assertEqual((body["longest_win"]["length"], body["longest_win"]["start"]), (2, "2025-03-01"))
+        self.assertEqual(body["longest_loss"]["length"], 3)
+
+    def test_no_games_means_no_streaks(self):
+        self.assertEqual(trends.team_streaks(self.team.id), {"current": None, "longest_win": None, "longest_loss": None})
+
+
+# ===============================
+# TEAM ANALYTICS
+# ===============================
+
+@skipUnless(analytics.available(), "NumPy is not installed")
+class TeamAnalyticsTests(CoachTestCase):
+    def setUp(self):
+        super().setUp()
+        goals = [(True, 2, 1), (False, 0, None), (True, 4, 2)]
+        self.games = []
+        for n, (is_win, alice, bob) in enumerate(goals):
+            game = Game.objects.create(coach=self.user, team=self.team, date=date(2025, 3, 1 + n), is_win=is_win)
+            PlayerStat.objects.create(game=game, player=self.alice, goals=alice)
+            if bob is not None:
+                PlayerStat.objects.create(game=game, player=self.bob, goals=bob)
+            self.games.append(game)
+
+    def test_matrix_marks_missing_games_as_nan(self):
+        players, games, cube = analytics.load_matrix(self.team, stats=["goals", "assists"])
+        self.assertEqual(players, [(self.alice.id, "Alice A"), (self.bob.id, "Bob B")])
+        self.assertEqual([gid for gid, _ in games], [g.id for g in self.games])
+        self.assertEqual(cube.shape, (2, 3, 2))
+        self.assertEqual(cube[0, :, 0].tolist(), [2, 0, 4])
+        self.assertTrue(math.isnan(cube[1, 1, 0]))
+
+    def test_team_analytics(self):
+        body = self.client.get(reverse("team_analytics", args=[self.team.id])).json()
+        self.assertEqual((body["games"], body["stats"]), (3, ["goals"]))
+        self.assertEqual(body["team_average"], {"goals": 1.75})
+        alice, bob = body["players"]
+        self.assertEqual((alice["games"], alice["totals"], alice["per_game"]), (3, {"goals": 6.0}, {"goals": 2.0}))
+        self.assertEqual((bob["games"], bob["per_game"]), (2, {"goals": 1.5}))
+        self.assertEqual((alice["z_scores"], bob["z_scores"]), ({"goals": 1.0}, {"goals": -1.0}))
+        self.assertEqual((alice["percentiles"], bob["percentiles"]), ({"goals": 75.0}, {"goals": 25.0}))
+        # Team goals per game [3, 0, 6] against wins [1, 0, 1]
+        self.assertEqual(body["win_correlation"], {"goals": 0.866})
+
+    def test_team_without_games(self):
+        empty = Team.objects.create(coach=self.user, name="Empty", sport="Soccer")
+        self.assertEqual(analytics.team_analytics(empty)["players"], [])
+
+
+# ===============================
+# SIMILAR PLAYERS
+# ===============================
+
+@skipUnless(similarity.available(), "NumPy is not installed")
+class SimilarPlayerTests(CoachTestCase):
+    def setUp(self):
+        super().setUp()
+        self.team.sport = "Soccer"
+        self.team.save()
+        self.cara = Player.objects.create(coach=self.user, team=self.team, name="Cara C")
+        self.game = Game.objects.create(coach=self.user, team=self.team, event=self.event, date=self.event.date)
+        boxscore.save_rows(self.game, {
+            str(self.alice.id): {"goals": 5, "assists": 1},
+            str(self.bob.id): {"goals": 4, "assists": 1},
+            str(self.cara.id): {"goals": 0, "assists": 6},
+        })
+
+    def test_closest_profiles_rank_first(self):
+        body = self.client.get(reverse("similar_players", args=[self.alice.id])).json()
+        self.assertEqual([r["name"] for r in body["results"]], ["Bob B", "Cara C"])
+        self.assertGreater(body["results"][0]["score"], 0.5)
+        self.assertLess(body["results"][1]["score"], 0)
+
+        nearest = similarity.similar_players(self.alice, k=1, metric="euclidean")
+        self.assertEqual([pid for pid, _ in nearest], [self.bob.id])
+        self.assertEqual(
+            self.client.get(reverse("similar_players", args=[self.alice.id]), {"metric": "manhattan"}).status_code, 400,
+        )
+
+    def test_saves_leave_the_rebuild_to_the_next_lookup(self):
+        similarity.similar_players(self.alice)
+        dan = Player.objects.create(coach=self.user, team=self.team, name="Dan D")
+        other_game = Game.objects.create(coach=self.user, team=self.team, date=self.event.date)
+        boxscore.save_rows(other_game, {str(dan.id): {"goals": 5, "assists": 1}})
+
+        cached = cache.get(similarity._key(self.user.id, "Soccer"))
+        self.assertNotEqual(cached["teams"][self.team.id], self.reload_team().cache_version)
+        self.assertNotIn(dan.id, cached["ids"].tolist())
+        self.assertIn(dan.id, [pid for pid, _ in similarity.similar_players(self.alice, k=3)])
+
+
+# ===============================
+# ATTENDANCE MATRIX
+# ===============================
+
+class AttendanceBitsetTests(CoachTestCase):
+    def test_encode_bits_is_little_endian_per_byte(self):
+        self.assertEqual(_encode_bits(0, 0), "")
+        self.assertEqual(base64.b64decode(_encode_bits(0b101, 3)), b"\x05")
+        self.assertEqual(base64.b64decode(_encode_bits(1 << 8 | 1, 9)), b"\x01\x01")
+
+    def test_matrix_marks_present_and_recorded_events(self):
+        second = Event.objects.create(
+            coach=self.user, team=self.team, title="Practice", event_type="Practice",
+            date=self.event.date + timedelta(days=1), time=time(18),
+        )
+        Attendance.objects.create(event=self.event, player=self.alice, event_date=self.event.date, present=True)
+        Attendance.objects.create(event=second, player=self.alice, event_date=second.date, present=False)
+        Attendance.objects.create(event=second, player=self.bob, event_date=second.date, present=True)
+
+        body = self.client.get(reverse("attendance_matrix", args=[self.team.id])).json()
+        self.assertEqual(body["events"], [self.event.id, second.id])
+        rows = dict(zip(body["players"], zip(body["present"], body["recorded"], body["percentages"])))
+        self.assertEqual(rows[self.alice.id], (_encode_bits(0b01, 2), _encode_bits(0b11, 2), 50.0))
+        self.assertEqual(rows[self.bob.id], (_encode_bits(0b10, 2), _encode_bits(0b10, 2), 100.0))
+
+
+# ===============================
+# DELTA SYNC
+# ===============================
+
+@override_settings(SYNC_SAFETY_LAG_SECONDS=0)
+class ChangeLogSyncTests(CoachTestCase):
+    def latest_entry(self):
+        return ChangeLog.objects.order_by("-id").values_list("id", flat=True).first()
+
+    def test_first_sync_is_a_full_snapshot_at_the_latest_entry(self):
+        page = changelog.changes_since(self.user.id)
+        self.assertTrue(page["full"])
+        self.assertFalse(page["more"])
+        self.assertEqual(page["cursor"], self.latest_entry())
+        players = page["changes"]["player"]
+        self.assertEqual([row[0] for row in players["rows"]], [self.alice.id, self.bob.id])
+        self.assertIn("name", page["fields"]["player"])
+        self.assertNotIn("cache_version", page["fields"]["team"])
+
+    def test_snapshot_pages_resume_after_the_last_row(self):
+        first = changelog.changes_since(self.user.id, limit=2)
+        self.assertTrue(first["more"])
+        since, label, after = changelog.parse_cursor(first["cursor"])
+        self.assertEqual((since, label, after), (self.latest_entry(), "player", self.alice.id))
+
+        rest = changelog.changes_since(self.user.id, since, limit=10, label=label, after=after)
+        self.assertFalse(rest["full"])
+        self.assertFalse(rest["more"])
+        self.assertEqual(rest["cursor"], since)
+        self.assertEqual([row[0] for row in rest["changes"]["player"]["rows"]], [self.bob.id])
+        self.assertEqual([row[0] for row in rest["changes"]["event"]["rows"]], [self.event.id])
+
+    def test_deltas_carry_current_rows_and_deletes(self):
+        cursor = changelog.changes_since(self.user.id)["cursor"]
+        self.alice.name = "Alice Z"
+        self.alice.save()
+        bob_id = self.bob.id
+        self.bob.delete()
+
+        page = changelog.changes_since(self.user.id, cursor)
+        self.assertFalse(page["full"])
+        name = page["fields"]["player"].index("name")
+        self.assertEqual([row[name] for row in page["changes"]["player"]["rows"]], ["Alice Z"])
+        self.assertEqual(page["changes"]["player"]["deleted"], [bob_id])
+        # The team's counters moved with its players
+        self.assertEqual([row[0] for row in page["changes"]["team"]["rows"]], [self.team.id])
+        self.assertNotIn("event", page["changes"])
+
+        again = changelog.changes_since(self.user.id, page["cursor"])
+        self.assertEqual((again["cursor"], again["changes"]), (page["cursor"], {}))
+
+    def test_delta_pages_stop_at_the_limit(self):
+        cursor = changelog.changes_since(self.user.id)["cursor"]
+        for player in (self.alice, self.bob):
+            player.save()
+        page = changelog.changes_since(self.user.id, cursor, limit=1)
+        self.assertTrue(page["more"])
+        self.assertEqual([row[0] for row in page["changes"]["player"]["rows"]], [self.alice.id])
+        page = changelog.changes_since(self.user.id, page["cursor"], limit=1)
+        self.assertFalse(page["more"])
+        self.assertEqual([row[0] for row in page["changes"]["player"]["rows"]], [self.bob.id])
+
+    def test_reset_refetches_every_row_of_the_team(self):
+        cursor = changelog.changes_since(self.user.id)["cursor"]
+        changelog.record_team(self.team.id, ChangeLog.RESET)
+        page = changelog.changes_since(self.user.id, cursor)
+        self.assertEqual(page["reset_teams"], [self.team.id])
+        self.assertEqual({row[0] for row in page["changes"]["player"]["rows"]}, {self.alice.id, self.bob.id})
+        self.assertEqual([row[0] for row in page["changes"]["event"]["rows"]], [self.event.id])
+
+    def test_young_entries_are_held_back(self):
+        cursor = changelog.changes_since(self.user.id)["cursor"]
+        self.alice.save()
+        with self.settings(SYNC_SAFETY_LAG_SECONDS=60):
+            page = changelog.changes_since(self.user.id, cursor)
+        self.assertEqual((page["cursor"], page["changes"]), (cursor, {}))
+
+    def test_cursor_older_than_the_log_starts_a_snapshot(self):
+        cursor = changelog.changes_since(self.user.id)["cursor"]
+        self.alice.save()
+        ChangeLog.objects.filter(id__lte=cursor + 1).delete()
+        self.bob.save()
+        self.assertTrue(changelog.changes_since(self.user.id, cursor)["full"])
+
+    def test_parse_cursor(self):
+        self.assertEqual(changelog.parse_cursor(None), (0, None, 0))
+        self.assertEqual(changelog.parse_cursor("12"), (12, None, 0))
+        self.assertEqual(changelog.parse_cursor("12:event:7"), (12, "event", 7))
+        for value in ("-1", "12:nope:7", "12:event", "abc"):
+            with self.assertRaises(ValueError):
+                changelog.parse_cursor(value)
+
+    def test_sync_view_is_scoped_to_the_coach(self):
+        other = User.objects.create_user("other", "other@example.com", "pw")
+        Team.objects.create(coach=other, name="Owls", sport="Basketball")
+
+        body = self.client.get(reverse("sync")).json()
+        self.assertTrue(body["full"])
+        self.assertEqual([row[0] for row in body["changes"]["team"]["rows"]], [self.team.id])
+        self.assertEqual(self.client.get(reverse("sync"), {"since": "1:bogus:2"}).status_code, 400)
+
+
+# ===============================
+# BATCH OPERATIONS
+# ===============================
+
+class BatchIdempotencyTests(CoachTestCase):
+    def batch(self, operations):
+        return self.post_json(reverse("batch"), {"operations": operations})
+
+    def mark(self, key, present):
+        return {"key": key, "op": "mark_attendance", "args": {"event_id": self.event.id, "present_player_ids": present}}
+
+    def test_retried_batch_replays_stored_results(self):
+        first = self.batch([self.mark("k1", [self.alice.id])])
+        self.assertEqual(first.status_code, 200)
+        self.assertFalse(first.json()["results"][0]["replayed"])
+
+        # Changes made since must not be overwritten by the retry
+        Attendance.objects.filter(player=self.bob).update(present=True)
+        retry = self.batch([self.mark("k1", [self.alice.id])])
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.json()["results"], [{"key": "k1", "result": {"success": True}, "replayed": True}])
+        self.assertTrue(Attendance.objects.get(player=self.bob).present)
+        self.assertEqual(IdempotencyKey.objects.filter(user=self.user).count(), 1)
+
+    def test_reused_key_with_different_operation_is_rejected(self):
+        self.batch([self.mark("k1", [self.alice.id])])
+        response = self.batch([self.mark("k2", []), self.mark("k1", [self.bob.id])])
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual((response.json()["index"], response.json()["key"]), (1, "k1"))
+        # The whole batch rolled back, including the first operation
+        self.assertFalse(IdempotencyKey.objects.filter(key="k2").exists())
+        self.assertTrue(Attendance.objects.get(player=self.alice).present)
+
+    def test_invalid_args_are_reported_per_field_before_running(self):
+        save_stats = {
+            "key": "k2", "op": "save_stats", "args": {
+                "game": {"team_id": "x", "event_id": self.event.id, "date": "2025-02-30", "points_for": -1},
+                "stats": {str(self.alice.id): {"assists": "many", "dunks": 1, "version": "2"}, "bob": {}},
+            },
+        }
+        response = self.batch([self.mark("k1", [self.alice.id]), save_stats])
+        self.assertEqual(response.status_code, 400)
+        body = response.json()
+        self.assertEqual((body["index"], body["key"]), (1, "k2"))
+        self.assertEqual(set(body["fields"]), {
+            "game.team_id", "game.date", "game.points_for", f"stats.{self.alice.id}.assists",
+            f"stats.{self.alice.id}.dunks", f"stats.{self.alice.id}.version", "stats.bob",
+        })
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_invalid_edit_event_args(self):
+        response = self.batch([{
+            "key": "k1", "op": "edit_event",
+            "args": {"event_id": self.event.id, "event_type": "Party", "time": "25:00", "team_id": [1]},
+        }])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()["fields"]), {"event_type", "time", "team_id"})
+        self.assertEqual(Event.objects.get(id=self.event.id).event_type, "Game")
+
+
+# ===============================
+# SELF CHECK-IN
+# ===============================
+
+class CheckInFlushTests(CoachTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("event_checkin", args=[checkin.make_token(self.event)])
+
+    def scan(self, player_id):
+        return self.client.post(self.url, {"player_id": player_id})
+
+    def test_scans_are_staged_and_flushed_into_attendance(self):
+        Attendance.objects.create(event=self.event, player=self.bob, event_date=self.event.date, present=False)
+        self.assertEqual(self.scan(self.alice.id).context["result"], checkin.CHECKED_IN)
+        self.assertEqual(self.scan(self.bob.id).context["result"], checkin.CHECKED_IN)
+        self.assertEqual(self.scan(self.alice.id).context["result"], checkin.ALREADY_CHECKED_IN)
+        # One flush job covers the burst of scans
+        self.assertEqual(Job.objects.filter(name="flush_checkins").count(), 1)
+        self.assertFalse(Attendance.objects.filter(present=True).exists())
+
+        self.assertEqual(checkin.flush_checkins(self.event.id), {"checked_in": 2})
+        self.assertEqual(set(Attendance.objects.filter(present=True).values_list("player_id", flat=True)), {self.alice.id, self.bob.id})
+        self.assertFalse(CheckInScan.objects.filter(flushed_at__isnull=True).exists())
+        self.assertEqual(checkin.flush_checkins(self.event.id), {"checked_in": 0})
+
+    def test_one_flush_is_pending_per_event(self):
+        self.scan(self.alice.id)
+        with CaptureQueriesContext(connection) as queries:
+            self.scan(self.bob.id)
+        # Later scans hit the CheckInFlush key instead of looking for queued jobs
+        self.assertFalse([q["sql"] for q in queries if "coach_job" in q["sql"]])
+        self.assertEqual(Job.objects.filter(name="flush_checkins").count(), 1)
+
+        checkin.flush_checkins(self.event.id)
+        self.assertFalse(CheckInFlush.objects.exists())
+        carl = Player.objects.create(coach=self.user, team=self.team, name="Carl C")
+        cache.clear()  # The cached roster predates Carl
+        self.scan(carl.id)
+        self.assertEqual(Job.objects.filter(name="flush_checkins").count(), 2)
+        self.assertTrue(CheckInFlush.objects.filter(event=self.event).exists())
+
+    def test_scans_survive_cache_loss(self):
+        self.scan(self.alice.id)
+        cache.clear()
+        self.assertEqual(self.scan(self.alice.id).context["result"], checkin.ALREADY_CHECKED_IN)
+        self.assertEqual(checkin.flush_checkins(self.event.id), {"checked_in": 1})
+
+    def test_bad_player_ids_are_rejected(self):
+        other_team = Team.objects.create(coach=self.user, name="Other", sport="Basketball")
+        outsider = Player.objects.create(coach=self.user, team=other_team, name="Eve E")
+        for player_id in ("", "abc", outsider.id):
+            self.assertEqual(self.scan(player_id).status_code, 400)
+        self.assertFalse(CheckInScan.objects.exists())
+
+    def test_players_who_left_the_team_are_not_marked(self):
+        self.scan(self.alice.id)
+        other_team = Team.objects.create(coach=self.user, name="Other", sport="Basketball")
+        Player.objects.filter(id=self.alice.id).update(team=other_team)
+        self.assertEqual(checkin.flush_checkins(self.event.id), {"checked_in": 0})
+        self.assertFalse(Attendance.objects.exists())
+
+
+# ===============================
+# LIVE STATS
+# ===============================
+
+@override_settings(REDIS_URL=None)
+class LiveStatTests(CoachTestCase):
+    def setUp(self):
+        super().setUp()
+        self.game = Game.objects.create(coach=self.user, team=self.team, event=self.event, date=self.event.date)
+        self.delta_url = reverse("live_stat_delta", args=[self.game.id])
+        self.stream_url = reverse("live_stat_stream", args=[self.game.id])
+
+    def tap(self, player_id, stat="rebounds", delta=1):
+        return self.post_json(self.delta_url, {"player_id": player_id, "stat": stat, "delta": delta})
+
+    def test_deltas_add_up_and_never_go_below_zero(self):
+        self.assertEqual(self.tap(self.alice.id, delta=3).json()["value"], 3)
+        self.assertEqual(self.tap(self.alice.id).json()["value"], 4)
+        self.assertEqual(self.tap(self.alice.id, delta=-10).json()["value"], 0)
+
+        row = PlayerStat.objects.get(game=self.game, player=self.alice)
+        self.assertEqual((row.rebounds, row.version), (0, 3))
+        kinds = list(PlayerStatRevision.objects.filter(stat_id=row.id).order_by("id").values_list("kind", flat=True))
+        self.assertEqual(kinds, [PlayerStatRevision.SNAPSHOT] + [PlayerStatRevision.CHANGE] * 2)
+        self.assertTrue(ChangeLog.objects.filter(model="playerstat", object_id=row.id).exists())
+
+    def test_bad_deltas_are_rejected(self):
+        other_team = Team.objects.create(coach=self.user, name="Other", sport="Basketball")
+        outsider = Player.objects.create(coach=self.user, team=other_team, name="Eve E")
+        self.assertEqual(self.tap(self.alice.id, stat="dunks").status_code, 400)
+        self.assertEqual(self.tap(self.alice.id, delta=0).status_code, 400)
+        self.assertEqual(self.tap(self.alice.id, delta=1000).status_code, 400)
+        self.assertEqual(self.tap(outsider.id).status_code, 404)
+        self.assertEqual(self.client.get(self.delta_url).status_code, 405)
+        self.assertFalse(PlayerStat.objects.exists())
+
+    def test_deltas_are_published_after_commit(self):
+        with mock.patch.object(live, "publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.tap(self.bob.id, delta=2)
+        game_id, message = publish.call_args.args
+        self.assertEqual(game_id, self.game.id)
+        self.assertEqual(
+            (message["player_id"], message["stat"], message["value"], message["by"]), (self.bob.id, "rebounds", 2, "coach"),
+        )
+
+    def test_stream_delivers_published_messages(self):
+        async def listen():
+            chunks = live.stream(self.game.id)
+            try:
+                self.assertEqual(await anext(chunks), b"retry: 3000\n\n")
+                pending = asyncio.ensure_future(anext(chunks))
+                # Let the stream subscribe before publishing
+                while self.game.id not in live._local_subscribers:
+                    await asyncio.sleep(0)
+                live.publish(self.game.id, {"value": 5})
+                return await asyncio.wait_for(pending, 5)
+            finally:
+                await chunks.aclose()
+
+        self.assertEqual(asyncio.run(listen()), b'event: stat\ndata: {"value": 5}\n\n')
+        self.assertNotIn(self.game.id, live._local_subscribers)
+
+    def test_stream_needs_asgi(self):
+        response = self.client.get(self.stream_url)
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("uvicorn", response.json()["error"])
+
+    async def test_stream_over_asgi(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(self.stream_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b"retry: 3000\n\n")
+        await chunks.aclose()
+
+        other = await User.objects.acreate_user("other", "other@example.com", "pw")
+        await self.async_client.aforce_login(other)
+        self.assertEqual((await self.async_client.get(self.stream_url)).status_code, 404)
+
+
+# ===============================
+# STAT EDIT HISTORY
+# ===============================
+
+class RevisionTests(CoachTestCase):
+    def setUp(self):
+        super().setUp()
+        self.game = Game.objects.create(coach=self.user, team=self.team, event=self.event, date=self.event.date)
+
+    def age_revisions(self, days):
+        PlayerStatRevision.objects.update(created_at=timezone.now() - timedelta(days=days))
+
+    def test_box_score_at_replays_snapshot_and_changes(self):
+        row, _, _ = boxscore.save_row(self.game, self.alice.id, {"assists": 1}, self.user)
+        self.age_revisions(2)
+        boxscore.save_row(self.game, self.alice.id, {"assists": 5, "steals": 2, "version": row["version"]}, self.user)
+
+        before = revisions.box_score_at(self.game.id, timezone.now() - timedelta(days=1))
+        self.assertEqual((before[self.alice.id]["assists"], before[self.alice.id]["steals"]), (1, 0))
+        now = revisions.box_score_at(self.game.id, timezone.now())
+        self.assertEqual((now[self.alice.id]["assists"], now[self.alice.id]["steals"]), (5, 2))
+
+        url = reverse("game_stats_at", args=[self.game.id])
+        at = (timezone.now() - timedelta(days=1)).isoformat()
+        self.assertEqual(self.client.get(url, {"at": at}).json()["stats"][str(self.alice.id)]["assists"], 1)
+        self.assertEqual(self.client.get(url, {"at": "yesterday"}).status_code, 400)
+
+    def test_compact_folds_old_revisions_into_one_snapshot(self):
+        row, _, _ = boxscore.save_row(self.game, self.alice.id, {"assists": 1}, self.user)
+        for assists in (2, 3):
+            row, _, _ = boxscore.save_row(self.game, self.alice.id, {"assists": assists, "version": row["version"]})
+        self.assertEqual(PlayerStatRevision.objects.count(), 3)
+        self.age_revisions(30)
+
+        self.assertEqual(revisions.compact(timedelta(days=7)), 2)
+        [revision] = PlayerStatRevision.objects.all()
+        self.assertEqual((revision.kind, revision.changes, revision.version), (PlayerStatRevision.SNAPSHOT, {"assists": 3}, row["version"]))
+        self.assertEqual(revisions.box_score_at(self.game.id, timezone.now())[self.alice.id]["assists"], 3)
+
+    def test_compact_drops_history_of_deleted_rows(self):
+        boxscore.save_row(self.game, self.alice.id, {"assists": 1})
+        PlayerStat.objects.get(player=self.alice).delete()
+        self.age_revisions(30)
+
+        self.assertEqual(revisions.compact(timedelta(days=7)), 2)
+        self.assertFalse(PlayerStatRevision.objects.exists())
+        self.assertEqual(revisions.box_score_at(self.game.id, timezone.now()), {})
+
+
+# ===============================
+# SEARCH & ROSTER PAGING
+# ===============================
+
+class SearchTests(CoachTestCase):
+    def setUp(self):
+        super().setUp()
+        Player.objects.filter(id=self.alice.id).update(jersey_number="23", email="alice@hawks.example")
+        self.event.location = "Riverside Arena"
+        self.event.save()
+
+    def names(self, query, **kwargs):
+        return [p["name"] for p in search.search(self.user.id, query, **kwargs)["players"]]
+
+    def test_matches_names_jerseys_and_emails(self):
+        self.assertEqual(self.names("lice"), ["Alice A"])
+        self.assertEqual(self.names("hawks.example"), ["Alice A"])
+        self.assertEqual(self.names("23"), ["Alice A"])
+        self.assertEqual(self.names("  "), [])
+        events = search.search(self.user.id, "riverside")["events"]
+        self.assertEqual([e["id"] for e in events], [self.event.id])
+
+    def test_short_queries_match_prefixes_only(self):
+        self.assertEqual(self.names("Bo"), ["Bob B"])
+        self.assertEqual(self.names("ob"), [])
+
+    def test_other_coaches_and_deleted_teams_are_hidden(self):
+        other = User.objects.create_user("other", "other@example.com", "pw")
+        other_team = Team.objects.create(coach=other, name="Owls", sport="Basketball")
+        Player.objects.create(coach=other, team=other_team, name="Alicia O")
+        self.assertEqual(self.names("Ali"), ["Alice A"])
+        Team.objects.filter(id=self.team.id).update(deleted_at=timezone.now())
+        self.assertEqual(self.names("Alice"), [])
+
+    def test_index_backend_matches_the_fallback(self):
+        if search._fts5_supported(connection):
+            self.assertEqual(search.backend(connection), "fts5")
+        with mock.patch.object(search, "backend", return_value="basic"):
+            self.assertEqual(self.names("lice"), ["Alice A"])
+
+    def test_view_limits_results(self):
+        for i in range(30):
+            Player.objects.create(coach=self.user, team=self.team, name=f"Zed {i:02}")
+        url = reverse("search")
+        body = self.client.get(url, {"q": "Zed", "limit": 3}).json()
+        self.assertEqual(len(body["players"]), 3)
+        self.assertEqual(set(body["players"][0]), {"id", "name", "jersey_number", "position", "team_id", "team"})
+        self.assertEqual(len(self.client.get(url, {"q": "Zed", "limit": 500}).json()["players"]), 25)
+        self.assertEqual(self.client.get(url, {"q": "Zed", "limit": "all"}).status_code, 400)
+
+
+class RosterPagingTests(CoachTestCase):
+    def test_pages_and_filters(self):
+        Player.objects.bulk_create(
+            Player(coach=self.user, team=self.team, name=f"P {i:02}", last_name=f"P{i:02}")
+            for i in range(DASHBOARD_PAGE_SIZE)
+        )
+        teams = Team.objects.filter(id=self.team.id)
+        first = _dashboard_roster(teams)
+        self.assertEqual((first.paginator.count, len(first.object_list)), (DASHBOARD_PAGE_SIZE + 2, DASHBOARD_PAGE_SIZE))
+        self.assertEqual(len(_dashboard_roster(teams, page_number="2").object_list), 2)
+
+        Attendance.objects.create(event=self.event, player=self.alice, event_date=self.event.date, present=True)
+        Attendance.objects.create(event=self.event, player=self.bob, event_date=self.event.date, present=False)
+        [alice] = _dashboard_roster(teams, attendance_filter="present").object_list
+        self.assertEqual((alice.id, alice.attendance_ratio), (self.alice.id, "1/1"))
+        self.assertEqual([p.id for p in _dashboard_roster(teams, attendance_filter="absent").object_list], [self.bob.id])
+        self.assertEqual(_dashboard_roster(teams, attendance_filter="no_record").paginator.count, DASHBOARD_PAGE_SIZE)
+
+        other_team = Team.objects.create(coach=self.user, name="Owls", sport="Basketball")
+        all_teams = Team.objects.filter(coach=self.user)
+        self.assertEqual(_dashboard_roster(all_teams, team_id=str(other_team.id)).paginator.count, 0)
+
+    def test_players_view_redirects_to_the_paged_tab(self):
+        response = self.client.get(reverse("players"), {"team": self.team.id, "page": 2})
+        self.assertRedirects(
+            response, f"{reverse('coach_dashboard')}?team={self.team.id}&page=2&tab=players", fetch_redirect_response=False,
+        )
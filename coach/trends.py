@@ -0,0 +1,83 @@
+"""
+Recent-form numbers computed with SQL window functions.
+
+rolling_form() averages each stat over a player's last N games, one row per
+game, without loading the full history into Python. team_streaks() finds win
+and loss runs with the gaps-and-islands trick, so the database returns one row
+per run instead of one per game.
+"""
+from django.db import connections, router
+from django.db.models import Avg, F, RowRange, Window
+from django.db.models.functions import Coalesce
+
+from . import metrics
+from .models import Game
+
+
+def rolling_form(stats_qs, stats, window):
+    """
+    Per-game rows of `stats_qs` (one player's PlayerStats) with `<stat>_avg`,
+    the average of that stat over the current and previous window-1 games.
+    `stats` may mix PlayerStat columns and coach.metrics names.
+    """
+    order = [F('game_date').asc(), F('game_id').asc()]
+    frame = RowRange(start=-(window - 1), end=0)
+    derived = metrics.row_expressions([s for s in stats if s in metrics.METRICS])
+
+    annotations = {}
+    for stat in stats:
+        value = derived.get(stat) or Coalesce(F(stat), 0)
+        annotations[f'{stat}_avg'] = Window(Avg(value), partition_by=[F('player_id')], order_by=order, frame=frame)
+
+    rows = stats_qs.annotate(**annotations).order_by(*order).values('game_id', 'game_date', *annotations)
+    return [
+        {
+            'game_id': r['game_id'],
+            'date': r['game_date'].strftime('%Y-%m-%d'),
+            **{stat: r[f'{stat}_avg'] for stat in stats},
+        }
+        for r in rows
+    ]
+
+
+def team_streaks(team_id, season=None):
+    """Current, longest win and longest loss streaks of a team's games in date order"""
+    table = Game._meta.db_table
+    where, params = "team_id = %s", [team_id]
+    if season is not None:
+        where += " AND season_id = %s"
+        params.append(season.id)
+
+    # Consecutive games with the same result share (overall position - position within result)
+    sql = f"""
+        WITH ordered AS (
+            SELECT is_win, date,
+                   ROW_NUMBER() OVER (ORDER BY date, id) AS position,
+                   ROW_NUMBER() OVER (ORDER BY date, id)
+                     - ROW_NUMBER() OVER (PARTITION BY is_win ORDER BY date, id) AS island
+            FROM {table}
+            WHERE {where}
+        )
+        SELECT is_win, COUNT(*), MIN(date), MAX(date), MAX(position)
+        FROM ordered
+        GROUP BY is_win, island
+        ORDER BY MAX(position)
+    """
+    with connections[router.db_for_read(Game)].cursor() as cursor:
+        cursor.execute(sql, params)
+        runs = [
+            # str(): SQLite returns the dates as text, Postgres as date objects
+            {'result': 'Win' if is_win else 'Loss', 'length': length, 'start': str(start), 'end': str(end)}
+            for is_win, length, start, end, _ in cursor.fetchall()
+        ]
+
+    def longest(result):
+        # Earliest run wins ties
+        candidates = [r for r in runs if r['result'] == result]
+        return max(candidates, key=lambda r: r['length']) if candidates else None
+
+    return {
+        'current': runs[-1] if runs else None,
+        'longest_win': longest('Win'),
+        'longest_loss': longest('Loss'),
+    }
@@ -6,6 +6,9 @@ urlpatterns = [
     # DASHBOARD
     # ===============================
     path('dashboard/', views.coach_dashboard, name='coach_dashboard'),
+    path('dashboard/tab/<str:tab>/', views.dashboard_tab, name='dashboard_tab'),
+    path('dashboard/data/events/', views.dashboard_events_data, name='dashboard_events_data'),
+    path('dashboard/data/players/', views.dashboard_players_data, name='dashboard_players_data'),
     
     # ===============================
     # TEAM MANAGEMENT
@@ -14,6 +17,7 @@ urlpatterns = [
     path('team/<int:team_id>/', views.team_detail, name='team_detail'),
     path('team/<int:team_id>/edit/', views.edit_team, name='edit_team'),
     path('team/<int:team_id>/delete/', views.delete_team, name='delete_team'),
+    path('team/<int:team_id>/rollover/', views.rollover_season, name='rollover_season'),
     
     # ===============================
     # PLAYER MANAGEMENT
@@ -36,6 +40,9 @@ urlpatterns = [
     # New JSON API for Modal
     path('event/<int:event_id>/details/', views.get_event_details, name='get_event_details'),
     path('event/<int:event_id>/mark_attendance/', views.mark_attendance, name='mark_attendance'),
+    path('team/<int:team_id>/attendance-matrix/', views.attendance_matrix, name='attendance_matrix'),
+    path('event/<int:event_id>/checkin-link/', views.event_checkin_link, name='event_checkin_link'),
+    path('checkin/<str:token>/', views.event_checkin, name='event_checkin'),
     
     # ===============================
     # STATISTICS & GAME STATS
@@ -45,7 +52,25 @@ urlpatterns = [
     path('stats/save/', views.save_game_stats, name='save_game_stats'),
     path('player/<int:player_id>/stats/', views.player_stats_history, name='player_stats_history'),
     path('player/<int:player_id>/history/', views.player_stats_page, name='player_stats_page'),
+    path('team/<int:team_id>/leaderboard/', views.team_leaderboard, name='team_leaderboard'),
+    path('team/<int:team_id>/streaks/', views.team_streaks, name='team_streaks'),
+    path('team/<int:team_id>/analytics/', views.team_analytics, name='team_analytics'),
+    path('player/<int:player_id>/form/', views.player_form, name='player_form'),
+    path('player/<int:player_id>/similar/', views.similar_players, name='similar_players'),
+    path('team/<int:team_id>/head-to-head/', views.team_head_to_head, name='team_head_to_head'),
+    path('game/<int:game_id>/live/', views.live_stat_delta, name='live_stat_delta'),
+    path('game/<int:game_id>/live/stream/', views.live_stat_stream, name='live_stat_stream'),
+    path('game/<int:game_id>/stats/at/', views.game_stats_at, name='game_stats_at'),
+    path('game/<int:game_id>/stats/history/', views.game_stats_history, name='game_stats_history'),
+    path('search/', views.search_view, name='search'),
     
+    # ===============================
+    # BACKGROUND JOBS
+    # ===============================
+    path('batch/', views.batch, name='batch'),
+    path('sync/', views.sync, name='sync'),
+    path('jobs/<int:job_id>/', views.job_status, name='job_status'),
+
     # ===============================
     # PROFILE MANAGEMENT
     # ===============================
@@ -1,7 +1,17 @@
+import base64
+import hashlib
 import json
+from datetime import timedelta
+from functools import lru_cache
 from django.core.serializers.json import DjangoJSONEncoder
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, StreamingHttpResponse
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django.contrib.auth import authenticate, login, logout, update_session_auth_hash
 from django.contrib.auth.models import User
 from django.contrib import messages
@@ -10,9 +20,20 @@ from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 from django.contrib.auth.forms import PasswordChangeForm
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django.urls import reverse
-from django.db import models
-from .models import Player, Team, CoachProfile, Event, Attendance, PlayerStat, Game
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Coalesce
+from .models import (
+    Player, Team, CoachProfile, Event, Attendance, PlayerStat, Game, Job, Season, Opponent, IdempotencyKey,
+    PLAYER_STAT_FIELDS, PLAYER_STAT_EDIT_FIELDS,
+)
+from .responses import FastJsonResponse, wants_compact
+from .images import picture_files, schedule_profile_picture_processing
+from . import analytics, archive, boxscore, changelog, checkin, deletion, live, metrics, revisions, search, similarity, trends
+from .seasons import rollover_team
+from .signals import bump_team_version
+from .db_router import read_from_replica
 
 
 # ===============================
@@ -129,7 +150,6 @@ def profile_view(request):
     coach_profile, created = CoachProfile.objects.get_or_create(user=request.user)
 
     if request.method == "POST":
-        print(f"DEBUG: Profile POST received. FILES keys: {request.FILES.keys()}")
         user = request.user
         user.first_name = request.POST.get('first_name', user.first_name)
         user.last_name = request.POST.get('last_name', user.last_name)
@@ -142,20 +162,22 @@ def profile_view(request):
         coach_profile.birthday = clean_input(request.POST.get('birthday'))
         coach_profile.gender = clean_input(request.POST.get('gender'))
         
-        if 'profile_picture' in request.FILES:
-            print("DEBUG: profile_picture found in request.FILES")
+        new_picture = 'profile_picture' in request.FILES
+        if new_picture:
+            # The old thumbnails must not be served for the new picture
+            replaced = picture_files(coach_profile)
             coach_profile.profile_picture = request.FILES['profile_picture']
-        else:
-            print("DEBUG: profile_picture NOT in request.FILES")
+            coach_profile.profile_picture_variants = {}
 
         user.save()
         coach_profile.save()
-        print(f"DEBUG: Profile saved. Current picture: {coach_profile.profile_picture}")
+        if new_picture:
+            # Resize/strip/convert off the request thread
+            schedule_profile_picture_processing(coach_profile, replaced)
         
         messages.success(request, "Your profile has been updated.")
         return redirect('profile')
 
-    print("DEBUG: Loading profile_view using auth/profile_v3.html")
     return render(request, 'auth/profile_v3.html', {
         'coach_profile': coach_profile,
         'user': request.user
@@ -184,13 +206,18 @@ def change_password(request):
 # DASHBOARD & MAIN VIEWS
 # ===============================
 
+DASHBOARD_TABS = ("teams", "players", "schedule", "statistics")
+DASHBOARD_FRAGMENT_TABS = ("teams", "players", "schedule")
+DASHBOARD_DATA_TIMEOUT = 60 * 60 * 24  # Keys are versioned, so this only bounds memory use
+DASHBOARD_PAGE_SIZE = 50
+ROSTER_ATTENDANCE_FILTERS = ("present", "absent", "no_record")
+
 @login_required(login_url="login")
+@read_from_replica
 def coach_dashboard(request):
     """Main dashboard view"""
     coach_profile = CoachProfile.objects.filter(user=request.user).first()
 
-    today = timezone.now().date()
-    
     # Handle Create Team Form
     if request.method == "POST":
         name = (request.POST.get("team_name") or "").strip()
@@ -213,96 +240,236 @@ def coach_dashboard(request):
             messages.success(request, f'Team "{name}" created successfully!')
             return redirect("coach_dashboard")
 
-    # Fetch Teams & Players
+    # Only the requested tab is rendered here; the others are fetched by the page on demand
+    tab = request.GET.get("tab")
+    if tab not in DASHBOARD_TABS:
+        tab = "teams"
+
+    context = _dashboard_tab_context(request, tab)
+    context.update({
+        "coach_profile": coach_profile,
+        "active_tab": tab,
+    })
+    return render(request, "team_mgmt/coach_dashboard_v2.html", context)
+
+
+def _teams_version(teams):
+    """Changes whenever any of the teams or their players/events/attendance/stats change"""
+    return "-".join(t.cache_key for t in teams)
+
+
+def _dashboard_teams(request):
+    """
+    The coach's teams and the season name picked with ?season=<name>; a season
+    name narrows the dashboard to the teams and events of that season.
+    """
+    season = (request.GET.get("season") or "").strip()
     teams = Team.objects.filter(coach=request.user)
-    all_players = Player.objects.filter(team__in=teams).select_related('team').order_by('team__name', 'last_name')
+    if season:
+        teams = teams.filter(seasons__name=season).distinct()
+    return teams, season
+
+
+def _season_token(season):
+    """Cache-key safe form of a free-text season name"""
+    return hashlib.md5(season.encode(), usedforsecurity=False).hexdigest()[:12] if season else ""
+
+
+def _dashboard_etag(request, *args, **kwargs):
+    """Validator shared by the dashboard fragment and data endpoints"""
+    teams, season = _dashboard_teams(request)
+    teams = teams.only("id", "cache_version")
+    # The query string carries the season, filters, page and calendar month
+    raw = f"{request.user.id}:{_teams_version(teams)}:{timezone.now().date()}:{request.GET.urlencode()}"
+    return hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def _dashboard_tab_context(request, tab):
+    """
+    Data for a single dashboard tab. The roster and event pages are computed
+    lazily, so a cached template fragment (keyed on teams_version and the
+    filters) skips their queries.
+    """
+    teams, season = _dashboard_teams(request)
+    context = {
+        "teams": teams,
+        "teams_version": _teams_version(teams),
+        "today": timezone.now().date(),
+        "season": season,
+    }
 
-    # Build latest attendance per player
-    # Build Attendance Ratio & Latest Status
-    player_attendance_map = {}
-    if all_players.exists():
-        # 1. Total Events per Team
-        # We count ALL events (past and future) as requested
-        team_event_counts = {}
-        for t in teams:
-            count = Event.objects.filter(team=t).count()
-            team_event_counts[t.id] = count
-
-        # 2. Player Attendance Counts (Present=True) - for ALL events
-        player_present_counts = {}
-        attendance_records = Attendance.objects.filter(
-            player__in=all_players, 
-            present=True
+    if tab == "players":
+        team_id = request.GET.get("team") or ""
+        attendance = request.GET.get("attendance") or ""
+        page = request.GET.get("page") or ""
+        context.update({"player_team": team_id, "player_attendance": attendance, "page": page})
+        context["players_page"] = lru_cache(maxsize=None)(
+            lambda: _dashboard_roster(teams, season, team_id, attendance, page)
+        )
+    elif tab == "schedule":
+        all_events = Event.objects.filter(coach=request.user, team__deleted_at__isnull=True).select_related('team')
+        if season:
+            all_events = all_events.filter(season__name=season)
+        upcoming = all_events.filter(date__gte=context["today"]).order_by('date', 'time')
+        past = all_events.filter(date__lt=context["today"]).order_by('-date', '-time')
+        upcoming_page = request.GET.get("upcoming_page") or ""
+        past_page = request.GET.get("past_page") or ""
+        context.update({"upcoming_page": upcoming_page, "past_page": past_page})
+        context["upcoming_events"] = lru_cache(maxsize=None)(
+            lambda: Paginator(upcoming, DASHBOARD_PAGE_SIZE).get_page(upcoming_page)
+        )
+        context["past_events"] = lru_cache(maxsize=None)(
+            lambda: Paginator(past, DASHBOARD_PAGE_SIZE).get_page(past_page)
         )
-        for att in attendance_records:
-            player_present_counts[att.player_id] = player_present_counts.get(att.player_id, 0) + 1
-
-        # 3. Latest Attendance (Existing Logic)
-        player_attendance_map = {}
-        att_qs = Attendance.objects.filter(player__in=all_players).select_related('player', 'event').order_by('player_id', '-recorded_at')
-        seen_players = set()
-        for att in att_qs:
-            if att.player_id not in seen_players:
-                player_attendance_map[att.player_id] = {
-                    'present': att.present,
-                    'event_id': att.event_id,
-                    'event_title': att.event.title,
-                }
-                seen_players.add(att.player_id)
-
-        # 4. Attach to Player Objects
-        for p in all_players:
-            p.latest_attendance = player_attendance_map.get(p.id)
-            
-            # Ratio Calculation
-            total_events = team_event_counts.get(p.team_id, 0)
-            present_count = player_present_counts.get(p.id, 0)
-            p.attendance_ratio = f"{present_count}/{total_events}" if total_events > 0 else "0/0"
 
+    return context
 
-    # Fetch & Sort Events
-    all_events = Event.objects.filter(coach=request.user).select_related('team')
-    
-    upcoming_events = all_events.filter(date__gte=today).order_by('date', 'time')
-    past_events = all_events.filter(date__lt=today).order_by('-date', '-time')
 
-    # Prepare Data for Calendar (JSON)
-    events_json = []
-    for event in all_events:
-        events_json.append({
-            'id': event.id,
-            'title': event.title,
-            'date': event.date.strftime('%Y-%m-%d'), 
-            'time': event.time.strftime('%H:%M'), 
-            'type': event.event_type,
-            'location': event.location,
-            'opponent': event.opponent,
-            'notes': event.notes,
-            'team_id': event.team.id
-        })
+@login_required(login_url="login")
+@read_from_replica
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_dashboard_etag)
+def dashboard_tab(request, tab):
+    """HTML fragment for one dashboard tab"""
+    if tab not in DASHBOARD_FRAGMENT_TABS:
+        raise Http404("Unknown tab")
+    return render(request, f"team_mgmt/dashboard/_{tab}_tab.html", _dashboard_tab_context(request, tab))
 
-    # Prepare players grouped by team
-    players_by_team = {}
-    for t in teams:
-        ps = Player.objects.filter(team=t).order_by('last_name', 'first_name')
-        players_by_team[t.id] = [
-            {'id': p.id, 'name': p.name, 'jersey': p.jersey_number or ''} for p in ps
-        ]
 
-    return render(
-        request,
-        "team_mgmt/coach_dashboard_v2.html",
-        {
-            "teams": teams,
-            "coach_profile": coach_profile,
-            "all_players": all_players,
-            "upcoming_events": upcoming_events,
-            "past_events": past_events,
-            "events_json": events_json,
-            "player_attendance_map": player_attendance_map,
-            "players_by_team": players_by_team,
-        },
-    )
+@login_required(login_url="login")
+@read_from_replica
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_dashboard_etag)
+def dashboard_events_data(request):
+    """
+    Calendar events for the schedule tab and event modals: one month per
+    request (?month=YYYY-MM, default the current one), or a single event
+    with ?id=.
+    """
+    teams, season = _dashboard_teams(request)
+    queryset = Event.objects.filter(coach=request.user, team__deleted_at__isnull=True)
+    if season:
+        queryset = queryset.filter(season__name=season)
+
+    event_id = request.GET.get('id')
+    if event_id is not None:
+        if not event_id.isdigit():
+            return FastJsonResponse({'error': 'id must be an integer'}, status=400)
+        return FastJsonResponse({'events': [_calendar_event(e) for e in queryset.filter(id=event_id)]})
+
+    month = request.GET.get('month') or timezone.now().strftime('%Y-%m')
+    try:
+        first = parse_date(f"{month}-01")
+    except ValueError:
+        first = None
+    if first is None:
+        return FastJsonResponse({'error': 'month must be YYYY-MM'}, status=400)
+    following = (first + timedelta(days=32)).replace(day=1)
+
+    key = f"dashboard-events:{request.user.id}:{_teams_version(teams)}:{_season_token(season)}:{first:%Y-%m}"
+    events = cache.get(key)
+    if events is None:
+        events = [_calendar_event(e) for e in queryset.filter(date__gte=first, date__lt=following)]
+        cache.set(key, events, DASHBOARD_DATA_TIMEOUT)
+    return FastJsonResponse({'month': f"{first:%Y-%m}", 'events': events})
+
+
+def _calendar_event(event):
+    return {
+        'id': event.id,
+        'title': event.title,
+        'date': event.date.strftime('%Y-%m-%d'),
+        'time': event.time.strftime('%H:%M'),
+        'type': event.event_type,
+        'location': event.location,
+        'opponent': event.opponent,
+        'notes': event.notes,
+        'team_id': event.team_id
+    }
+
+
+@login_required(login_url="login")
+@read_from_replica
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_dashboard_etag)
+def dashboard_players_data(request):
+    """Players grouped by team for the statistics tab"""
+    teams, season = _dashboard_teams(request)
+    key = f"dashboard-players:{request.user.id}:{_teams_version(teams)}:{_season_token(season)}"
+    players_by_team = cache.get(key)
+    if players_by_team is None:
+        players_by_team = {t.id: [] for t in teams}
+        for p in Player.objects.filter(team__in=teams).order_by('last_name', 'first_name'):
+            players_by_team[p.team_id].append({'id': p.id, 'name': p.name, 'jersey': p.jersey_number or ''})
+        cache.set(key, players_by_team, DASHBOARD_DATA_TIMEOUT)
+    return FastJsonResponse({'players_by_team': players_by_team})
+
+
+def _dashboard_roster(teams, season="", team_id="", attendance_filter="", page_number=1):
+    """
+    One page of the players of the given teams, optionally narrowed to one
+    team and to the outcome of their latest attendance ("present", "absent"
+    or "no_record"). Latest attendance and attendance ratio are attached to
+    the players of the page only.
+    """
+    players = Player.objects.filter(team__in=teams).select_related('team').order_by('team__name', 'last_name', 'id')
+    if team_id.isdigit():
+        players = players.filter(team_id=team_id)
+
+    attendance_rows = Attendance.objects.all()
+    if season:
+        attendance_rows = attendance_rows.filter(event__season__name=season)
+    if attendance_filter in ROSTER_ATTENDANCE_FILTERS:
+        latest = attendance_rows.filter(player=models.OuterRef('pk')).order_by('-recorded_at')
+        players = players.annotate(latest_present=models.Subquery(latest.values('present')[:1]))
+        if attendance_filter == "no_record":
+            players = players.filter(latest_present__isnull=True)
+        else:
+            players = players.filter(latest_present=(attendance_filter == "present"))
+
+    page = Paginator(players, DASHBOARD_PAGE_SIZE).get_page(page_number)
+    page.object_list = page_players = list(page.object_list)
+    if not page_players:
+        return page
+
+    attendance = attendance_rows.filter(player__in=page_players)
+    if season:
+        # 1. Events per Team within the season
+        team_event_counts = {
+            row['team']: row['count']
+            for row in Event.objects.filter(team__in=teams, season__name=season).values('team').annotate(count=models.Count('id'))
+        }
+    else:
+        # 1. Total Events per Team (denormalized counter, ALL events past and future)
+        team_event_counts = {t.id: t.event_count for t in teams}
+
+    # 2. Player Attendance Counts (Present=True)
+    player_present_counts = {
+        row['player']: row['count']
+        for row in attendance.filter(present=True).values('player').annotate(count=models.Count('id'))
+    }
+
+    # 3. Latest Attendance
+    player_attendance_map = {}
+    att_qs = attendance.select_related('event').order_by('player_id', '-recorded_at')
+    for att in att_qs:
+        if att.player_id not in player_attendance_map:
+            player_attendance_map[att.player_id] = {
+                'present': att.present,
+                'event_id': att.event_id,
+                'event_title': att.event.title,
+            }
+
+    # 4. Attach to Player Objects
+    for p in page_players:
+        p.latest_attendance = player_attendance_map.get(p.id)
+
+        # Ratio Calculation
+        total_events = team_event_counts.get(p.team_id, 0)
+        present_count = player_present_counts.get(p.id, 0)
+        p.attendance_ratio = f"{present_count}/{total_events}" if total_events > 0 else "0/0"
+
+    return page
 
 
 @login_required(login_url="login")
@@ -313,11 +480,10 @@ def teams_view(request):
 
 @login_required(login_url="login")
 def players_view(request):
-    """Players list view"""
-    teams = Team.objects.filter(coach=request.user)
-    players = Player.objects.filter(team__in=teams)
-    
-    return render(request, "team_mgmt/players_list.html", {"players": players})
+    """Players view - redirects to the (paginated) dashboard players tab"""
+    params = request.GET.copy()
+    params["tab"] = "players"
+    return redirect(f"{reverse('coach_dashboard')}?{params.urlencode()}")
 
 
 @login_required(login_url="login")
@@ -330,26 +496,69 @@ def schedule_view(request):
 # TEAM MANAGEMENT VIEWS
 # ===============================
 
+def _season_param(request, team):
+    """Season of `team` picked with ?season=<id>, or None for all history"""
+    season_id = request.GET.get("season") or ""
+    if not season_id.isdigit():
+        return None
+    return get_object_or_404(Season, id=season_id, team=team)
+
+
 @login_required(login_url="login")
+@read_from_replica
 def team_detail(request, team_id):
     """Team detail view"""
     team = get_object_or_404(Team, id=team_id, coach=request.user)
-    players = Player.objects.filter(team=team)
-    practices = Event.objects.filter(team=team, event_type='Practice').order_by('-date', '-time')
-
-    # Compute wins/losses from Game objects
+    season = _season_param(request, team)
+    events = Event.objects.filter(team=team)
     games = Game.objects.filter(team=team).order_by('-date')
-    wins = games.filter(is_win=True).count()
-    losses = games.filter(is_win=False).count()
-
-    # Calculate Attendance Ratio
-    total_events = Event.objects.filter(team=team).count()
-    player_attendance = Attendance.objects.filter(event__team=team, present=True).values('player').annotate(count=models.Count('player'))
-    attendance_map = {item['player']: item['count'] for item in player_attendance}
+    if season:
+        events = events.filter(season=season)
+        games = games.filter(season=season)
+    practices = events.filter(event_type='Practice').order_by('-date', '-time')
+    practice_count = practices.count()
+
+    # Archived seasons live in cold storage; rehydrate them read-only for viewing
+    history = archive.load_history(team) if team.status == "Archived" else None
+    if history and season:
+        history["events"] = [e for e in history["events"] if e.season_id == season.id]
+        history["games"] = [g for g in history["games"] if g.season_id == season.id]
+        season_event_ids = {e.id for e in history["events"]}
+        history["attendance"] = [a for a in history["attendance"] if a.event_id in season_event_ids]
+    if history:
+        archived_practices = [e for e in history["events"] if e.event_type == 'Practice']
+        practices = sorted([*practices, *archived_practices], key=lambda e: (e.date, e.time), reverse=True)
+        practice_count = len(practices)
+        games = sorted([*games, *history["games"]], key=lambda g: g.date, reverse=True)
+
+    # Roster with attendance ratio; only evaluated when the roster fragment is not cached
+    @lru_cache(maxsize=None)
+    def players():
+        roster = list(Player.objects.filter(team=team))
+        attendance = Attendance.objects.filter(event__team=team, present=True)
+        if season:
+            # event_date bounds let Postgres prune attendance partitions outside the season
+            attendance = attendance.filter(event__season=season, event_date__range=season.dates)
+            total_events = events.count() + len(history["events"] if history else ())
+        else:
+            total_events = team.event_count
+        player_attendance = attendance.values('player').annotate(count=models.Count('player'))
+        attendance_map = {item['player']: item['count'] for item in player_attendance}
+        if history:
+            for att in history["attendance"]:
+                if att.present:
+                    attendance_map[att.player_id] = attendance_map.get(att.player_id, 0) + 1
+
+        for p in roster:
+            present_count = attendance_map.get(p.id, 0)
+            p.attendance_ratio = f"{present_count}/{total_events}" if total_events > 0 else "0/0"
+        return roster
 
-    for p in players:
-        present_count = attendance_map.get(p.id, 0)
-        p.attendance_ratio = f"{present_count}/{total_events}" if total_events > 0 else "0/0"
+    if season:
+        wins = sum(1 for g in games if g.is_win)
+        losses = len(games) - wins
+    else:
+        wins, losses = team.wins, team.losses
 
     return render(
         request,
@@ -357,10 +566,14 @@ def team_detail(request, team_id):
         {
             "team": team,
             "players": players,
+            "player_count": team.player_count,
             "practices": practices,
+            "practice_count": practice_count,
             "games": games,
             "wins": wins,
             "losses": losses,
+            "season": season,
+            "seasons": team.seasons.all(),
         },
     )
 
@@ -376,18 +589,48 @@ def edit_team(request, team_id):
         team.season = (request.POST.get("season") or "").strip()
         team.location = (request.POST.get("location") or "").strip()
         team.max_players_allowed = request.POST.get("max_players_allowed") or 0
+        previous_status = team.status
         team.status = request.POST.get("status") or "Active"
 
         if not team.name:
             messages.error(request, "Team name is required.")
         else:
-            team.save()
+            # Only the form's fields: a full save would write back the counters and
+            # cache_version loaded above over concurrent F() updates
+            team.save(update_fields=["name", "sport", "season", "location", "max_players_allowed", "status"])
+            if team.status != previous_status:
+                archive.schedule_status_change(team, previous_status, user=request.user)
             messages.success(request, f'Team "{team.name}" updated successfully!')
             return redirect("team_detail", team_id=team.id)
 
     return redirect("team_detail", team_id=team_id)
 
 
+@login_required(login_url="login")
+def rollover_season(request, team_id):
+    """Start a new season of the team; the roster carries over"""
+    team = get_object_or_404(Team, id=team_id, coach=request.user)
+
+    if request.method == "POST":
+        name = (request.POST.get("season_name") or "").strip()
+        start_date = parse_date(request.POST.get("start_date") or "")
+        end_date = parse_date(request.POST.get("end_date") or "")
+
+        if not name or not start_date:
+            messages.error(request, "Season name and start date are required.")
+        elif end_date and end_date < start_date:
+            messages.error(request, "The season must end after it starts.")
+        else:
+            try:
+                rollover_team(team, name, start_date, end_date)
+            except ValueError as e:
+                messages.error(request, str(e))
+            else:
+                messages.success(request, f'Season "{name}" started with {team.player_count} players.')
+
+    return redirect("team_detail", team_id=team_id)
+
+
 @login_required(login_url="login")
 def delete_team(request, team_id):
     """Delete a team"""
@@ -395,8 +638,10 @@ def delete_team(request, team_id):
 
     if request.method == "POST":
         team_name = team.name
-        team.delete()
-        messages.success(request, f"Team '{team_name}' has been successfully removed.")
+        if deletion.delete_team(team, user=request.user):
+            messages.success(request, f"Team '{team_name}' has been removed. Its records are being cleaned up in the background.")
+        else:
+            messages.success(request, f"Team '{team_name}' has been successfully removed.")
         return redirect('coach_dashboard')
     
     return redirect('team_detail', team_id=team_id)
@@ -420,21 +665,27 @@ def add_player(request, team_id):
 
         if not first_name or not last_name:
             messages.error(request, "First name and last name are required.")
-        elif team.max_players_allowed > 0 and team.player_set.count() >= team.max_players_allowed:
-            messages.error(request, f"Cannot add player. Team has reached max capacity of {team.max_players_allowed}.")
         else:
-            Player.objects.create(
-                coach=request.user,
-                team=team,
-                name=f"{first_name} {last_name}",
-                first_name=first_name,
-                last_name=last_name,
-                email=email,
-                jersey_number=jersey_number,
-                position=position,
-            )
-            messages.success(request, f'Player "{first_name} {last_name}" added successfully!')
-            return redirect("team_detail", team_id=team.id)
+            with transaction.atomic():
+                # Claim the roster spot in the same UPDATE that checks capacity
+                reserved = team.reserve_roster_spot()
+                if reserved:
+                    player = Player(
+                        coach=request.user,
+                        team=team,
+                        name=f"{first_name} {last_name}",
+                        first_name=first_name,
+                        last_name=last_name,
+                        email=email,
+                        jersey_number=jersey_number,
+                        position=position,
+                    )
+                    player._roster_spot_reserved = True
+                    player.save()
+            if reserved:
+                messages.success(request, f'Player "{first_name} {last_name}" added successfully!')
+                return redirect("team_detail", team_id=team.id)
+            messages.error(request, f"Cannot add player. Team has reached max capacity of {team.max_players_allowed}.")
 
     return redirect("team_detail", team_id=team.id)
 
@@ -473,7 +724,8 @@ def remove_player(request, team_id, player_id):
 
     if request.method == "POST":
         player_name = player.name
-        player.delete()
+        with transaction.atomic():
+            player.delete()
         messages.success(request, f'Player "{player_name}" removed successfully!')
 
     return redirect("team_detail", team_id=team.id)
@@ -514,10 +766,11 @@ def add_event(request):
         # Default to present=False (Absent) initially
         players = team.player_set.all()
         attendance_batch = [
-            Attendance(event=event, player=player, present=False)
+            Attendance(event=event, player=player, present=False, event_date=event.date)
             for player in players
         ]
         Attendance.objects.bulk_create(attendance_batch)
+        changelog.record_many(Attendance, [a.id for a in attendance_batch], event.coach_id, event.team_id)
         messages.success(request, "Event scheduled successfully!")
         
         return redirect(f"{reverse('coach_dashboard')}?tab=schedule")
@@ -525,28 +778,38 @@ def add_event(request):
     return redirect("coach_dashboard")
 
 
+EVENT_EDIT_FIELDS = ("title", "event_type", "date", "time", "location", "opponent", "notes")
+
+
+def _edit_event(user, data):
+    """Apply the fields present in `data` (and an optional team_id) to one of the coach's events"""
+    event = get_object_or_404(Event, id=data["event_id"], coach=user)
+    for field in EVENT_EDIT_FIELDS:
+        if field in data:
+            setattr(event, field, data[field])
+
+    team_id = data.get("team_id")
+    if team_id:
+        event.team = get_object_or_404(Team, id=team_id, coach=user)
+
+    with transaction.atomic():
+        event.save()
+    return {'success': True, 'event_id': event.id}
+
+
 @login_required(login_url="login")
 def edit_event(request, event_id):
     """Edit an event"""
-    event = get_object_or_404(Event, id=event_id, coach=request.user)
-    
     if request.method == "POST":
-        event.title = request.POST.get("title")
-        event.event_type = request.POST.get("event_type")
-        event.date = request.POST.get("date")
-        event.time = request.POST.get("time")
-        event.location = request.POST.get("location")
-        event.opponent = request.POST.get("opponent")
-        event.notes = request.POST.get("notes")
-        
-        team_id = request.POST.get("team_id")
-        if team_id:
-            event.team = get_object_or_404(Team, id=team_id, coach=request.user)
-
-        event.save()
+        _edit_event(request.user, {
+            "event_id": event_id,
+            "team_id": request.POST.get("team_id"),
+            **{field: request.POST.get(field) for field in EVENT_EDIT_FIELDS},
+        })
         messages.success(request, "Event updated successfully!")
         return redirect(f"{reverse('coach_dashboard')}?tab=schedule")
-        
+
+    get_object_or_404(Event, id=event_id, coach=request.user)
     return redirect("coach_dashboard")
 
 
@@ -556,7 +819,8 @@ def delete_event(request, event_id):
     event = get_object_or_404(Event, id=event_id, coach=request.user)
     
     if request.method == "POST":
-        event.delete()
+        with transaction.atomic():
+            event.delete()
         messages.success(request, "Event removed successfully!")
         return redirect(f"{reverse('coach_dashboard')}?tab=schedule")
         
@@ -568,13 +832,14 @@ def delete_event(request, event_id):
 # ===============================
 
 @login_required(login_url="login")
+@read_from_replica
 def event_attendance(request, event_id):
     """Handle event attendance (GET players, POST to save)"""
     event = get_object_or_404(Event, id=event_id, coach=request.user)
 
     if request.method == 'GET':
         players = list(Player.objects.filter(team=event.team).order_by('last_name', 'first_name'))
-        existing = Attendance.objects.filter(event=event)
+        existing = Attendance.objects.filter(event=event, event_date=event.date)
         att_map = {a.player_id: a.present for a in existing}
         players_data = []
         for p in players:
@@ -584,17 +849,17 @@ def event_attendance(request, event_id):
                 'jersey_number': p.jersey_number,
                 'present': att_map.get(p.id, False),
             })
-        return JsonResponse({
+        return FastJsonResponse({
             'event_id': event.id,
             'team_id': event.team.id,
             'players': players_data
-        })
+        }, compact=wants_compact(request))
 
     if request.method == 'POST':
         try:
             payload = json.loads(request.body.decode('utf-8'))
         except Exception:
-            return JsonResponse({'error': 'Invalid JSON payload'}, status=400)
+            return FastJsonResponse({'error': 'Invalid JSON payload'}, status=400)
 
         attendance = payload.get('attendance', {})
         updated = 0
@@ -609,14 +874,128 @@ def event_attendance(request, event_id):
                 continue
 
             obj, created = Attendance.objects.update_or_create(
-                event=event, player=player,
+                event=event, player=player, event_date=event.date,
                 defaults={'present': bool(present_val), 'recorded_by': request.user}
             )
             updated += 1
 
-        return JsonResponse({'success': True, 'updated': updated})
+        return FastJsonResponse({'success': True, 'updated': updated})
+
+    return FastJsonResponse({'error': 'Method not allowed'}, status=405)
+
+
+def _encode_bits(bits, length):
+    """Base64 of an int bitset; event i is bit i % 8 of byte i // 8"""
+    return base64.b64encode(bits.to_bytes((length + 7) // 8, 'little')).decode('ascii')
+
+
+def _attendance_streaks(present, recorded, length):
+    """(current, longest) runs of present among recorded events, in event order"""
+    current = longest = 0
+    for i in range(length):
+        if not recorded >> i & 1:
+            continue
+        current = current + 1 if present >> i & 1 else 0
+        longest = max(longest, current)
+    return current, longest
+
+
+def _attendance_matrix(team, season=None, event_type=''):
+    events = Event.objects.filter(team=team)
+    attendance = Attendance.objects.filter(event__team=team)
+    if season:
+        events = events.filter(season=season)
+        attendance = attendance.filter(event__season=season, event_date__range=season.dates)
+    if event_type:
+        events = events.filter(event_type=event_type)
+        attendance = attendance.filter(event__event_type=event_type)
+
+    events = list(events.order_by('date', 'time', 'id').values_list('id', 'date'))
+    players = list(Player.objects.filter(team=team).order_by('last_name', 'first_name').values_list('id', 'name'))
+    event_index = {event_id: i for i, (event_id, _) in enumerate(events)}
+    present = {player_id: 0 for player_id, _ in players}
+    recorded = dict(present)
+    for player_id, event_id, is_present in attendance.values_list('player_id', 'event_id', 'present'):
+        # Rows of players no longer on the roster are left out
+        if player_id in recorded and event_id in event_index:
+            bit = 1 << event_index[event_id]
+            recorded[player_id] |= bit
+            if is_present:
+                present[player_id] |= bit
+
+    length = len(events)
+    streaks = [_attendance_streaks(present[pid], recorded[pid], length) for pid, _ in players]
+    return {
+        'events': [event_id for event_id, _ in events],
+        'event_dates': [day.strftime('%Y-%m-%d') for _, day in events],
+        'players': [player_id for player_id, _ in players],
+        'player_names': [name for _, name in players],
+        'present': [_encode_bits(present[pid], length) for pid, _ in players],
+        'recorded': [_encode_bits(recorded[pid], length) for pid, _ in players],
+        'percentages': [
+            round(present[pid].bit_count() / recorded[pid].bit_count() * 100, 1) if recorded[pid] else None
+            for pid, _ in players
+        ],
+        'current_streaks': [current for current, _ in streaks],
+        'longest_streaks': [longest for _, longest in streaks],
+    }
+
+
+@login_required(login_url='login')
+@read_from_replica
+def attendance_matrix(request, team_id):
+    """
+    Players x events attendance in one payload (?season=<id>, ?type=Practice).
+    Per player, `present` and `recorded` are base64 bitsets over `events`;
+    lists are parallel to `players`.
+    """
+    team = get_object_or_404(Team, id=team_id, coach=request.user)
+    season = _season_param(request, team)
+    event_type = request.GET.get('type') or ''
+    key = f"attendance-matrix:{team.cache_key}:{season.id if season else ''}:{_season_token(event_type)}"
+    matrix = cache.get(key)
+    if matrix is None:
+        matrix = _attendance_matrix(team, season, event_type)
+        cache.set(key, matrix, DASHBOARD_DATA_TIMEOUT)
+    return FastJsonResponse({
+        'team_id': team.id,
+        'season': season.name if season else None,
+        **matrix,
+    }, compact=wants_compact(request))
+
 
-    return JsonResponse({'error': 'Method not allowed'}, status=405)
+# ===============================
+# SELF CHECK-IN VIEWS
+# ===============================
+
+@login_required(login_url="login")
+def event_checkin_link(request, event_id):
+    """API returning the event's public check-in URL, for the coach to show as a QR code"""
+    event = get_object_or_404(Event, id=event_id, coach=request.user)
+    url = request.build_absolute_uri(reverse('event_checkin', args=[checkin.make_token(event)]))
+    return FastJsonResponse({'event_id': event.id, 'url': url})
+
+
+def event_checkin(request, token):
+    """Public check-in page players reach by scanning the event's QR code (no login)"""
+    event_id = checkin.read_token(token)
+    entry = checkin.roster(event_id) if event_id is not None else None
+    if entry is None:
+        raise Http404("Check-in link is not valid")
+
+    context = {'event': entry, 'open': checkin.is_open(entry), 'result': None}
+    if request.method == 'POST' and context['open']:
+        try:
+            player_id = int(request.POST.get('player_id', ''))
+        except ValueError:
+            player_id = None
+        if player_id not in entry['player_ids']:
+            # Only players on the token's team can check in
+            context['result'] = checkin.UNKNOWN_PLAYER
+            return render(request, 'team_mgmt/checkin.html', context, status=400)
+        context['result'] = checkin.check_in(entry, player_id)
+        context['player_name'] = next((name for pid, name, _ in entry['players'] if pid == player_id), '')
+    return render(request, 'team_mgmt/checkin.html', context)
 
 
 # ===============================
@@ -624,6 +1003,7 @@ def event_attendance(request, event_id):
 # ===============================
 
 @login_required(login_url="login")
+@read_from_replica
 def get_games_by_team(request, team_id):
     """API endpoint to get games and opponents for a specific team"""
     team = get_object_or_404(Team, id=team_id, coach=request.user)
@@ -636,7 +1016,6 @@ def get_games_by_team(request, team_id):
     
     # Build games list
     games = []
-    opponents = set()
     
     for event in game_events:
         games.append({
@@ -645,14 +1024,15 @@ def get_games_by_team(request, team_id):
             'date': event.date.strftime('%Y-%m-%d'),
             'opponent': event.opponent or 'N/A'
         })
-        if event.opponent:
-            opponents.add(event.opponent)
+
+    # Deduplicated by Opponent.normalized_name
+    opponents = Opponent.objects.filter(team=team, events__event_type='Game').distinct().values_list('name', flat=True)
     
-    return JsonResponse({
+    return FastJsonResponse({
         'games': games,
         'opponents': list(opponents),
         'sport': team.sport
-    })
+    }, compact=wants_compact(request))
 
 
 @login_required(login_url="login")
@@ -686,71 +1066,78 @@ def stats_view(request):
     })
 
 
+def _save_game_stats(user, data):
+    """
+    Upsert the Game of data['game'] and merge data['stats'] into its player
+    stats (see coach.boxscore). Rows carrying a `version` are merged field by
+    field; a box score without versions replaces the game's stats as before.
+    """
+    game_data = data.get('game', {})
+    stats_data = data.get('stats', {})
+
+    team_id = game_data.get('team_id')
+    event_id = game_data.get('event_id')
+
+    team = get_object_or_404(Team, id=team_id, coach=user)
+    event = get_object_or_404(Event, id=event_id, team=team, coach=user)
+
+    # Create or update Game record
+    defaults = {
+        'coach': user,
+        'date': game_data.get('date'),
+        'opponent': game_data.get('opponent', ''),
+        'title': event.title,
+        'is_win': game_data.get('is_win', False),
+    }
+    # Final score is optional
+    for field in ('points_for', 'points_against'):
+        if game_data.get(field) not in (None, ''):
+            defaults[field] = int(game_data[field])
+    game, created = Game.objects.update_or_create(team=team, event=event, defaults=defaults)
+
+    versions, conflicts = boxscore.save_rows(game, stats_data, user)
+    if not any('version' in stats for stats in stats_data.values()):
+        # Whole box score from an older client: players left out are removed
+        PlayerStat.objects.filter(game=game, game_date=game.date).exclude(player_id__in=versions).delete()
+
+    if conflicts:
+        message = (
+            f'Stats for {len(conflicts)} of {len(versions)} players conflict with another editor; '
+            'review their current values and save again'
+        )
+    else:
+        message = f'Stats saved successfully for {len(versions)} players'
+    return {
+        'success': not conflicts,
+        'message': message,
+        'game_id': game.id,
+        'versions': versions,
+        'conflicts': conflicts,
+    }
+
+
 @login_required(login_url="login")
 def save_game_stats(request):
-    """Save game statistics"""
+    """
+    Save game statistics. Responds 409 with the current rows when some fields
+    conflicted with another editor; every other field is saved.
+    """
     if request.method != 'POST':
-        return JsonResponse({'error': 'POST required'}, status=400)
+        return FastJsonResponse({'error': 'POST required'}, status=400)
     
     try:
-        data = json.loads(request.body)
-        game_data = data.get('game', {})
-        stats_data = data.get('stats', {})
-        
-        team_id = game_data.get('team_id')
-        event_id = game_data.get('event_id')
-        
-        team = get_object_or_404(Team, id=team_id, coach=request.user)
-        event = get_object_or_404(Event, id=event_id, team=team, coach=request.user)
-        
-        # Create or update Game record
-        game, created = Game.objects.update_or_create(
-            team=team,
-            event=event,
-            defaults={
-                'coach': request.user,
-                'date': game_data.get('date'),
-                'opponent': game_data.get('opponent', ''),
-                'title': event.title,
-                'is_win': game_data.get('is_win', False),
-            }
-        )
-        
-        # Delete existing stats for this game (in case of re-saving)
-        PlayerStat.objects.filter(game=game).delete()
-        
-        # Save player stats
-        saved_count = 0
-        for player_id, stats in stats_data.items():
-            try:
-                player = Player.objects.get(id=int(player_id), team=team)
-                
-                # Create PlayerStat with all the stats from the form
-                PlayerStat.objects.create(
-                    player=player,
-                    game=game,
-                    **stats  # Unpack all stats from the dictionary
-                )
-                saved_count += 1
-            except (Player.DoesNotExist, ValueError) as e:
-                print(f"Error saving stats for player {player_id}: {e}")
-                continue
-        
-        return JsonResponse({
-            'success': True,
-            'message': f'Stats saved successfully for {saved_count} players',
-            'game_id': game.id
-        })
-        
+        result = _save_game_stats(request.user, json.loads(request.body))
+        return FastJsonResponse(result, status=409 if result['conflicts'] else 200)
     except Exception as e:
         import traceback
         print(traceback.format_exc())
-        return JsonResponse({
+        return FastJsonResponse({
             'error': str(e)
         }, status=400)
 
 
 @login_required(login_url='login')
+@read_from_replica
 def event_stats(request, event_id):
     """Return the Game (if any) associated with this Event and its player stats"""
     event = get_object_or_404(Event, id=event_id, coach=request.user)
@@ -758,13 +1145,14 @@ def event_stats(request, event_id):
     # Get the game linked to this event
     game = Game.objects.filter(event=event).order_by('-date', '-created_at').first()
     if not game:
-        return JsonResponse({'game': None, 'stats': {}})
+        return FastJsonResponse({'game': None, 'stats': {}})
 
     stats = {}
-    for ps in game.player_stats.select_related('player').all():
+    for ps in game.player_stats.filter(game_date=game.date).select_related('player'):
         stats[ps.player.id] = {
             'player_id': ps.player.id,
             'player_name': ps.player.name,
+            'version': ps.version,
             # Basketball
             'two_pt_made': ps.two_pt_made, 'two_pt_attempt': ps.two_pt_attempt,
             'three_pt_made': ps.three_pt_made, 'three_pt_attempt': ps.three_pt_attempt,
@@ -803,14 +1191,21 @@ def event_stats(request, event_id):
         'is_win': game.is_win,
     }
 
-    return JsonResponse({'game': game_data, 'stats': stats})
+    return FastJsonResponse({'game': game_data, 'stats': stats}, compact=wants_compact(request))
 
 
 @login_required(login_url='login')
+@read_from_replica
 def player_stats_history(request, player_id):
     """Get player statistics history"""
     player = get_object_or_404(Player, id=player_id, team__coach=request.user)
-    stats_qs = PlayerStat.objects.filter(player=player).select_related('game').order_by('-game__date')
+    stats_qs = PlayerStat.objects.filter(player=player).select_related('game__team').order_by('-game__date')
+    derived = metrics.for_sport(player.team.sport)
+    if derived:
+        stats_qs = stats_qs.with_metrics(*derived)
+    season = _season_param(request, player.team)
+    if season:
+        stats_qs = stats_qs.filter(game__season=season, game_date__range=season.dates)
     
     data = []
     for s in stats_qs:
@@ -830,12 +1225,227 @@ def player_stats_history(request, player_id):
             'steals': s.steals,
             'blocks': s.blocks,
             'turnovers': s.turnovers,
+            'metrics': {name: getattr(s, name) for name in derived},
         })
     
-    return JsonResponse({
+    return FastJsonResponse({
         'player': {'id': player.id, 'name': player.name},
         'history': data
-    })
+    }, compact=wants_compact(request))
+
+
+LEADERBOARD_STATS = PLAYER_STAT_FIELDS
+
+
+@login_required(login_url='login')
+@read_from_replica
+def team_leaderboard(request, team_id):
+    """Players ranked by a summed stat or derived metric (?stat=goals, ?stat=fg_pct), optionally within ?season=<id>"""
+    team = get_object_or_404(Team, id=team_id, coach=request.user)
+    stat = request.GET.get('stat') or 'goals'
+    if stat in metrics.METRICS:
+        total = metrics.total(stat)
+    elif stat in LEADERBOARD_STATS:
+        total = Coalesce(models.Sum(stat), 0)
+    else:
+        return FastJsonResponse({'error': f'Unknown stat: {stat}'}, status=400)
+
+    stats_qs = PlayerStat.objects.filter(game__team=team)
+    season = _season_param(request, team)
+    if season:
+        stats_qs = stats_qs.filter(game__season=season, game_date__range=season.dates)
+    rows = (
+        stats_qs.values('player_id', 'player__name')
+        .annotate(total=total, games=models.Count('game', distinct=True))
+        # Ratios are NULL for players without attempts; rank them last
+        .order_by(models.F('total').desc(nulls_last=True), 'player__name')
+    )
+    leaders = [
+        {'player_id': r['player_id'], 'name': r['player__name'], 'total': r['total'], 'games': r['games']}
+        for r in rows
+    ]
+    return FastJsonResponse({
+        'team_id': team.id,
+        'season': season.name if season else None,
+        'stat': stat,
+        'leaders': leaders,
+    }, compact=wants_compact(request))
+
+
+FORM_DEFAULT_WINDOW = 5
+FORM_MAX_WINDOW = 50
+
+
+@login_required(login_url='login')
+@read_from_replica
+def player_form(request, player_id):
+    """Per-game rolling averages over the last N games (?window=5, ?stats=points,fg_pct, ?season=<id>)"""
+    player = get_object_or_404(Player.objects.select_related('team'), id=player_id, team__coach=request.user)
+    team = player.team
+    window = request.GET.get('window') or ''
+    window = min(int(window), FORM_MAX_WINDOW) if window.isdigit() and int(window) > 0 else FORM_DEFAULT_WINDOW
+    stats = [s for s in (request.GET.get('stats') or '').split(',') if s]
+    stats = stats or metrics.for_sport(team.sport) or LEADERBOARD_STATS
+    unknown = [s for s in stats if s not in LEADERBOARD_STATS and s not in metrics.METRICS]
+    if unknown:
+        return FastJsonResponse({'error': f"Unknown stat: {', '.join(unknown)}"}, status=400)
+
+    season = _season_param(request, team)
+    stats_token = hashlib.md5(','.join(stats).encode(), usedforsecurity=False).hexdigest()[:12]
+    key = f"player-form:{player.id}:{team.cache_key}:{season.id if season else ''}:{window}:{stats_token}"
+    games = cache.get(key)
+    if games is None:
+        stats_qs = PlayerStat.objects.filter(player=player)
+        if season:
+            stats_qs = stats_qs.filter(game__season=season, game_date__range=season.dates)
+        games = trends.rolling_form(stats_qs, stats, window)
+        cache.set(key, games, DASHBOARD_DATA_TIMEOUT)
+
+    return FastJsonResponse({
+        'player': {'id': player.id, 'name': player.name},
+        'season': season.name if season else None,
+        'window': window,
+        'current': games[-1] if games else None,
+        'games': games,
+    }, compact=wants_compact(request))
+
+
+@login_required(login_url='login')
+@read_from_replica
+def team_streaks(request, team_id):
+    """Current and longest win/loss streaks (?season=<id>)"""
+    team = get_object_or_404(Team, id=team_id, coach=request.user)
+    season = _season_param(request, team)
+    key = f"team-streaks:{team.cache_key}:{season.id if season else ''}"
+    streaks = cache.get(key)
+    if streaks is None:
+        streaks = trends.team_streaks(team.id, season)
+        cache.set(key, streaks, DASHBOARD_DATA_TIMEOUT)
+    return FastJsonResponse({
+        'team_id': team.id,
+        'season': season.name if season else None,
+        **streaks,
+    }, compact=wants_compact(request))
+
+
+@login_required(login_url='login')
+@read_from_replica
+def team_analytics(request, team_id):
+    """Per-player totals, per-game averages, z-scores, percentiles and stat/win correlation (?season=<id>)"""
+    team = get_object_or_404(Team, id=team_id, coach=request.user)
+    if not analytics.available():
+        return FastJsonResponse({'error': 'Analytics are not available on this server'}, status=503)
+    season = _season_param(request, team)
+    key = f"team-analytics:{team.cache_key}:{season.id if season else ''}"
+    data = cache.get(key)
+    if data is None:
+        data = analytics.team_analytics(team, season)
+        cache.set(key, data, DASHBOARD_DATA_TIMEOUT)
+    return FastJsonResponse({
+        'team_id': team.id,
+        'season': season.name if season else None,
+        **data,
+    }, compact=wants_compact(request))
+
+
+SIMILAR_PLAYERS_MAX = 50
+
+
+@login_required(login_url='login')
+@read_from_replica
+def similar_players(request, player_id):
+    """Players across the coach's teams of the same sport with the closest per-game profile (?k=5, ?metric=cosine|euclidean)"""
+    player = get_object_or_404(Player.objects.select_related('team'), id=player_id, team__coach=request.user)
+    if not similarity.available():
+        return FastJsonResponse({'error': 'Similarity search is not available on this server'}, status=503)
+    metric = request.GET.get('metric') or 'cosine'
+    if metric not in similarity.METRICS:
+        return FastJsonResponse({'error': f'Unknown metric: {metric}'}, status=400)
+    k = request.GET.get('k') or ''
+    k = min(int(k), SIMILAR_PLAYERS_MAX) if k.isdigit() and int(k) > 0 else 5
+
+    matches = similarity.similar_players(player, k=k, metric=metric)
+    details = {
+        p['id']: p
+        for p in Player.objects.filter(id__in=[pid for pid, _ in matches]).values('id', 'name', 'team_id', 'team__name')
+    }
+    return FastJsonResponse({
+        'player': {'id': player.id, 'name': player.name, 'team': player.team.name},
+        'sport': player.team.sport,
+        'metric': metric,
+        'results': [
+            {
+                'id': pid,
+                'name': details[pid]['name'],
+                'team_id': details[pid]['team_id'],
+                'team': details[pid]['team__name'],
+                'score': score,
+            }
+            for pid, score in matches if pid in details
+        ],
+    }, compact=wants_compact(request))
+
+
+@login_required(login_url='login')
+@read_from_replica
+def team_head_to_head(request, team_id):
+    """Record, point differential and per-player stat totals against each opponent (?opponent=<id>, ?season=<id>)"""
+    team = get_object_or_404(Team, id=team_id, coach=request.user)
+    games = Game.objects.filter(team=team, opponent_ref__isnull=False)
+    stats_qs = PlayerStat.objects.filter(game__team=team, game__opponent_ref__isnull=False)
+
+    opponent_id = request.GET.get('opponent') or ''
+    if opponent_id.isdigit():
+        games = games.filter(opponent_ref_id=opponent_id)
+        stats_qs = stats_qs.filter(game__opponent_ref_id=opponent_id)
+    season = _season_param(request, team)
+    if season:
+        games = games.filter(season=season)
+        stats_qs = stats_qs.filter(game__season=season, game_date__range=season.dates)
+
+    scored = models.Q(points_for__isnull=False, points_against__isnull=False)
+    records = (
+        games.values('opponent_ref_id', 'opponent_ref__name')
+        .annotate(
+            games=models.Count('id'),
+            wins=models.Count('id', filter=models.Q(is_win=True)),
+            losses=models.Count('id', filter=models.Q(is_win=False)),
+            # Aliased: naming these points_for/points_against would shadow the fields in F()
+            scored_for=models.Sum('points_for', filter=scored),
+            scored_against=models.Sum('points_against', filter=scored),
+            point_diff=models.Sum(models.F('points_for') - models.F('points_against'), filter=scored),
+        )
+        .order_by('opponent_ref__name')
+    )
+
+    player_rows = (
+        stats_qs.values('game__opponent_ref_id', 'player_id', 'player__name')
+        .annotate(games=models.Count('game', distinct=True), **{f: models.Sum(f) for f in LEADERBOARD_STATS})
+        .order_by('player__name')
+    )
+    players_by_opponent = {}
+    for row in player_rows:
+        players_by_opponent.setdefault(row.pop('game__opponent_ref_id'), []).append(row)
+
+    opponents = [
+        {
+            'id': r['opponent_ref_id'],
+            'name': r['opponent_ref__name'],
+            'games': r['games'],
+            'wins': r['wins'],
+            'losses': r['losses'],
+            'points_for': r['scored_for'],
+            'points_against': r['scored_against'],
+            'point_diff': r['point_diff'],
+            'players': players_by_opponent.get(r['opponent_ref_id'], []),
+        }
+        for r in records
+    ]
+    return FastJsonResponse({
+        'team_id': team.id,
+        'season': season.name if season else None,
+        'opponents': opponents,
+    }, compact=wants_compact(request))
 
 
 @login_required(login_url='login')
@@ -845,6 +1455,7 @@ def player_stats_page(request, player_id):
     return render(request, "team_mgmt/player_stats.html", {'player_id': player.id})
 
 @login_required(login_url="login")
+@read_from_replica
 def get_event_details(request, event_id):
     """API to get event details and player attendance status"""
     event = get_object_or_404(Event, id=event_id, coach=request.user)
@@ -855,7 +1466,7 @@ def get_event_details(request, event_id):
     # Get existing attendance records for this event
     attendance_map = {
         att.player_id: att.present 
-        for att in Attendance.objects.filter(event=event)
+        for att in Attendance.objects.filter(event=event, event_date=event.date)
     }
     
     players_data = []
@@ -878,35 +1489,436 @@ def get_event_details(request, event_id):
         'notes': event.notes,
         'players': players_data
     }
-    return JsonResponse(data)
+    return FastJsonResponse(data, compact=wants_compact(request))
+
+
+def _mark_attendance(user, data):
+    """Record every player of the event's team as present (listed in data['present_player_ids']) or absent"""
+    event = get_object_or_404(Event, id=data['event_id'], coach=user)
+    present_player_ids = set(data.get('present_player_ids', []))
+
+    # Get all players for the team to ensure we handle "absent" ones too
+    roster = list(Player.objects.filter(team=event.team).values_list('id', flat=True))
+    present = [player_id for player_id in roster if player_id in present_player_ids]
+    absent = [player_id for player_id in roster if player_id not in present_player_ids]
+    rows = Attendance.objects.filter(event=event, event_date=event.date)
+
+    # A fixed handful of bulk writes however big the roster (same approach as coach.checkin)
+    with transaction.atomic():
+        Attendance.objects.bulk_create(
+            [
+                Attendance(event=event, player_id=player_id, event_date=event.date,
+                           present=player_id in present_player_ids, recorded_by=user)
+                for player_id in roster
+            ],
+            ignore_conflicts=True,
+        )
+        now = timezone.now()
+        rows.filter(player_id__in=present).update(present=True, recorded_by=user, recorded_at=now)
+        rows.filter(player_id__in=absent).update(present=False, recorded_by=user, recorded_at=now)
+        # Bulk writes skip the signals that log changes and invalidate caches
+        ids = list(rows.filter(player_id__in=roster).values_list('id', flat=True))
+        changelog.record_many(Attendance, ids, event.coach_id, event.team_id)
+        bump_team_version(id=event.team_id)
+    return {'success': True}
 
 
 @login_required(login_url="login")
 def mark_attendance(request, event_id):
     """API to save attendance"""
     if request.method != 'POST':
-        return JsonResponse({'success': False, 'error': 'Invalid method'}, status=405)
+        return FastJsonResponse({'success': False, 'error': 'Invalid method'}, status=405)
         
-    event = get_object_or_404(Event, id=event_id, coach=request.user)
-    
     try:
         data = json.loads(request.body)
-        present_player_ids = set(data.get('present_player_ids', []))
-        
-        # Get all players for the team to ensure we handle "absent" ones too
-        all_players = Player.objects.filter(team=event.team)
-        
-        for player in all_players:
-            is_present = player.id in present_player_ids
-            Attendance.objects.update_or_create(
-                event=event,
-                player=player,
-                defaults={
-                    'present': is_present,
-                    'recorded_by': request.user
-                }
-            )
-            
-        return JsonResponse({'success': True})
+        return FastJsonResponse(_mark_attendance(request.user, {**data, 'event_id': event_id}))
+    except Http404:
+        raise
     except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+        return FastJsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+# ===============================
+# LIVE STAT VIEWS
+# ===============================
+
+@login_required(login_url="login")
+def live_stat_delta(request, game_id):
+    """
+    API for live scoring: POST {"player_id": 3, "stat": "goals", "delta": 1}
+    adds delta (negative to undo) to one stat and pushes it to live viewers.
+    """
+    if request.method != 'POST':
+        return FastJsonResponse({'error': 'POST required'}, status=405)
+    try:
+        data = json.loads(request.body)
+        player_id, stat, delta = int(data['player_id']), data['stat'], int(data.get('delta', 1))
+    except (ValueError, TypeError, KeyError):
+        return FastJsonResponse({'error': 'Expected JSON with player_id, stat and an integer delta'}, status=400)
+    if stat not in PLAYER_STAT_FIELDS:
+        return FastJsonResponse({'error': f'Unknown stat: {stat}'}, status=400)
+    limit = settings.LIVE_STATS_MAX_DELTA
+    if not delta or abs(delta) > limit:
+        return FastJsonResponse({'error': f'delta must be a non-zero integer within +/-{limit}'}, status=400)
+
+    game = get_object_or_404(Game, id=game_id, coach=request.user)
+    if not Player.objects.filter(id=player_id, team_id=game.team_id).exists():
+        raise Http404("Player is not on this team")
+    try:
+        value = live.apply_delta(game, player_id, stat, delta, request.user)
+    except live.StatRowGone:
+        return FastJsonResponse({'error': 'The stat line was deleted meanwhile; reload the game'}, status=409)
+    return FastJsonResponse({'game_id': game.id, 'player_id': player_id, 'stat': stat, 'value': value})
+
+
+@login_required(login_url="login")
+async def live_stat_stream(request, game_id):
+    """Server-Sent Events stream of a game's live stat changes (`stat` events)"""
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI the endless stream would hold a worker until the viewer leaves
+        return FastJsonResponse(
+            {'error': 'Live streams need the ASGI server: uvicorn team_mgmt.asgi:application'}, status=503,
+        )
+    user = await request.auser()
+    if not await Game.objects.filter(id=game_id, coach=user).aexists():
+        raise Http404("Game not found")
+    response = StreamingHttpResponse(live.stream(game_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Tell nginx not to buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# ===============================
+# STAT HISTORY VIEWS
+# ===============================
+
+STAT_HISTORY_DEFAULT_LIMIT = 200
+STAT_HISTORY_MAX_LIMIT = 1000
+
+
+@login_required(login_url="login")
+@read_from_replica
+def game_stats_at(request, game_id):
+    """API returning a game's box score as it stood at ?at=<ISO datetime>"""
+    game = get_object_or_404(Game, id=game_id, coach=request.user)
+    when = parse_datetime(request.GET.get('at', ''))
+    if when is None:
+        return FastJsonResponse({'error': 'at must be an ISO 8601 datetime'}, status=400)
+    if timezone.is_naive(when):
+        when = timezone.make_aware(when)
+    return FastJsonResponse({
+        'game_id': game.id,
+        'at': when,
+        'stats': revisions.box_score_at(game.id, when),
+    }, compact=wants_compact(request))
+
+
+@login_required(login_url="login")
+@read_from_replica
+def game_stats_history(request, game_id):
+    """API listing a game's stat edits newest first (?player=<id>, ?limit=)"""
+    game = get_object_or_404(Game, id=game_id, coach=request.user)
+    try:
+        player_id = int(request.GET['player']) if request.GET.get('player') else None
+        limit = min(max(int(request.GET.get('limit', STAT_HISTORY_DEFAULT_LIMIT)), 1), STAT_HISTORY_MAX_LIMIT)
+    except ValueError:
+        return FastJsonResponse({'error': 'player and limit must be integers'}, status=400)
+    return FastJsonResponse({
+        'game_id': game.id,
+        'revisions': [
+            {
+                'id': r['id'],
+                'player_id': r['player_id'],
+                'kind': r['kind'],
+                'version': r['version'],
+                'changes': r['changes'],
+                'editor': r['editor__username'],
+                'at': r['created_at'],
+            }
+            for r in revisions.history(game.id, player_id, limit)
+        ],
+    })
+
+
+# ===============================
+# SEARCH VIEWS
+# ===============================
+
+SEARCH_DEFAULT_LIMIT = 8
+SEARCH_MAX_LIMIT = 25
+SEARCH_MAX_QUERY_LENGTH = 100
+
+
+@login_required(login_url="login")
+@read_from_replica
+def search_view(request):
+    """Typeahead API matching ?q= against the coach's players and events (?limit=)"""
+    query = request.GET.get('q', '')[:SEARCH_MAX_QUERY_LENGTH]
+    try:
+        limit = min(max(int(request.GET.get('limit', SEARCH_DEFAULT_LIMIT)), 1), SEARCH_MAX_LIMIT)
+    except ValueError:
+        return FastJsonResponse({'error': 'limit must be an integer'}, status=400)
+    results = search.search(request.user.id, query, limit)
+    return FastJsonResponse({
+        'query': query,
+        'players': [
+            {
+                'id': p['id'],
+                'name': p['name'],
+                'jersey_number': p['jersey_number'],
+                'position': p['position'],
+                'team_id': p['team_id'],
+                'team': p['team__name'],
+            }
+            for p in results['players']
+        ],
+        'events': [
+            {
+                'id': e['id'],
+                'title': e['title'],
+                'event_type': e['event_type'],
+                'date': e['date'],
+                'time': e['time'],
+                'location': e['location'],
+                'team_id': e['team_id'],
+                'team': e['team__name'],
+            }
+            for e in results['events']
+        ],
+    }, compact=wants_compact(request))
+
+
+# ===============================
+# BATCH VIEWS
+# ===============================
+
+BATCH_OPERATIONS = {
+    'mark_attendance': _mark_attendance,
+    'save_stats': _save_game_stats,
+    'edit_event': _edit_event,
+}
+BATCH_MAX_OPERATIONS = 50
+
+
+class _BatchFailure(Exception):
+    def __init__(self, index, status, message, detail=None):
+        super().__init__(message)
+        self.index = index
+        self.status = status
+        self.detail = detail
+
+
+def _operation_hash(operation):
+    payload = json.dumps({'op': operation['op'], 'args': operation['args']}, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _field_errors(model, data, names, prefix=''):
+    """{path: first message} for the `names` present in `data` that the model fields reject"""
+    errors = {}
+    for name in names:
+        if name in data:
+            try:
+                model._meta.get_field(name).clean(data[name], None)
+            except ValidationError as e:
+                errors[f'{prefix}{name}'] = e.messages[0]
+    return errors
+
+
+def _id_errors(data, names, prefix='', required=True):
+    errors = {}
+    for name in names:
+        value = data.get(name)
+        if value in (None, ''):
+            if required:
+                errors[f'{prefix}{name}'] = 'This field is required.'
+        elif isinstance(value, bool) or not (isinstance(value, int) or (isinstance(value, str) and value.isdigit())):
+            errors[f'{prefix}{name}'] = 'Must be an integer id.'
+    return errors
+
+
+def _mark_attendance_errors(args):
+    errors = _id_errors(args, ('event_id',))
+    present = args.get('present_player_ids', [])
+    if not isinstance(present, list) or any(isinstance(i, bool) or not isinstance(i, int) for i in present):
+        errors['present_player_ids'] = 'Must be a list of integer ids.'
+    return errors
+
+
+def _save_stats_errors(args):
+    game, stats = args.get('game'), args.get('stats', {})
+    if not isinstance(game, dict):
+        return {'game': 'Must be an object.'}
+    errors = _id_errors(game, ('team_id', 'event_id'), 'game.')
+    if not game.get('date'):
+        errors['game.date'] = 'This field is required.'
+    errors.update(_field_errors(Game, game, ('date', 'opponent', 'is_win'), 'game.'))
+    for field in ('points_for', 'points_against'):
+        if game.get(field) not in (None, ''):
+            errors.update(_field_errors(Game, game, (field,), 'game.'))
+    if not isinstance(stats, dict):
+        errors['stats'] = 'Must be an object keyed by player id.'
+        return errors
+    for player_id, submitted in stats.items():
+        prefix = f'stats.{player_id}'
+        if not str(player_id).isdigit():
+            errors[prefix] = 'Keys must be integer player ids.'
+            continue
+        if not isinstance(submitted, dict):
+            errors[prefix] = 'Must be an object.'
+            continue
+        version, base = submitted.get('version'), submitted.get('base') or {}
+        if version is not None and (isinstance(version, bool) or not isinstance(version, int)):
+            errors[f'{prefix}.version'] = 'Must be an integer.'
+        if not isinstance(base, dict):
+            errors[f'{prefix}.base'] = 'Must be an object.'
+            base = {}
+        for values, path in ((submitted, prefix), (base, f'{prefix}.base')):
+            names = set(values) - {'version', 'base'}
+            for name in sorted(names - set(PLAYER_STAT_EDIT_FIELDS)):
+                errors[f'{path}.{name}'] = 'Unknown stat field.'
+            errors.update(_field_errors(PlayerStat, values, sorted(names & set(PLAYER_STAT_EDIT_FIELDS)), f'{path}.'))
+    return errors
+
+
+def _edit_event_errors(args):
+    errors = _id_errors(args, ('event_id',))
+    errors.update(_id_errors(args, ('team_id',), required=False))
+    errors.update(_field_errors(Event, args, EVENT_EDIT_FIELDS))
+    return errors
+
+
+BATCH_VALIDATORS = {
+    'mark_attendance': _mark_attendance_errors,
+    'save_stats': _save_stats_errors,
+    'edit_event': _edit_event_errors,
+}
+
+
+def _parse_batch(body):
+    """The validated operation list of a batch request body; raises ValueError"""
+    try:
+        body = json.loads(body)
+    except ValueError:
+        raise ValueError('Request body must be JSON')
+    operations = body.get('operations')
+    if not isinstance(operations, list) or not 0 < len(operations) <= BATCH_MAX_OPERATIONS:
+        raise ValueError(f'operations must be a list of 1 to {BATCH_MAX_OPERATIONS} items')
+    for operation in operations:
+        if not isinstance(operation, dict) or operation.get('op') not in BATCH_OPERATIONS:
+            raise ValueError(f"Unknown operation; expected one of {', '.join(BATCH_OPERATIONS)}")
+        key = operation.get('key')
+        if not isinstance(key, str) or not 0 < len(key) <= 100:
+            raise ValueError('Every operation needs a key of 1 to 100 characters')
+        operation['args'] = operation.get('args') or {}
+        if not isinstance(operation['args'], dict):
+            raise ValueError('args must be an object')
+    if len({operation['key'] for operation in operations}) != len(operations):
+        raise ValueError('Idempotency keys must be unique within a batch')
+    return operations
+
+
+@login_required(login_url="login")
+def batch(request):
+    """
+    Run {"operations": [{"key", "op", "args"}, ...]} in order in one transaction.
+    Each result is stored under its idempotency key, so a retried batch replays
+    stored results instead of re-running them. Any failure rolls back the whole batch.
+    Invalid args are reported before anything runs, as {"fields": {path: message}}.
+    """
+    if request.method != 'POST':
+        return FastJsonResponse({'error': 'POST required'}, status=405)
+    try:
+        operations = _parse_batch(request.body)
+    except (ValueError, AttributeError) as e:
+        return FastJsonResponse({'error': str(e)}, status=400)
+    for index, operation in enumerate(operations):
+        # Checked before anything runs, so a bad argument never rolls back half-applied work
+        errors = BATCH_VALIDATORS[operation['op']](operation['args'])
+        if errors:
+            return FastJsonResponse(
+                {'error': 'Invalid arguments', 'index': index, 'key': operation['key'], 'fields': errors}, status=400,
+            )
+
+    try:
+        with transaction.atomic():
+            stored = {
+                k.key: k for k in IdempotencyKey.objects.filter(user=request.user, key__in=[op['key'] for op in operations])
+            }
+            results = []
+            for index, operation in enumerate(operations):
+                request_hash = _operation_hash(operation)
+                previous = stored.get(operation['key'])
+                if previous is not None:
+                    if previous.request_hash != request_hash:
+                        raise _BatchFailure(index, 422, 'Idempotency key was already used for a different operation')
+                    results.append({'key': operation['key'], 'result': previous.result, 'replayed': True})
+                    continue
+
+                try:
+                    result = BATCH_OPERATIONS[operation['op']](request.user, operation['args'])
+                except Http404:
+                    raise _BatchFailure(index, 404, 'Not found')
+                except (KeyError, TypeError, ValueError, ValidationError):
+                    raise _BatchFailure(index, 400, 'Invalid arguments')
+                if result.get('conflicts'):
+                    raise _BatchFailure(index, 409, 'Stat edits conflict with another editor', result['conflicts'])
+                IdempotencyKey.objects.create(
+                    user=request.user,
+                    key=operation['key'],
+                    operation=operation['op'],
+                    request_hash=request_hash,
+                    result=result,
+                )
+                results.append({'key': operation['key'], 'result': result, 'replayed': False})
+    except _BatchFailure as failure:
+        body = {'error': str(failure), 'index': failure.index, 'key': operations[failure.index]['key']}
+        if failure.detail is not None:
+            body['conflicts'] = failure.detail
+        return FastJsonResponse(body, status=failure.status)
+    except IntegrityError:
+        # A concurrent retry claimed one of the keys first; retrying replays its results
+        return FastJsonResponse({'error': 'A request with the same idempotency key is in progress'}, status=409)
+
+    return FastJsonResponse({'results': results})
+
+
+# ===============================
+# SYNC VIEWS
+# ===============================
+
+@login_required(login_url='login')
+@read_from_replica
+def sync(request):
+    """
+    Rows changed since ?since=<cursor>, for offline-capable clients.
+    Rows are arrays in `fields` order; keep `cursor` for the next call and repeat while `more`.
+    `full` marks the first page of a snapshot: clear the local cache before applying it.
+    """
+    try:
+        since, label, after = changelog.parse_cursor(request.GET.get('since'))
+    except ValueError:
+        return FastJsonResponse({'error': 'Invalid cursor'}, status=400)
+    return FastJsonResponse(changelog.changes_since(request.user.id, since, label=label, after=after))
+
+
+# ===============================
+# BACKGROUND JOB VIEWS
+# ===============================
+
+@login_required(login_url="login")
+def job_status(request, job_id):
+    """API to poll a background job queued by this coach"""
+    job = get_object_or_404(Job, id=job_id, created_by=request.user)
+    return FastJsonResponse({
+        'id': job.id,
+        'name': job.name,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'result': job.result,
+        'error': job.last_error.strip().splitlines()[-1] if job.last_error else None,
+        'created_at': job.created_at,
+        'updated_at': job.updated_at,
+    })
@@ -58,6 +58,98 @@ else:
         )
     }
 
+    # Optional streaming replica for read-only views (see coach.db_router)
+    DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL')
+    if DATABASE_REPLICA_URL:
+        DATABASES['replica'] = dj_database_url.parse(
+            DATABASE_REPLICA_URL,
+            conn_max_age=0,
+            ssl_require=True
+        )
+        DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+        DATABASE_ROUTERS = ['coach.db_router.ReplicaRouter']
+
+# Seconds a client's reads stay on the primary after it writes (read-your-writes)
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv('DATABASE_REPLICA_PIN_SECONDS', '10'))
+
+# ===========================
+# CACHING
+# ===========================
+# Set REDIS_URL in production (needs the `redis` package) so all workers share
+# one cache; otherwise each process keeps its own in-memory cache.
+REDIS_URL = os.getenv("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": 5000},
+        }
+    }
+
+# ===========================
+# BACKGROUND JOBS (coach.jobs)
+# ===========================
+# Run jobs inline after commit instead of waiting for `manage.py run_jobs` (handy for local dev)
+JOBS_RUN_EAGERLY = os.getenv("JOBS_RUN_EAGERLY", "False") == "True"
+JOBS_RETRY_BASE_DELAY = 30  # Seconds before the first retry; doubles each attempt
+JOBS_STALE_AFTER = 15 * 60  # Seconds without a heartbeat before a running job is requeued
+JOBS_KEEP_DONE_FOR = 24 * 60 * 60  # Seconds finished jobs are kept before run_jobs deletes them
+# Teams whose estimated row count (players, events, attendance) exceeds this are
+# hidden immediately and purged by a background job instead of inside the request
+TEAM_DELETE_BACKGROUND_ROWS = int(os.getenv("TEAM_DELETE_BACKGROUND_ROWS", "20000"))
+
+# ===========================
+# TABLE PARTITIONING (coach.partitioning, Postgres only)
+# ===========================
+# Range-partition Attendance/PlayerStat by year when migrating; maintain with `manage.py manage_partitions`
+PARTITION_HISTORY_TABLES = os.getenv("PARTITION_HISTORY_TABLES", "False") == "True"
+
+# ===========================
+# DELTA SYNC (coach.changelog)
+# ===========================
+# Change log entries older than this are pruned by `manage.py prune_change_log`;
+# clients with an older cursor get a full snapshot
+CHANGE_LOG_RETENTION_DAYS = int(os.getenv("CHANGE_LOG_RETENTION_DAYS", "30"))
+# Entries are only served once this old, so transactions that commit out of id order
+# are not skipped; keep it above the longest transaction that writes change log entries
+SYNC_SAFETY_LAG_SECONDS = int(os.getenv("SYNC_SAFETY_LAG_SECONDS", "30"))
+
+# ===========================
+# BATCH API (coach.views.batch)
+# ===========================
+# Stored batch results are replayed for retries within this window; prune with `manage.py prune_idempotency_keys`
+IDEMPOTENCY_KEY_RETENTION_HOURS = int(os.getenv("IDEMPOTENCY_KEY_RETENTION_HOURS", "48"))
+
+# ===========================
+# SELF CHECK-IN (coach.checkin)
+# ===========================
+# Buffered QR check-ins are written to Attendance in one bulk upsert per window of this length;
+# run `manage.py run_jobs --sleep 0.2` so the worker picks flushes up promptly
+CHECKIN_FLUSH_INTERVAL_MS = int(os.getenv("CHECKIN_FLUSH_INTERVAL_MS", "300"))
+
+# ===========================
+# LIVE STATS (coach.live)
+# ===========================
+# SSE streams stay open for a whole game, so they are only served through ASGI (the Procfile's
+# `uvicorn team_mgmt.asgi:application`); under WSGI (`runserver`, gunicorn team_mgmt.wsgi) they answer 503.
+# Set REDIS_URL when running more than one process so deltas reach every viewer
+LIVE_STATS_HEARTBEAT_SECONDS = int(os.getenv("LIVE_STATS_HEARTBEAT_SECONDS", "15"))
+LIVE_STATS_MAX_DELTA = 100  # Largest single increment accepted by the delta endpoint
+
+# ===========================
+# STAT HISTORY (coach.revisions)
+# ===========================
+# `manage.py compact_stat_revisions` folds stat edits older than this into one snapshot per stat line
+STAT_REVISION_DETAIL_DAYS = int(os.getenv("STAT_REVISION_DETAIL_DAYS", "180"))
+
 # ===========================
 # INSTALLED APPS
 # ===========================
@@ -78,14 +170,19 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # For serving static files in production
+    "coach.middleware.JsonCompressionMiddleware",  # gzip/brotli for large JSON API responses
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "coach.middleware.ReplicaPinningMiddleware",  # No-op unless DATABASE_REPLICA_URL is set
 ]
 
+# JSON responses smaller than this are sent uncompressed
+JSON_COMPRESS_MIN_SIZE = int(os.getenv("JSON_COMPRESS_MIN_SIZE", "1024"))
+
 # ===========================
 # URL & WSGI
 # ===========================
@@ -143,6 +240,13 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Offload media bytes to the front proxy when one is present.
+# nginx: set MEDIA_ACCEL_REDIRECT_PREFIX to an `internal` location aliased to MEDIA_ROOT.
+# Apache/lighttpd: set MEDIA_USE_SENDFILE=True with mod_xsendfile enabled.
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX", "")
+MEDIA_USE_SENDFILE = os.getenv("MEDIA_USE_SENDFILE", "False") == "True"
+MEDIA_CACHE_MAX_AGE = int(os.getenv("MEDIA_CACHE_MAX_AGE", "3600"))  # Non-hashed filenames
+
 # ===========================
 # DEFAULT PRIMARY KEY
 # ===========================
@@ -24,8 +24,8 @@ urlpatterns = [
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 else:
-    # Force serve media files in production (Use with caution, for simple deployments)
-    from django.views.static import serve
+    # Serve media with caching/range support, offloading to the proxy when configured
+    from coach.media import serve_media
     urlpatterns += [
-        re_path(r'^media/(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT}),
+        re_path(r'^media/(?P<path>.*)$', serve_media),
     ]
\ No newline at end of file